@@ -0,0 +1 @@
+"""Prueba de carga local: `python -m carga --help` (ver carga/__main__.py)."""
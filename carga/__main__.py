@@ -0,0 +1,176 @@
+"""
+Prueba de carga local.
+
+    python -m carga --sembrar --workers 3 --clientes 40 --duracion 60
+    python -m carga --url http://127.0.0.1:8000 --clientes 20      # contra un servidor ya levantado
+    python -m carga --comparar carga/resultados/a.json carga/resultados/b.json
+
+Sin --url arranca gunicorn (gunicorn.conf.py) con el mismo entorno que este proceso
+(DB_ENGINE, DB_NAME, REDIS_URL...), espera a /health/, lanza los clientes, lo para y
+guarda el resultado en carga/resultados/. Con --sembrar antes ejecuta
+`manage.py sembrar_carga`. Las medidas de los primeros --calentamiento segundos no cuentan.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+from . import informe
+from .trafico import Cliente
+
+RAIZ = Path(__file__).resolve().parent.parent
+RESULTADOS = Path(__file__).resolve().parent / "resultados"
+
+
+def _args():
+    p = argparse.ArgumentParser(prog="python -m carga", description=__doc__.split("\n\n")[0])
+    p.add_argument("--url", help="Servidor ya levantado (no se arranca gunicorn).")
+    p.add_argument("--puerto", type=int, default=8765)
+    p.add_argument("--workers", type=int, default=3)
+    p.add_argument("--threads", type=int, default=1, help=">1 usa workers gthread.")
+    p.add_argument("--asgi", action="store_true", help="Workers uvicorn (como APP_SERVER=asgi).")
+    p.add_argument("--clientes", type=int, default=20)
+    p.add_argument("--admins", type=int, default=2, help="Cuántos de los clientes son admin.")
+    p.add_argument("--duracion", type=float, default=30, help="Segundos medidos.")
+    p.add_argument("--calentamiento", type=float, default=5)
+    p.add_argument("--pausa-ms", type=float, default=0, help="Pausa media entre acciones de un cliente.")
+    p.add_argument("--sembrar", action="store_true")
+    p.add_argument("--usuarios", type=int, default=200)
+    p.add_argument("--recibos", type=int, default=20000)
+    p.add_argument("--prefijo", default="carga")
+    p.add_argument("--password", default="carga12345")
+    p.add_argument("--sin-limites", action="store_true",
+                   help="Sube THROTTLE_* del servidor para medir la app y no el limitador.")
+    p.add_argument("--salida", help="Archivo JSON de resultado (por defecto carga/resultados/<fecha>.json).")
+    p.add_argument("--comparar", nargs="+", metavar="JSON")
+    return p.parse_args()
+
+
+def _git():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def sembrar(a, entorno):
+    subprocess.run(
+        [sys.executable, "manage.py", "sembrar_carga", "--limpiar", "--prefijo", a.prefijo,
+         "--usuarios", str(a.usuarios), "--recibos", str(a.recibos), "--password", a.password],
+        cwd=RAIZ, env=entorno, check=True,
+    )
+
+
+def arrancar(a, entorno, log):
+    app = "sist_rec_api.asgi:application" if a.asgi else "sist_rec_api.wsgi:application"
+    cmd = [sys.executable, "-m", "gunicorn", app, "-c", "gunicorn.conf.py",
+           "--bind", f"127.0.0.1:{a.puerto}", "--workers", str(a.workers)]
+    if a.asgi:
+        cmd += ["-k", "uvicorn.workers.UvicornWorker"]
+    elif a.threads > 1:
+        cmd += ["--threads", str(a.threads)]
+    return subprocess.Popen(cmd, cwd=RAIZ, env=entorno, stdout=log, stderr=subprocess.STDOUT)
+
+
+def esperar(base, proceso=None, timeout=60):
+    limite = time.time() + timeout
+    ultimo = None
+    while time.time() < limite:
+        if proceso is not None and proceso.poll() is not None:
+            raise SystemExit(f"gunicorn terminó al arrancar (código {proceso.returncode}).")
+        try:
+            with urllib.request.urlopen(f"{base}/health/", timeout=2) as r:
+                if r.status == 200:
+                    return time.time()
+        except OSError as e:
+            ultimo = e
+            time.sleep(0.2)
+    raise SystemExit(f"{base}/health/ no respondió en {timeout}s ({ultimo}).")
+
+
+def ejecutar(a, base):
+    inicio = time.time()
+    desde = inicio + a.calentamiento
+    fin = desde + a.duracion
+    clientes = [
+        Cliente(
+            base,
+            f"{a.prefijo}admin" if n < a.admins else f"{a.prefijo}{(n - a.admins) % a.usuarios + 1:05d}",
+            a.password, n < a.admins, fin, a.pausa_ms / 1000, seed=n, prefijo=a.prefijo,
+        )
+        for n in range(a.clientes)
+    ]
+    for c in clientes:
+        c.start()
+    for c in clientes:
+        c.join()
+    medidas = [m for c in clientes for m in c.medidas]
+    return informe.agregar(medidas, desde, fin)
+
+
+def main():
+    a = _args()
+    if a.comparar:
+        print(informe.comparar(a.comparar))
+        return
+
+    entorno = {**os.environ, "GUNICORN_PRELOAD": os.environ.get("GUNICORN_PRELOAD", "1")}
+    if not a.url:
+        # El servidor local se llama 127.0.0.1: sin esto Django responde 400 (DisallowedHost)
+        entorno["ALLOWED_HOSTS"] = ",".join(filter(None, [os.environ.get("ALLOWED_HOSTS"), "127.0.0.1"]))
+    if a.sin_limites:
+        for clase in ("IMPORTS", "STATS", "WRITES", "READS"):
+            entorno[f"THROTTLE_{clase}"] = "1000000/s"
+            entorno[f"THROTTLE_{clase}_TOTAL"] = "1000"
+
+    if a.sembrar:
+        sembrar(a, entorno)
+
+    proceso = None
+    base = (a.url or f"http://127.0.0.1:{a.puerto}").rstrip("/")
+    RESULTADOS.mkdir(exist_ok=True)
+    sello = time.strftime("%Y%m%d-%H%M%S")
+    ruta_log = RESULTADOS / f"{sello}-gunicorn.log"
+    try:
+        if not a.url:
+            log = open(ruta_log, "w")
+            t0 = time.time()
+            proceso = arrancar(a, entorno, log)
+            listo = esperar(base, proceso) - t0
+            print(f"gunicorn listo en {listo:.2f}s (log: {ruta_log})")
+        resultado = ejecutar(a, base)
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait(timeout=30)
+            log.close()
+
+    resultado["config"] = {
+        "url": a.url,
+        "workers": None if a.url else a.workers,
+        "threads": a.threads,
+        "app_server": "asgi" if a.asgi else "wsgi",
+        "db_engine": os.environ.get("DB_ENGINE", "mysql"),
+        "db_name": os.environ.get("DB_NAME"),
+        "db_replicas": os.environ.get("DB_REPLICAS") or None,
+        "redis": bool(os.environ.get("REDIS_URL")),
+        "clients": a.clientes,
+        "admins": a.admins,
+        "think_ms": a.pausa_ms,
+        "throttling": not a.sin_limites,
+        "git": _git(),
+        "started": sello,
+    }
+    salida = Path(a.salida) if a.salida else RESULTADOS / f"{sello}.json"
+    salida.write_text(json.dumps(resultado, indent=2))
+    print(informe.tabla(resultado))
+    print(f"\nResultado guardado en {salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Agregado de las medidas por ruta (throughput, errores, p50/p95/p99) y comparación de
+resultados guardados.
+"""
+import json
+import math
+from collections import Counter, defaultdict
+
+
+def percentil(ordenados, p):
+    """Rango más cercano: el menor valor con al menos p% de las muestras por debajo o igual."""
+    if not ordenados:
+        return None
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+def _fila(latencias, estados, duracion):
+    latencias.sort()
+    n = len(latencias)
+    errores = sum(c for s, c in estados.items() if s == 0 or s >= 400)
+    return {
+        "count": n,
+        "rps": round(n / duracion, 2) if duracion else None,
+        "errors": errores,
+        "error_rate": round(errores / n, 4) if n else 0,
+        "status": {str(s): c for s, c in sorted(estados.items())},
+        "mean_ms": round(sum(latencias) / n, 2) if n else None,
+        "p50_ms": _r(percentil(latencias, 50)),
+        "p95_ms": _r(percentil(latencias, 95)),
+        "p99_ms": _r(percentil(latencias, 99)),
+        "max_ms": _r(latencias[-1] if latencias else None),
+    }
+
+
+def _r(x):
+    return None if x is None else round(x, 2)
+
+
+def agregar(medidas, desde, hasta):
+    """medidas: [(ruta, status, ms, instante)]. Solo cuentan las que acabaron en [desde, hasta]."""
+    latencias, estados = defaultdict(list), defaultdict(Counter)
+    for ruta, status, ms, t in medidas:
+        if desde <= t <= hasta:
+            latencias[ruta].append(ms)
+            estados[ruta][status] += 1
+    duracion = hasta - desde
+    rutas = {ruta: _fila(latencias[ruta], estados[ruta], duracion) for ruta in sorted(latencias)}
+    total = _fila([ms for l in latencias.values() for ms in l], sum(estados.values(), Counter()), duracion)
+    return {"duration_s": round(duracion, 2), "total": total, "routes": rutas}
+
+
+def tabla(resultado):
+    cols = ("count", "rps", "error_rate", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+    ancho = max([len(r) for r in resultado["routes"]] + [5])
+    lineas = [f"{'ruta':<{ancho}} " + " ".join(f"{c:>10}" for c in cols)]
+    for ruta, fila in [*resultado["routes"].items(), ("TOTAL", resultado["total"])]:
+        lineas.append(f"{ruta:<{ancho}} " + " ".join(f"{_fmt(fila[c], c):>10}" for c in cols))
+    return "\n".join(lineas)
+
+
+def _fmt(v, col=None):
+    if v is None:
+        return "-"
+    return f"{v:.2%}" if col == "error_rate" else str(v)
+
+
+def comparar(rutas_archivo):
+    """Tabla rps / p95 / errores por ruta, una columna por archivo de resultados."""
+    resultados = []
+    for p in rutas_archivo:
+        with open(p) as f:
+            resultados.append(json.load(f))
+    etiquetas = [
+        f"w{r['config'].get('workers')}/{r['config'].get('app_server')}/{r['config'].get('db_engine')}"
+        for r in resultados
+    ]
+    rutas = sorted({ruta for r in resultados for ruta in r["routes"]}) + ["TOTAL"]
+    ancho = max(len(r) for r in rutas)
+    lineas = [" | ".join([f"{'':<{ancho}}"] + [f"{e:^30}" for e in etiquetas])]
+    lineas.append(" | ".join([f"{'ruta':<{ancho}}"] + [f"{'rps':>8} {'p95_ms':>10} {'err':>9}"] * len(resultados)))
+    for ruta in rutas:
+        celdas = []
+        for r in resultados:
+            fila = r["total"] if ruta == "TOTAL" else r["routes"].get(ruta)
+            if fila is None:
+                celdas.append(f"{'-':>8} {'-':>10} {'-':>9}")
+            else:
+                celdas.append(f"{_fmt(fila['rps']):>8} {_fmt(fila['p95_ms']):>10} {fila['error_rate']:>9.2%}")
+        lineas.append(" | ".join([f"{ruta:<{ancho}}"] + celdas))
+    return "\n".join(lineas)
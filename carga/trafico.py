@@ -0,0 +1,195 @@
+"""
+Clientes virtuales: cada uno es un hilo con su propia conexión HTTP (keep-alive cuando el
+worker lo permite) que inicia sesión y luego elige acciones al azar según PESOS hasta
+que se acaba el tiempo. Cada petición queda anotada como (ruta, status, ms, instante).
+"""
+import http.client
+import json
+import random
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+# Peso relativo de cada acción. Las de "admin" solo las hacen los clientes admin.
+PESOS = {
+    "usuario": {
+        "recibidos_pendientes": 30,
+        "emitidos": 15,
+        "pagados": 15,
+        "pagar": 8,
+        "transferir": 8,
+        "login": 2,
+    },
+    "admin": {
+        "dashboard": 10,
+        "top_deudores": 6,
+        "resumen": 6,
+        "pendientes": 6,
+        "importar_csv": 1,
+        "login": 1,
+    },
+}
+
+FILAS_CSV = 20
+
+
+class Http:
+    def __init__(self, base, timeout=60):
+        partes = urlsplit(base)
+        self.conn = http.client.HTTPConnection(partes.hostname, partes.port or 80, timeout=timeout)
+        self.token = None
+
+    def pedir(self, metodo, ruta, cuerpo=None, cabeceras=None):
+        """Devuelve (status, bytes). status 0 = fallo de conexión o timeout."""
+        cab = {"Accept": "application/json", **(cabeceras or {})}
+        if self.token:
+            cab["Authorization"] = f"Bearer {self.token}"
+        if isinstance(cuerpo, (dict, list)):
+            cuerpo = json.dumps(cuerpo).encode()
+            cab["Content-Type"] = "application/json"
+        try:
+            self.conn.request(metodo, ruta, body=cuerpo, headers=cab)
+            r = self.conn.getresponse()
+            datos = r.read()
+            if r.getheader("Connection", "").lower() == "close":
+                self.conn.close()
+            return r.status, datos
+        except (http.client.HTTPException, OSError):
+            self.conn.close()
+            return 0, b""
+
+    def cerrar(self):
+        self.conn.close()
+
+
+class Cliente(threading.Thread):
+    def __init__(self, base, usuario, password, admin, fin, pausa=0.0, seed=None, prefijo=""):
+        super().__init__(daemon=True)
+        self.http = Http(base)
+        self.usuario = usuario
+        self.prefijo = prefijo
+        self.password = password
+        self.admin = admin
+        self.fin = fin
+        self.pausa = pausa
+        self.rnd = random.Random(seed)
+        self.medidas = []
+        self.pendientes = []   # ids de recibos recibidos PENDIENTES (para pagar/transferir)
+        self.receptores = []   # ids de usuarios (para el CSV de admin)
+
+    # ---------- medición ----------
+
+    def _pedir(self, nombre, metodo, ruta, cuerpo=None, cabeceras=None):
+        inicio = time.perf_counter()
+        status, datos = self.http.pedir(metodo, ruta, cuerpo, cabeceras)
+        fin = time.perf_counter()
+        self.medidas.append((nombre, status, (fin - inicio) * 1000, time.time()))
+        return status, datos
+
+    @staticmethod
+    def _json(datos):
+        try:
+            return json.loads(datos)
+        except ValueError:
+            return None
+
+    # ---------- acciones ----------
+
+    def login(self):
+        status, datos = self._pedir("POST /api/auth/login/", "POST", "/api/auth/login/",
+                                    {"username": self.usuario, "password": self.password})
+        if status == 200:
+            self.http.token = self._json(datos)["access"]
+        return status == 200
+
+    def _listar(self, nombre, query):
+        status, datos = self._pedir(f"GET /api/recibos/?{nombre}", "GET", f"/api/recibos/?{query}")
+        if status != 200:
+            return None
+        filas = self._json(datos)
+        return filas.get("results", []) if isinstance(filas, dict) else filas
+
+    def recibidos_pendientes(self):
+        filas = self._listar("mine=received&status=PENDING", "mine=received&status=PENDING")
+        if filas is not None:
+            self.pendientes = [(r["id"], r["monto"]) for r in filas[:50]]
+
+    def emitidos(self):
+        self._listar("mine=issued", "mine=issued")
+
+    def pagados(self):
+        self._listar("status=PAID", "status=PAID")
+
+    def pendientes_todos(self):
+        self._listar("status=PENDING&fields", "status=PENDING&fields=id,monto,receptor")
+
+    def pagar(self):
+        if not self.pendientes:
+            return self.recibidos_pendientes()
+        rid, _ = self.pendientes.pop(self.rnd.randrange(len(self.pendientes)))
+        self._pedir("POST /api/recibos/{id}/pay/", "POST", f"/api/recibos/{rid}/pay/")
+
+    def transferir(self):
+        if not self.pendientes:
+            return self.recibidos_pendientes()
+        rid, monto = self.pendientes.pop(self.rnd.randrange(len(self.pendientes)))
+        self._pedir("POST /api/transferencias/", "POST", "/api/transferencias/",
+                    {"recibo_id": rid, "monto": monto, "referencia": f"carga-{rid}"})
+
+    def dashboard(self):
+        self._pedir("GET stats/dashboard", "GET", "/api/recibos/stats/dashboard/")
+
+    def top_deudores(self):
+        self._pedir("GET stats/top-debtors", "GET", "/api/recibos/stats/top-debtors/?limit=20")
+
+    def resumen(self):
+        self._pedir("GET stats/summary", "GET", "/api/recibos/stats/summary/")
+
+    def importar_csv(self):
+        if not self.receptores:
+            status, datos = self._pedir("GET /api/auth/users/directory/", "GET",
+                                        f"/api/auth/users/directory/?q={self.prefijo}&page_size=100")
+            cuerpo = self._json(datos) if status == 200 else None
+            self.receptores = [u["id"] for u in (cuerpo or {}).get("results", []) if u["username"] != self.usuario]
+            if not self.receptores:
+                return
+        filas = ["receptor_id,monto,fecha,descripcion"] + [
+            f"{self.rnd.choice(self.receptores)},{self.rnd.randint(100, 99999) / 100},"
+            f"{time.strftime('%Y-%m-%d')},carga csv"
+            for _ in range(FILAS_CSV)
+        ]
+        limite = uuid.uuid4().hex
+        cuerpo = (
+            f"--{limite}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"carga.csv\"\r\n"
+            f"Content-Type: text/csv\r\n\r\n" + "\n".join(filas) + f"\r\n--{limite}--\r\n"
+        ).encode()
+        self._pedir("POST /api/recibos/import-csv/", "POST", "/api/recibos/import-csv/", cuerpo,
+                    {"Content-Type": f"multipart/form-data; boundary={limite}"})
+
+    ACCIONES = {
+        "recibidos_pendientes": recibidos_pendientes,
+        "emitidos": emitidos,
+        "pagados": pagados,
+        "pendientes": pendientes_todos,
+        "pagar": pagar,
+        "transferir": transferir,
+        "dashboard": dashboard,
+        "top_deudores": top_deudores,
+        "resumen": resumen,
+        "importar_csv": importar_csv,
+        "login": login,
+    }
+
+    def run(self):
+        pesos = PESOS["admin" if self.admin else "usuario"]
+        nombres, valores = list(pesos), list(pesos.values())
+        try:
+            if not self.login():
+                return
+            while time.time() < self.fin:
+                self.ACCIONES[self.rnd.choices(nombres, valores)[0]](self)
+                if self.pausa:
+                    time.sleep(self.rnd.uniform(0, 2 * self.pausa))
+        finally:
+            self.http.cerrar()
@@ -1,8 +1,34 @@
 #!/usr/bin/env sh
 set -e
 
-python manage.py migrate --noinput
-python manage.py collectstatic --noinput
+# Origen del informe de arranque de gunicorn.conf.py (tiempo hasta la primera petición)
+ARRANQUE_TS="$(date +%s.%N)"
+export ARRANQUE_TS
+
+# collectstatic ya se hizo al construir la imagen (Dockerfile).
+# MIGRATE_MODE:
+#   auto (por defecto) → migrate solo si `migrate --check` ve migraciones pendientes
+#   skip               → no tocar la BD (las aplica un job aparte con MIGRATE_MODE=only)
+#   only               → migrar y salir (job/release de un solo uso antes de escalar)
+case "${MIGRATE_MODE:-auto}" in
+  only)
+    exec python manage.py migrate --noinput
+    ;;
+  skip)
+    ;;
+  *)
+    if ! python manage.py migrate --check >/dev/null 2>&1; then
+      python manage.py migrate --noinput
+    fi
+    ;;
+esac
 
 : "${PORT:=8000}"
-gunicorn sist_rec_api.wsgi:application --bind 0.0.0.0:$PORT --workers 3 --timeout 120
\ No newline at end of file
+export PORT
+# Workers, preload y hooks en gunicorn.conf.py
+# APP_SERVER=asgi → workers uvicorn (necesario para /api/events/, SSE)
+if [ "${APP_SERVER:-wsgi}" = "asgi" ]; then
+  exec gunicorn sist_rec_api.asgi:application -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker
+else
+  exec gunicorn sist_rec_api.wsgi:application -c gunicorn.conf.py
+fi
@@ -0,0 +1,66 @@
+"""
+Configuración de gunicorn (la usa entrypoint.sh; gunicorn también la lee sola desde /app).
+
+- preload_app: Django y las apps se importan una vez en el master y los workers
+  nacen con fork ya cargados, así un worker nuevo atiende en milisegundos.
+- gc.freeze() antes de cada fork: los objetos del master pasan a la generación permanente
+  y el GC de los workers no los recorre ni les toca el refcount de cabecera, así que las
+  páginas de memoria se siguen compartiendo (copy-on-write) en vez de copiarse.
+- Informe de arranque en el log: import de la app, worker listo y primera petición,
+  medidos desde ARRANQUE_TS (lo exporta entrypoint.sh) o desde que se cargó este archivo.
+- worker_exit vuelca el búfer de auditoría al parar un worker.
+"""
+import gc
+import os
+import sys
+import time
+
+_CARGA = time.time()
+_ORIGEN = float(os.environ.get("ARRANQUE_TS") or _CARGA)
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "3"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+accesslog = os.environ.get("GUNICORN_ACCESSLOG") or None
+
+
+def _seg(desde):
+    return f"{time.time() - desde:.3f}s"
+
+
+def when_ready(server):
+    server.log.info("Arranque: master listo en %s (app %s)", _seg(_ORIGEN),
+                    "precargada" if server.cfg.preload_app else "sin precargar")
+
+
+def pre_fork(server, worker):
+    if server.cfg.preload_app:
+        # Una conexión abierta durante el import no debe compartirse entre procesos
+        from django.db import connections
+        connections.close_all()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    worker._nacido = time.time()
+
+
+def post_worker_init(worker):
+    worker.log.info("Arranque: worker %s listo en %s desde el fork (%s desde el inicio)",
+                    worker.pid, _seg(worker._nacido), _seg(_ORIGEN))
+
+
+def worker_exit(server, worker):
+    # Lo que quede en el búfer de auditoría (atexit no corre si el worker sale con os._exit)
+    auditoria = sys.modules.get("usuarios_log.auditoria")
+    if auditoria is not None:
+        auditoria.vaciar()
+
+
+def pre_request(worker, req):
+    # Solo workers sync/gthread: el worker uvicorn no llama a este hook
+    if not getattr(worker, "_primera_servida", False):
+        worker._primera_servida = True
+        worker.log.info("Arranque: worker %s, primera petición a %s del inicio (%s desde el fork)",
+                        worker.pid, _seg(_ORIGEN), _seg(worker._nacido))
@@ -1,21 +1,18 @@
 from django.contrib import admin
 from .models import Recibo
+from .busqueda import buscar
 
 @admin.register(Recibo)
 class ReciboAdmin(admin.ModelAdmin):
     list_display = (
         "id", "emisor", "receptor", "monto",
-        "status", "fecha", "pagado_en", "creado_en",
+        "status", "fecha", "vence_en", "vencido", "pagado_en", "creado_en",
     )
     list_filter = (
-        "status",
+        "status", "vencido",
         ("fecha", admin.DateFieldListFilter),
     )
-    search_fields = (
-        "descripcion",
-        "emisor__username", "emisor__first_name", "emisor__last_name",
-        "receptor__username", "receptor__first_name", "receptor__last_name",
-    )
+    search_fields = ("descripcion", "partes")
     autocomplete_fields = ("emisor", "receptor")
     readonly_fields = ("pagado_en", "creado_en")
     date_hierarchy = "fecha"
@@ -30,6 +27,10 @@ class ReciboAdmin(admin.ModelAdmin):
         self.message_user(request, f"{count} recibo(s) marcados como pagados.")
     marcar_pagado.short_description = "Marcar como pagado (solo PENDIENTE)"
 
+    def get_search_results(self, request, queryset, search_term):
+        # FULLTEXT sobre descripcion + partes en vez de LIKE '%term%' con joins
+        return buscar(queryset, search_term), False
+
     def save_model(self, request, obj, form, change):
         if not change and not obj.emisor_id:
             obj.emisor = request.user
@@ -0,0 +1,106 @@
+"""
+Archivo de recibos PAGADOS antiguos.
+
+`archivar_lote` mueve un lote de Recibo (+ su Transferencia) a ReciboArchivado /
+TransferenciaArchivada dentro de una transacción: copia y borra, o nada. Así el
+comando `archivar_recibos` se puede cortar y relanzar sin perder ni duplicar filas.
+
+Lectura unificada: `fuentes_recibos` / `fuentes_transferencias` devuelven los
+querysets vivos y, si se pide, también los archivados; las stats agregan sobre todos.
+"""
+from django.db import transaction
+
+from transferencias.models import Transferencia, TransferenciaArchivada
+from . import cambios
+from .models import Cambio, Recibo, ReciboArchivado
+
+
+def incluir_archivo(request):
+    return (request.query_params.get("archivo") or "").lower() in ("1", "true", "si")
+
+
+def fuentes_recibos(incluir=False):
+    return [Recibo.objects.all(), ReciboArchivado.objects.all()] if incluir else [Recibo.objects.all()]
+
+
+def fuentes_transferencias(incluir=False):
+    if incluir:
+        return [Transferencia.objects.all(), TransferenciaArchivada.objects.all()]
+    return [Transferencia.objects.all()]
+
+
+def agregar(querysets, **aggs):
+    """aggregate() sobre cada queryset y suma de los resultados."""
+    total = {k: 0 for k in aggs}
+    for qs in querysets:
+        for k, v in qs.aggregate(**aggs).items():
+            total[k] += v or 0
+    return total
+
+
+def combinar_series(series, clave):
+    """Une series agrupadas (.values(clave).annotate(...)) sumando las filas con la misma clave."""
+    filas = {}
+    for serie in series:
+        for row in serie:
+            if row[clave] in filas:
+                acumulada = filas[row[clave]]
+                for k, v in row.items():
+                    if k != clave:
+                        acumulada[k] = (acumulada[k] or 0) + (v or 0)
+            else:
+                filas[row[clave]] = dict(row)
+    return [filas[k] for k in sorted(filas)]
+
+
+class ArchivoViewMixin:
+    """
+    ?archivo=1 en list/retrieve cambia el queryset y el serializer por los del archivo.
+    El resto (scoping, filtros, ?fields=, ETag) se aplica igual porque usa get_queryset().
+    """
+    queryset_archivo = None
+    serializer_class_archivo = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in ("list", "retrieve") and incluir_archivo(request):
+            self.queryset = self.queryset_archivo
+            self.serializer_class = self.serializer_class_archivo
+
+
+def _copia(obj, modelo):
+    nombres = {f.attname for f in modelo._meta.concrete_fields}
+    return modelo(**{
+        f.attname: getattr(obj, f.attname)
+        for f in obj._meta.concrete_fields if f.attname in nombres
+    })
+
+
+def candidatos(corte):
+    return Recibo.objects.filter(status=Recibo.Status.PAGADO, fecha__lt=corte)
+
+
+def archivar_lote(corte, lote=1000):
+    """Archiva hasta `lote` recibos pagados con fecha < corte. Devuelve cuántos movió."""
+    ids = list(candidatos(corte).order_by("pk").values_list("pk", flat=True)[:lote])
+    if not ids:
+        return 0
+
+    with transaction.atomic():
+        recibos = list(candidatos(corte).select_for_update().filter(pk__in=ids))
+        ids = [r.pk for r in recibos]
+        transferencias = list(Transferencia.objects.filter(recibo_id__in=ids))
+
+        ReciboArchivado.objects.bulk_create([_copia(r, ReciboArchivado) for r in recibos])
+        TransferenciaArchivada.objects.bulk_create(
+            [_copia(t, TransferenciaArchivada) for t in transferencias]
+        )
+        # En el feed de cambios queda como 'archived', no como 'deleted'
+        with cambios.sin_registro():
+            Transferencia.objects.filter(recibo_id__in=ids).delete()
+            Recibo.objects.filter(pk__in=ids).delete()
+        cambios.registrar_lote([
+            cambios.nuevo(Cambio.Entidad.RECIBO, Cambio.Accion.ARCHIVADO, r.pk, r.emisor_id, r.receptor_id)
+            for r in recibos
+        ])
+    return len(ids)
@@ -0,0 +1,101 @@
+"""
+Efectos secundarios para escrituras en bloque.
+
+bulk_create / bulk_update / update() no disparan signals, así que quien los usa
+llama aquí para mantener lo mismo que mantienen los signals de recibos/signals.py:
+SaldoPendiente (siempre), el feed de cambios, la auditoría y los eventos SSE (salvo `sin_registro`).
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from usuarios_log import auditoria
+
+from . import cambios, eventos, ranking
+from .models import Cambio
+
+
+def recibos_creados(recibos):
+    """
+    Recibos recién insertados con bulk_create, ya con pk (en MySQL, recuperados con
+    `asignar_ids_en_orden`).
+    """
+    ranking.ajustar_lote(ranking.deltas_de(recibos))
+    if cambios.silenciado():
+        return
+    lote, auditados = [], []
+    for r in recibos:
+        datos = cambios.instantanea(r, cambios.CAMPOS_RECIBO)
+        auditados.append(("recibo.created", "recibo", r.pk, datos))
+        lote.append(cambios.nuevo(Cambio.Entidad.RECIBO, Cambio.Accion.CREADO, r.pk, r.emisor_id, r.receptor_id, datos))
+        eventos.publicar("recibo.created", (r.emisor_id, r.receptor_id), datos)
+    cambios.registrar_lote(lote)
+    auditoria.registrar_lote(auditados)
+
+
+def recibos_pagados(recibos):
+    """Recibos que estaban PENDIENTES y se marcaron PAGADO en bloque (ya con los valores nuevos)."""
+    deltas = defaultdict(lambda: (Decimal("0"), 0))
+    for r in recibos:
+        total, count = deltas[r.receptor_id]
+        deltas[r.receptor_id] = (total - r.monto, count - 1)
+    ranking.ajustar_lote(dict(deltas))
+    if cambios.silenciado():
+        return
+    lote, auditados = [], []
+    for r in recibos:
+        datos = cambios.instantanea(r, cambios.CAMPOS_RECIBO)
+        lote.append(cambios.nuevo(Cambio.Entidad.RECIBO, Cambio.Accion.PAGADO, r.pk, r.emisor_id, r.receptor_id, datos))
+        auditados.append(("recibo.paid", "recibo", r.pk, datos))
+        eventos.publicar("recibo.paid", (r.emisor_id, r.receptor_id), datos)
+    cambios.registrar_lote(lote)
+    auditoria.registrar_lote(auditados)
+
+
+def transferencias_creadas(transferencias, recibos):
+    """`recibos`: {recibo_id: Recibo} para conocer emisor/receptor sin más consultas."""
+    if cambios.silenciado():
+        return
+    lote, auditados = [], []
+    for t in transferencias:
+        r = recibos[t.recibo_id]
+        datos = cambios.instantanea(t, cambios.CAMPOS_TRANSFERENCIA)
+        lote.append(cambios.nuevo(
+            Cambio.Entidad.TRANSFERENCIA, Cambio.Accion.CREADO, t.pk, r.emisor_id, r.receptor_id, datos,
+        ))
+        auditados.append(("transferencia.created", "transferencia", t.pk, datos))
+        eventos.publicar("transferencia.created", (r.emisor_id, r.receptor_id, t.pagador_id), datos)
+    cambios.registrar_lote(lote)
+    auditoria.registrar_lote(auditados)
+
+
+def asignar_ids(objetos, modelo, campo, lote=1000):
+    """
+    Tras bulk_create en backends que no devuelven filas (MySQL), recupera los pk
+    por un campo único (`campo`) en una consulta por lote.
+    """
+    sin_pk = [o for o in objetos if o.pk is None]
+    for i in range(0, len(sin_pk), lote):
+        tramo = sin_pk[i:i + lote]
+        ids = dict(
+            modelo.objects.filter(**{f"{campo}__in": [getattr(o, campo) for o in tramo]})
+            .values_list(campo, "pk")
+        )
+        for o in tramo:
+            o.pk = ids.get(getattr(o, campo))
+
+
+def asignar_ids_en_orden(objetos, qs):
+    """
+    Como `asignar_ids` cuando no hay campo único: `qs` son exactamente las filas recién
+    insertadas (p. ej. filtradas por una marca de lote). MySQL da el autoincremento en
+    orden dentro de cada INSERT y bulk_create inserta en el orden de la lista, así que
+    los pk ascendentes corresponden a los objetos en ese orden.
+    """
+    sin_pk = [o for o in objetos if o.pk is None]
+    if not sin_pk:
+        return
+    ids = list(qs.order_by("pk").values_list("pk", flat=True))
+    if len(ids) != len(sin_pk):
+        raise RuntimeError(f"Se esperaban {len(sin_pk)} filas del lote y hay {len(ids)}.")
+    for o, pk in zip(sin_pk, ids):
+        o.pk = pk
@@ -0,0 +1,48 @@
+"""
+Búsqueda de texto sobre recibos (descripcion + partes).
+
+MySQL: MATCH ... AGAINST en modo booleano sobre el índice FULLTEXT recibo_busqueda_ft
+(reciboarch_busqueda_ft en el archivo), cada término obligatorio y por prefijo.
+Otros backends (SQLite en pruebas): icontains.
+"""
+import re
+
+from django.db import connections
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+# innodb_ft_min_token_size por defecto: los términos más cortos no están en el índice
+MIN_TOKEN = 3
+_OPERADORES = re.compile(r'[+\-<>()~*"@]+')
+
+
+def terminos(q):
+    return [t for t in _OPERADORES.sub(" ", q or "").split() if t][:10]
+
+
+def buscar(qs, q):
+    """Filtra `qs` (Recibo o ReciboArchivado) por todos los términos de `q`."""
+    palabras = terminos(q)
+    if not palabras:
+        return qs
+
+    if connections[qs.db].vendor != "mysql":
+        for t in palabras:
+            qs = qs.filter(Q(descripcion__icontains=t) | Q(partes__icontains=t))
+        return qs
+
+    largas = [t for t in palabras if len(t) >= MIN_TOKEN]
+    if largas:
+        tabla = connections[qs.db].ops.quote_name(qs.model._meta.db_table)
+        qs = qs.alias(
+            relevancia=RawSQL(
+                f"MATCH ({tabla}.descripcion, {tabla}.partes) AGAINST (%s IN BOOLEAN MODE)",
+                [" ".join(f"+{t}*" for t in largas)],
+                output_field=FloatField(),
+            )
+        ).filter(relevancia__gt=0)
+    # Términos cortos: no están en el índice; se filtran sobre el resultado del MATCH
+    for t in palabras:
+        if len(t) < MIN_TOKEN:
+            qs = qs.filter(Q(descripcion__icontains=t) | Q(partes__icontains=t))
+    return qs
@@ -0,0 +1,152 @@
+"""
+Feed de cambios: escritura (desde signals o en bloque) y lectura por cursor.
+
+El cursor no es el id: el id se reparte al insertar y una transacción larga puede
+confirmar ids menores cuando los lectores ya los pasaron. `sellar()` numera
+(Cambio.secuencia) solo entradas ya confirmadas y en orden de commit, y `leer()`
+recorre esa secuencia. `purgar()` deja en SecuenciaCambios.purgada_hasta la mayor
+secuencia borrada: un cursor anterior a esa marca puede haber perdido entradas.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Q
+from django.db.models.functions import Greatest
+
+from .models import Cambio, SecuenciaCambios
+
+CAMPOS_RECIBO = ("id", "emisor_id", "receptor_id", "monto", "fecha", "descripcion",
+                 "status", "pagado_en", "creado_en", "vence_en", "vencido")
+CAMPOS_TRANSFERENCIA = ("id", "recibo_id", "pagador_id", "monto", "fecha", "referencia", "nota")
+
+_silenciado = ContextVar("cambios_silenciados", default=False)
+
+
+@contextmanager
+def sin_registro():
+    """Desactiva el registro por signals (p. ej. el archivo registra 'archived' en bloque)."""
+    token = _silenciado.set(True)
+    try:
+        yield
+    finally:
+        _silenciado.reset(token)
+
+
+def silenciado():
+    return _silenciado.get()
+
+
+def instantanea(obj, campos):
+    return {c.removesuffix("_id") if c != "id" else c: getattr(obj, c) for c in campos}
+
+
+def nuevo(entidad, accion, objeto_id, emisor_id, receptor_id, datos=None):
+    return Cambio(
+        entidad=entidad, accion=accion, objeto_id=objeto_id,
+        emisor_id=emisor_id, receptor_id=receptor_id, datos=datos,
+    )
+
+
+def registrar(*args, **kwargs):
+    nuevo(*args, **kwargs).save()
+
+
+def registrar_lote(cambios, lote=1000):
+    Cambio.objects.bulk_create(cambios, batch_size=lote)
+
+
+def visibles(user):
+    qs = Cambio.objects.all()
+    if getattr(user, "role", 0) != 1 and not user.is_superuser:
+        qs = qs.filter(Q(emisor_id=user.id) | Q(receptor_id=user.id))
+    return qs
+
+
+def sellar(lote=5000):
+    """
+    Asigna secuencia a las entradas confirmadas que aún no la tienen. El bloqueo de la
+    fila de SecuenciaCambios dura hasta el commit, así que los sellados se serializan y
+    los números crecen en orden de commit. Las entradas de transacciones abiertas están
+    bloqueadas (MySQL, se saltan) o no son visibles (PostgreSQL): quedan para un sellado
+    posterior, con números mayores que lo ya entregado. Devuelve cuántas numeró.
+
+    Antes de bloquear mira (sin bloqueo, por el índice de secuencia) si hay algo que
+    numerar: los lectores del feed que no encuentran nada no hacen cola en el contador.
+    """
+    saltar = connection.features.has_select_for_update_skip_locked
+    total = 0
+    while True:
+        if not Cambio.objects.filter(secuencia=None).exists():
+            return total
+        with transaction.atomic():
+            contador, _ = SecuenciaCambios.objects.select_for_update().get_or_create(pk=1)
+            ids = list(
+                Cambio.objects.filter(secuencia=None).select_for_update(skip_locked=saltar)
+                .order_by("id").values_list("id", flat=True)[:lote]
+            )
+            if not ids:
+                return total
+            # Un solo UPDATE: secuencia = id + desplazamiento (crece con el id; puede dejar huecos)
+            base = contador.ultima + 1 - ids[0]
+            Cambio.objects.filter(id__in=ids).update(secuencia=F("id") + base)
+            contador.ultima = ids[-1] + base
+            contador.save(update_fields=["ultima"])
+        total += len(ids)
+        if len(ids) < lote:
+            return total
+
+
+def cursor_actual():
+    """Última secuencia entregable (tras sellar lo pendiente)."""
+    sellar()
+    return SecuenciaCambios.objects.filter(pk=1).values_list("ultima", flat=True).first() or 0
+
+
+def purgada_hasta():
+    """Mayor secuencia borrada por `purgar()`: los cursores menores han perdido entradas."""
+    return SecuenciaCambios.objects.filter(pk=1).values_list("purgada_hasta", flat=True).first() or 0
+
+
+def version():
+    """
+    Versión de todo el feed, para validadores ETag de alcance completo (admins). Cada alta,
+    edición, pago, baja o archivado deja una entrada, así que cualquier cambio la mueve
+    sin COUNT de las tablas: la mayor secuencia (índice único) y las entradas aún sin
+    sellar (pocas: lo confirmado desde el último sellado).
+    """
+    sellada = Cambio.objects.aggregate(m=Max("secuencia"))["m"]
+    pendientes = Cambio.objects.filter(secuencia=None).aggregate(n=Count("id"), ult=Max("id"))
+    return f"feed:{sellada}:{pendientes['n']}:{pendientes['ult']}"
+
+
+def leer(user, since, limit):
+    """Entradas con secuencia > since visibles para el usuario, en orden de commit."""
+    sellar()
+    filas = list(
+        visibles(user).filter(secuencia__gt=since)
+        .order_by("secuencia")
+        .values("id", "secuencia", "entidad", "objeto_id", "accion", "datos", "creado_en")[:limit + 1]
+    )
+    return filas[:limit], len(filas) > limit
+
+
+def purgar(antes_de, lote=5000):
+    """
+    Borra (en lotes) entradas selladas anteriores a `antes_de`. Cada lote sube antes
+    purgada_hasta en la misma transacción, así ningún lector ve el hueco sin la marca.
+    Devuelve cuántas borró.
+    """
+    total = 0
+    while True:
+        filas = list(
+            Cambio.objects.filter(creado_en__lt=antes_de, secuencia__isnull=False)
+            .order_by("secuencia").values_list("id", "secuencia")[:lote]
+        )
+        if not filas:
+            return total
+        with transaction.atomic():
+            SecuenciaCambios.objects.filter(pk=1).update(
+                purgada_hasta=Greatest("purgada_hasta", filas[-1][1])
+            )
+            total += Cambio.objects.filter(id__in=[i for i, _ in filas]).delete()[0]
@@ -0,0 +1,188 @@
+"""
+Comprobantes imprimibles de recibos pagados, en un ZIP de HTML (listos para imprimir o
+pasar a PDF) que se genera en streaming.
+
+- Datos: una consulta .values() por fuente (vivos y, si se pide, archivados) con el JOIN
+  a emisor, receptor y transferencia. Nº de consultas fijo sea cual sea el lote.
+- Render: la plantilla se compila una vez por proceso (`_plantilla`). Con lotes de
+  COMPROBANTES_POOL_MINIMO o más se reparte entre procesos (sist_rec_api.pool).
+- ZIP: se escribe sobre un flujo no posicionable (descriptores de datos), así sale hacia
+  el cliente por trozos a medida que se comprime, sin armarlo entero; al final va indice.csv.
+"""
+import csv
+import datetime
+import functools
+import heapq
+import io
+import zipfile
+
+from django.conf import settings
+from django.db.models import F
+from django.template import engines
+from django.utils import timezone
+
+from sist_rec_api import pool
+
+from .archivo import fuentes_recibos
+from .models import Recibo
+
+TROZO = 64 * 1024  # bytes por trozo de la respuesta
+
+PERSONA = ("username", "first_name", "last_name", "email")
+CAMPOS = (
+    "id", "fecha", "monto", "descripcion", "status", "pagado_en", "vence_en",
+    *(f"emisor__{c}" for c in PERSONA),
+    *(f"receptor__{c}" for c in PERSONA),
+    "transferencia__id", "transferencia__fecha", "transferencia__monto",
+    "transferencia__referencia", "transferencia__nota",
+)
+
+
+def _rango_local(desde, hasta):
+    """Días locales [desde, hasta] → datetimes aware [inicio, fin) para filtrar por recibo_pagado_idx."""
+    zona = timezone.get_current_timezone()
+    inicio = desde and datetime.datetime.combine(desde, datetime.time.min, zona)
+    fin = hasta and datetime.datetime.combine(hasta + datetime.timedelta(days=1), datetime.time.min, zona)
+    return inicio, fin
+
+
+def rango_mes(mes):
+    """'YYYY-MM' → (primer día, último día). ValueError si no es válido."""
+    inicio = datetime.datetime.strptime(mes, "%Y-%m").date()
+    siguiente = (inicio.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return inicio, siguiente - datetime.timedelta(days=1)
+
+
+def filas(desde=None, hasta=None, emisor=None, receptor=None, archivo=False):
+    """
+    Recibos PAGADOS con pagado_en entre los días `desde` y `hasta` (incluidos), por orden
+    de pago. Devuelve un iterador de dicts (se pueden enviar por pickle a otros procesos).
+    """
+    inicio, fin = _rango_local(desde, hasta)
+    consultas = []
+    for qs, archivado in zip(fuentes_recibos(archivo), (False, True)):
+        qs = qs.filter(status=Recibo.Status.PAGADO)
+        if inicio:
+            qs = qs.filter(pagado_en__gte=inicio)
+        if fin:
+            qs = qs.filter(pagado_en__lt=fin)
+        if emisor:
+            qs = qs.filter(emisor_id=emisor)
+        if receptor:
+            qs = qs.filter(receptor_id=receptor)
+        filas_qs = (
+            qs.order_by(F("pagado_en").asc(nulls_first=True), "id")
+            .values(*CAMPOS).iterator(chunk_size=2000)
+        )
+        consultas.append(({**f, "archivado": archivado} for f in filas_qs))
+    return heapq.merge(*consultas, key=_orden)
+
+
+def _orden(fila):
+    return (fila["pagado_en"] is not None, fila["pagado_en"] or datetime.datetime.min, fila["id"])
+
+
+@functools.cache
+def _plantilla():
+    return engines["django"].get_template("recibos/comprobante.html")
+
+
+def _pesos(valor):
+    return None if valor is None else f"${valor:,.2f}"
+
+
+def _persona(fila, prefijo):
+    nombre = f"{fila[prefijo + 'first_name']} {fila[prefijo + 'last_name']}".strip()
+    return {
+        "username": fila[prefijo + "username"],
+        "nombre": nombre or fila[prefijo + "username"],
+        "email": fila[prefijo + "email"],
+    }
+
+
+def nombre_archivo(fila):
+    return f"recibo-{fila['id']:08d}.html"
+
+
+def renderizar(fila):
+    """(nombre en el ZIP, HTML en bytes) de un comprobante. Sin acceso a la BD."""
+    transferencia = None
+    if fila["transferencia__id"] is not None:
+        transferencia = {
+            "id": fila["transferencia__id"],
+            "fecha": fila["transferencia__fecha"],
+            "monto": _pesos(fila["transferencia__monto"]),
+            "referencia": fila["transferencia__referencia"],
+            "nota": fila["transferencia__nota"],
+        }
+    contexto = {
+        "r": {
+            "id": fila["id"],
+            "archivado": fila["archivado"],
+            "status_display": Recibo.Status(fila["status"]).label,
+            "fecha": fila["fecha"],
+            "vence_en": fila["vence_en"],
+            "monto": _pesos(fila["monto"]),
+            "descripcion": fila["descripcion"],
+            "pagado_en": fila["pagado_en"],
+            "emisor": _persona(fila, "emisor__"),
+            "receptor": _persona(fila, "receptor__"),
+            "transferencia": transferencia,
+        },
+        "generado": timezone.now(),
+    }
+    return nombre_archivo(fila), _plantilla().render(contexto).encode()
+
+
+class _Salida(io.RawIOBase):
+    """Flujo de solo escritura que acumula lo que escribe zipfile hasta que se recoge."""
+
+    def __init__(self):
+        self.partes = []
+        self.pendiente = 0
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        self.pendiente += len(datos)
+        return len(datos)
+
+    def recoger(self):
+        datos = b"".join(self.partes)
+        self.partes.clear()
+        self.pendiente = 0
+        return datos
+
+
+def _indice(filas_indice):
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow(["archivo", "recibo_id", "pagado_en", "emisor", "receptor", "monto", "referencia"])
+    w.writerows(filas_indice)
+    return buf.getvalue().encode("utf-8-sig")
+
+
+def generar_zip(filas_iter):
+    """Bytes del ZIP a medida que se van renderizando los comprobantes."""
+    salida = _Salida()
+    indice = []
+    zona = timezone.get_current_timezone()
+
+    def con_indice(filas_iter):
+        for f in filas_iter:
+            indice.append([
+                nombre_archivo(f), f["id"], f["pagado_en"] and f["pagado_en"].astimezone(zona).isoformat(),
+                f["emisor__username"], f["receptor__username"], f["monto"], f["transferencia__referencia"] or "",
+            ])
+            yield f
+
+    with zipfile.ZipFile(salida, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        comprobantes = pool.iterar(renderizar, con_indice(filas_iter), minimo=settings.COMPROBANTES_POOL_MINIMO)
+        for nombre, html in comprobantes:
+            zf.writestr(nombre, html)
+            if salida.pendiente >= TROZO:
+                yield salida.recoger()
+        zf.writestr("indice.csv", _indice(indice))
+    yield salida.recoger()
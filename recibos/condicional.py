@@ -0,0 +1,98 @@
+"""
+GET condicional (ETag / Last-Modified) para listados y stats.
+
+- Usuarios: el validador de cada fuente es (COUNT, MAX(actualizado_en)) sobre el queryset
+  ya acotado al usuario: altas y ediciones mueven el MAX (auto_now) y las bajas el COUNT.
+  Con ?expand= también cuentan las filas relacionadas (fuente_listado); un renombre de
+  usuario sube actualizado_en de sus recibos (signals.actualizar_partes).
+- Admins: su alcance es toda la tabla y ese COUNT no es barato; se usa la versión del
+  feed de cambios (cambios.version), que se mueve con cualquier alta, edición o baja.
+- Last-Modified solo en el detalle: en un listado una baja no mueve MAX(actualizado_en)
+  y un If-Modified-Since daría 304 con datos viejos.
+Si el cliente manda If-None-Match / If-Modified-Since y coinciden, se responde
+304 sin ejecutar la consulta principal ni el serializer.
+"""
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from . import cambios
+
+
+def validador(*querysets):
+    """Devuelve (firma, ultima_modificacion) para los querysets dados."""
+    partes, ultima = [], None
+    for qs in querysets:
+        agg = qs.order_by().aggregate(n=Count("pk"), ult=Max("actualizado_en"))
+        partes.append(f'{qs.model._meta.label}:{agg["n"]}:{agg["ult"] and agg["ult"].isoformat()}')
+        if agg["ult"] and (ultima is None or agg["ult"] > ultima):
+            ultima = agg["ult"]
+    return "|".join(partes), ultima
+
+
+def _es_admin(user):
+    return getattr(user, "role", 0) == 1 or user.is_superuser
+
+
+def condicional(fuentes, detalle=False):
+    """
+    Decorador para handlers de ViewSet.
+    `fuentes(self, request, *args, **kwargs)` devuelve los querysets que determinan la respuesta.
+    `detalle`: un solo objeto; se valida siempre con sus filas y lleva Last-Modified.
+    """
+    def deco(func):
+        @wraps(func)
+        def wrapper(self, request, *args, **kwargs):
+            if detalle:
+                firma, ultima = validador(*fuentes(self, request, *args, **kwargs))
+            elif _es_admin(request.user):
+                firma, ultima = cambios.version(), None
+            else:
+                firma, ultima = validador(*fuentes(self, request, *args, **kwargs))[0], None
+            clave = "|".join([
+                func.__name__, str(request.user.pk), request.get_full_path(),
+                timezone.localdate().isoformat(),  # stats con "hoy" implícito (aging, año actual)
+                request.META.get("HTTP_ACCEPT", ""), firma,
+            ])
+            etag = quote_etag(hashlib.md5(clave.encode()).hexdigest())
+            last_modified = ultima and int(ultima.timestamp())
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = func(self, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+
+            response["ETag"] = etag
+            if last_modified:
+                response["Last-Modified"] = http_date(last_modified)
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ("Authorization", "Accept"))
+            return response
+        return wrapper
+    return deco
+
+
+def fuente_listado(view, request, *args, **kwargs):
+    """
+    El queryset del listado y, por cada relación de ?expand= cuya tabla lleva
+    actualizado_en (p. ej. la transferencia de un recibo), las filas relacionadas:
+    editarlas cambia la respuesta aunque el queryset principal no se mueva.
+    """
+    qs = view.filter_queryset(view.get_queryset())
+    fuentes = [qs]
+    for nombre in view._campos_y_expand()[1]:
+        campo = qs.model._meta.get_field(nombre)
+        modelo = campo.related_model
+        if any(f.name == "actualizado_en" for f in modelo._meta.concrete_fields):
+            fuentes.append(modelo.objects.filter(**{f"{campo.remote_field.name}__in": qs.order_by().values("pk")}))
+    return fuentes
+
+
+def fuente_detalle(view, request, *args, **kwargs):
+    lookup = view.lookup_url_kwarg or view.lookup_field
+    return [view.get_queryset().filter(**{view.lookup_field: kwargs[lookup]})]
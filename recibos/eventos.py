@@ -0,0 +1,195 @@
+"""
+Notificaciones push por Server-Sent Events (GET /api/events/, solo bajo ASGI).
+
+- `Hub`: reparto en proceso. Cada conexión SSE es una asyncio.Queue por usuario,
+  sin hilo por cliente: miles de conexiones ociosas cuestan una corrutina cada una.
+- Backend (settings.EVENTOS_BACKEND): cómo llega un evento publicado al Hub.
+    BackendLocal → mismo proceso (un worker, desarrollo, pruebas).
+    BackendRedis → pub/sub en REDIS_URL, para varios workers.
+- `publicar()` se llama desde código síncrono (signals) y se envía tras el commit.
+"""
+import asyncio
+import json
+import logging
+import threading
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+CANAL = "recibos:eventos"
+
+
+class Hub:
+    def __init__(self, max_pendientes=100):
+        self.max_pendientes = max_pendientes
+        self.loop = None
+        self._colas = {}  # user_id -> set(Queue)
+
+    def suscribir(self, user_id):
+        self.loop = asyncio.get_running_loop()
+        cola = asyncio.Queue(maxsize=self.max_pendientes)
+        self._colas.setdefault(user_id, set()).add(cola)
+        return cola
+
+    def desuscribir(self, user_id, cola):
+        colas = self._colas.get(user_id)
+        if colas:
+            colas.discard(cola)
+            if not colas:
+                del self._colas[user_id]
+
+    def conexiones(self):
+        return sum(len(c) for c in self._colas.values())
+
+    def entregar(self, evento):
+        """Reparte el evento a las colas de sus destinatarios (en el hilo del loop)."""
+        for user_id in evento["usuarios"]:
+            for cola in self._colas.get(user_id, ()):
+                if cola.full():  # cliente lento: se descarta el más antiguo
+                    cola.get_nowait()
+                cola.put_nowait(evento)
+
+    def entregar_desde_hilo(self, evento):
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.entregar, evento)
+
+
+hub = Hub()
+
+
+class BackendLocal:
+    """Entrega directa al Hub del proceso."""
+
+    def publicar(self, evento):
+        hub.entregar_desde_hilo(evento)
+
+    async def escuchar(self):
+        return None
+
+
+class BackendRedis:
+    """Pub/sub de Redis: cada worker escucha el canal y entrega a su propio Hub."""
+
+    def __init__(self):
+        import redis  # dependencia opcional
+        self._sync = redis.Redis.from_url(settings.REDIS_URL)
+        self._error = redis.RedisError
+        self._tarea = None
+
+    def publicar(self, evento):
+        # Se llama tras el commit: un Redis caído no debe convertir en error una escritura ya hecha
+        try:
+            self._sync.publish(CANAL, json.dumps(evento, cls=DjangoJSONEncoder))
+        except self._error:
+            logger.warning("No se pudo publicar el evento %s en Redis", evento["tipo"], exc_info=True)
+
+    async def _bucle(self):
+        import redis.asyncio as aioredis
+        pubsub = aioredis.Redis.from_url(settings.REDIS_URL).pubsub()
+        await pubsub.subscribe(CANAL)
+        async for msg in pubsub.listen():
+            if msg["type"] == "message":
+                hub.entregar(json.loads(msg["data"]))
+
+    async def escuchar(self):
+        if self._tarea is None or self._tarea.done():
+            self._tarea = asyncio.create_task(self._bucle())
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = import_string(settings.EVENTOS_BACKEND)()
+    return _backend
+
+
+def publicar(tipo, usuarios, datos):
+    """Publica `tipo` para los ids de `usuarios` cuando la transacción actual haga commit."""
+    evento = {"tipo": tipo, "usuarios": sorted({u for u in usuarios if u}), "datos": datos}
+    evento = json.loads(json.dumps(evento, cls=DjangoJSONEncoder))
+    # robust: si falla se registra y siguen los demás on_commit (la escritura ya está confirmada)
+    transaction.on_commit(lambda: backend().publicar(evento), robust=True)
+
+
+# ---------- ASGI ----------
+
+def _token(scope):
+    for nombre, valor in scope.get("headers", []):
+        if nombre == b"authorization":
+            tipo, _, token = valor.decode().partition(" ")
+            if tipo in ("Bearer",):
+                return token
+    # EventSource del navegador no permite cabeceras: ?token=<access>
+    return (parse_qs(scope.get("query_string", b"").decode()).get("token") or [None])[0]
+
+
+async def _usuario(scope):
+    from asgiref.sync import sync_to_async
+    from rest_framework_simplejwt.exceptions import InvalidToken, TokenError, AuthenticationFailed
+    from usuarios_log.autenticacion import JWTRevocable
+
+    raw = _token(scope)
+    if not raw:
+        return None
+    auth = JWTRevocable()  # la misma que la API: rechaza tokens revocados (puede consultar la BD)
+
+    def autenticar():
+        return auth.get_user(auth.get_validated_token(raw))
+
+    try:
+        return await sync_to_async(autenticar)()
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+async def _responder(send, status, cuerpo):
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": json.dumps(cuerpo).encode()})
+
+
+async def sse_app(scope, receive, send):
+    user = await _usuario(scope)
+    if user is None:
+        return await _responder(send, 401, {"detail": "Token inválido o ausente."})
+
+    await backend().escuchar()
+    cola = hub.suscribir(user.id)
+    desconectado = asyncio.Event()
+
+    async def vigilar():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        desconectado.set()
+
+    vigia = asyncio.create_task(vigilar())
+    try:
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"text/event-stream"),
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no"),
+        ]})
+        await send({"type": "http.response.body", "body": b"retry: 5000\n\n", "more_body": True})
+        while not desconectado.is_set():
+            try:
+                evento = await asyncio.wait_for(cola.get(), timeout=settings.EVENTOS_HEARTBEAT)
+                chunk = f"event: {evento['tipo']}\ndata: {json.dumps(evento['datos'])}\n\n"
+            except asyncio.TimeoutError:
+                chunk = ": ping\n\n"  # mantiene viva la conexión a través de proxies
+            await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+    except OSError:
+        pass
+    finally:
+        vigia.cancel()
+        hub.desuscribir(user.id, cola)
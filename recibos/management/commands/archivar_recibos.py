@@ -0,0 +1,46 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from recibos.archivo import archivar_lote, candidatos
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve recibos PAGADOS (y su transferencia) con fecha anterior al corte a las "
+        "tablas de archivo, en lotes transaccionales. Se puede interrumpir y relanzar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--antes-de", help="Fecha de corte YYYY-MM-DD (exclusiva).")
+        parser.add_argument("--dias", type=int, default=settings.ARCHIVO_DIAS,
+                            help="Antigüedad mínima en días si no se da --antes-de.")
+        parser.add_argument("--lote", type=int, default=1000)
+        parser.add_argument("--max-lotes", type=int, default=0, help="0 = sin límite.")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **opts):
+        if opts["antes_de"]:
+            try:
+                corte = datetime.date.fromisoformat(opts["antes_de"])
+            except ValueError:
+                raise CommandError("--antes-de debe ser YYYY-MM-DD")
+        else:
+            corte = timezone.localdate() - datetime.timedelta(days=opts["dias"])
+
+        if opts["dry_run"]:
+            self.stdout.write(f"{candidatos(corte).count()} recibo(s) pagados antes de {corte}.")
+            return
+
+        total = lotes = 0
+        while not opts["max_lotes"] or lotes < opts["max_lotes"]:
+            movidos = archivar_lote(corte, opts["lote"])
+            if not movidos:
+                break
+            total += movidos
+            lotes += 1
+            self.stdout.write(f"  lote {lotes}: {movidos} (acumulado {total})")
+
+        self.stdout.write(self.style.SUCCESS(f"{total} recibo(s) archivados (corte {corte})."))
@@ -0,0 +1,43 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recibos import vencimiento
+
+
+class Command(BaseCommand):
+    help = (
+        "Marca como vencidos los recibos PENDIENTES cuyo vence_en ya pasó (y desmarca los que "
+        "dejaron de estarlo), en UPDATEs por tramos. Pensado para cron cada pocos minutos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fecha", help="Día de referencia YYYY-MM-DD (por defecto hoy).")
+        parser.add_argument("--lote", type=int, default=5000)
+        parser.add_argument("--top", type=int, default=10, help="Receptores a listar (0 = ninguno).")
+
+    def handle(self, *args, **opts):
+        hoy = None
+        if opts["fecha"]:
+            try:
+                hoy = datetime.date.fromisoformat(opts["fecha"])
+            except ValueError:
+                raise CommandError("--fecha debe ser YYYY-MM-DD")
+
+        inicio = time.perf_counter()
+        marcados, desmarcados = vencimiento.barrer(hoy, opts["lote"])
+        barrido = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"{marcados} recibo(s) vencidos, {desmarcados} desmarcados en {barrido:.2f}s."
+        ))
+
+        if opts["top"]:
+            inicio = time.perf_counter()
+            filas = vencimiento.por_receptor()
+            consulta = time.perf_counter() - inicio
+            self.stdout.write(f"{len(filas)} receptor(es) con vencidos ({consulta:.2f}s):")
+            for f in filas[:opts["top"]]:
+                self.stdout.write(
+                    f"  {f['receptor__username']:<20} {f['count']:>7} {f['monto']:>14} desde {f['desde']}"
+                )
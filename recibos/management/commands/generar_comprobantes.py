@@ -0,0 +1,44 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recibos import comprobantes
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera un ZIP con un comprobante HTML por recibo PAGADO (filtrado por fecha de pago), "
+        "con el render repartido entre procesos en lotes grandes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--mes", help="YYYY-MM (fecha de pago).")
+        parser.add_argument("--desde", help="YYYY-MM-DD (incluido).")
+        parser.add_argument("--hasta", help="YYYY-MM-DD (incluido).")
+        parser.add_argument("--emisor", type=int)
+        parser.add_argument("--receptor", type=int)
+        parser.add_argument("--archivo", action="store_true", help="Incluye los recibos archivados.")
+        parser.add_argument("--salida", help="Ruta del ZIP (por defecto comprobantes-<mes|desde>.zip).")
+
+    def handle(self, *args, **opts):
+        try:
+            if opts["mes"]:
+                desde, hasta = comprobantes.rango_mes(opts["mes"])
+            else:
+                desde = opts["desde"] and datetime.date.fromisoformat(opts["desde"])
+                hasta = opts["hasta"] and datetime.date.fromisoformat(opts["hasta"])
+        except ValueError:
+            raise CommandError("--mes debe ser YYYY-MM y --desde/--hasta YYYY-MM-DD")
+
+        salida = opts["salida"] or f"comprobantes-{opts['mes'] or desde or 'todos'}.zip"
+        filas = comprobantes.filas(desde, hasta, opts["emisor"], opts["receptor"], opts["archivo"])
+        inicio = time.perf_counter()
+        tamano = 0
+        with open(salida, "wb") as f:
+            for trozo in comprobantes.generar_zip(filas):
+                f.write(trozo)
+                tamano += len(trozo)
+        self.stdout.write(self.style.SUCCESS(
+            f"{salida}: {tamano / 1024:.0f} KiB en {time.perf_counter() - inicio:.2f}s."
+        ))
@@ -0,0 +1,71 @@
+import gzip
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from recibos.models import Recibo
+from recibos.serializers import ReciboSerializer, filas_recibos
+from sist_rec_api import renderers
+from sist_rec_api.middleware import brotli
+
+
+def _cpu_ms(fn, repeticiones):
+    """Mejor tiempo de CPU (ms) de `repeticiones` ejecuciones y el resultado de la última."""
+    mejor, resultado = None, None
+    for _ in range(repeticiones):
+        inicio = time.process_time()
+        resultado = fn()
+        ms = (time.process_time() - inicio) * 1000
+        mejor = ms if mejor is None else min(mejor, ms)
+    return mejor, resultado
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara bytes y CPU de las respuestas del listado de recibos: ReciboSerializer + JSON de DRF "
+        "frente a filas de values_list() con JSON de DRF, orjson y MessagePack."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--n", type=int, default=10000, help="Recibos a serializar (los más recientes).")
+        parser.add_argument("--repeticiones", type=int, default=5)
+
+    def handle(self, *args, **opts):
+        rep = opts["repeticiones"]
+        base = Recibo.objects.order_by("-creado_en")
+        ids = list(base.values_list("id", flat=True)[:opts["n"]])
+        if not ids:
+            self.stdout.write(self.style.WARNING("No hay recibos (python manage.py sembrar_carga)."))
+            return
+        qs = base.filter(id__in=ids)
+
+        def con_serializer():
+            return ReciboSerializer(qs.select_related("emisor", "receptor"), many=True, context={}).data
+
+        variantes = [
+            ("serializer + json drf", con_serializer, JSONRenderer()),
+            ("filas + json drf", lambda: filas_recibos(qs), JSONRenderer()),
+            ("filas + orjson", lambda: filas_recibos(qs), renderers.JSONRapidoRenderer()),
+        ]
+        if renderers.msgpack is not None:
+            variantes.append((
+                "filas + msgpack",
+                lambda: filas_recibos(qs, dinero=renderers.a_centavos),
+                renderers.MsgPackRenderer(),
+            ))
+        else:
+            self.stdout.write(self.style.WARNING("msgpack no está instalado: se omite MessagePack."))
+
+        cols = ("datos_ms", "render_ms", "total_ms", "bytes", "gzip", "br")
+        self.stdout.write(f"{len(ids)} recibos, mejor de {rep} (CPU de este proceso; incluye leer las filas)")
+        self.stdout.write(f"{'':<24}" + "".join(f"{c:>11}" for c in cols))
+        for nombre, datos, renderer in variantes:
+            ms_datos, data = _cpu_ms(datos, rep)
+            ms_render, cuerpo = _cpu_ms(lambda: renderer.render(data, renderer.media_type), rep)
+            fila = (
+                f"{ms_datos:.1f}", f"{ms_render:.1f}", f"{ms_datos + ms_render:.1f}",
+                len(cuerpo), len(gzip.compress(cuerpo, 6)),
+                len(brotli.compress(cuerpo, quality=5)) if brotli else "-",
+            )
+            self.stdout.write(f"{nombre:<24}" + "".join(f"{v:>11}" for v in fila))
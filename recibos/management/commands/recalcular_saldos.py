@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from recibos.ranking import recalcular
+
+
+class Command(BaseCommand):
+    help = "Reconstruye SaldoPendiente (ranking de deudores) desde los recibos PENDIENTES."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--receptor", type=int, help="Solo este usuario.")
+
+    def handle(self, *args, **opts):
+        recalcular(opts["receptor"])
+        self.stdout.write(self.style.SUCCESS("Saldos recalculados."))
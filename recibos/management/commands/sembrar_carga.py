@@ -0,0 +1,84 @@
+import datetime
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from recibos import ranking
+from recibos.models import Recibo, construir_partes
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea usuarios y recibos de prueba para las pruebas de carga (python -m carga). "
+        "Todos los usuarios llevan el prefijo dado y la misma contraseña; <prefijo>admin es admin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--prefijo", default="carga")
+        parser.add_argument("--usuarios", type=int, default=200)
+        parser.add_argument("--recibos", type=int, default=20000)
+        parser.add_argument("--password", default="carga12345")
+        parser.add_argument("--pagados", type=float, default=0.5, help="Fracción de recibos ya pagados.")
+        parser.add_argument("--lote", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--limpiar", action="store_true",
+                            help="Borra antes los usuarios con el prefijo (y en cascada sus recibos).")
+
+    def handle(self, *args, **opts):
+        prefijo = opts["prefijo"]
+        rnd = random.Random(opts["seed"])
+
+        if opts["limpiar"]:
+            borrados, _ = User.objects.filter(username__startswith=prefijo).delete()
+            self.stdout.write(f"{borrados} fila(s) borradas.")
+
+        # Un solo hash para todos: con PBKDF2 hashear miles de contraseñas tardaría minutos
+        password = make_password(opts["password"])
+        nombres = [f"{prefijo}admin"] + [f"{prefijo}{i:05d}" for i in range(1, opts["usuarios"] + 1)]
+        existentes = set(User.objects.filter(username__in=nombres).values_list("username", flat=True))
+        User.objects.bulk_create([
+            User(username=n, password=password, email=f"{n}@carga.local", first_name="Carga",
+                 last_name=n[len(prefijo):], role=1 if n == f"{prefijo}admin" else 0)
+            for n in nombres if n not in existentes
+        ], batch_size=opts["lote"])
+        usuarios = list(User.objects.filter(username__in=nombres[1:]).only("id", "username", "first_name", "last_name"))
+        if len(usuarios) < 2:
+            self.stdout.write(self.style.WARNING("Hacen falta al menos 2 usuarios para crear recibos."))
+            return
+
+        hoy = timezone.localdate()
+        ahora = timezone.now()
+        creados = 0
+        while creados < opts["recibos"]:
+            lote = []
+            for _ in range(min(opts["lote"], opts["recibos"] - creados)):
+                emisor, receptor = rnd.sample(usuarios, 2)
+                pagado = rnd.random() < opts["pagados"]
+                fecha = hoy - datetime.timedelta(days=rnd.randint(0, 720))
+                # vencido queda en False: lo pone al día barrer_vencidos, como en producción
+                lote.append(Recibo(
+                    emisor_id=emisor.id, receptor_id=receptor.id,
+                    monto=Decimal(rnd.randint(100, 500000)) / 100,
+                    fecha=fecha, vence_en=fecha + datetime.timedelta(days=30),
+                    descripcion=f"Carga {creados + len(lote)}",
+                    status=Recibo.Status.PAGADO if pagado else Recibo.Status.PENDIENTE,
+                    pagado_en=ahora if pagado else None,
+                    partes=construir_partes(emisor, receptor),
+                ))
+            with transaction.atomic():
+                Recibo.objects.bulk_create(lote, batch_size=opts["lote"])
+            creados += len(lote)
+            self.stdout.write(f"  {creados}/{opts['recibos']} recibos")
+
+        # bulk_create no pasa por signals: el ranking se rehace de una vez
+        ranking.recalcular()
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(nombres) - len(existentes)} usuario(s) y {creados} recibo(s) creados (prefijo {prefijo!r})."
+        ))
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:55
+
+from django.db import migrations, models
+
+LOTE = 2000
+
+
+def rellenar_partes(apps, schema_editor):
+    Recibo = apps.get_model("recibos", "Recibo")
+    qs = Recibo.objects.using(schema_editor.connection.alias).select_related("emisor", "receptor").order_by("pk")
+    ultimo = 0
+    while True:
+        lote = list(qs.filter(pk__gt=ultimo)[:LOTE])
+        if not lote:
+            break
+        for r in lote:
+            textos = []
+            for u in (r.emisor, r.receptor):
+                textos += [u.username, u.first_name, u.last_name]
+            r.partes = " ".join(t for t in textos if t)[:255]
+        Recibo.objects.using(schema_editor.connection.alias).bulk_update(lote, ["partes"])
+        ultimo = lote[-1].pk
+
+
+def crear_fulltext(apps, schema_editor):
+    if schema_editor.connection.vendor == "mysql":
+        schema_editor.execute(
+            "CREATE FULLTEXT INDEX recibo_busqueda_ft ON recibos_recibo (descripcion, partes)"
+        )
+
+
+def borrar_fulltext(apps, schema_editor):
+    if schema_editor.connection.vendor == "mysql":
+        schema_editor.execute("DROP INDEX recibo_busqueda_ft ON recibos_recibo")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0002_recibo_actualizado_en'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recibo',
+            name='partes',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(rellenar_partes, migrations.RunPython.noop),
+        migrations.RunPython(crear_fulltext, borrar_fulltext),
+    ]
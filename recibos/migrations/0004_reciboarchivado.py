@@ -0,0 +1,46 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def crear_fulltext(apps, schema_editor):
+    if schema_editor.connection.vendor == "mysql":
+        schema_editor.execute(
+            "CREATE FULLTEXT INDEX reciboarch_busqueda_ft ON recibos_reciboarchivado (descripcion, partes)"
+        )
+
+
+def borrar_fulltext(apps, schema_editor):
+    if schema_editor.connection.vendor == "mysql":
+        schema_editor.execute("DROP INDEX reciboarch_busqueda_ft ON recibos_reciboarchivado")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0003_recibo_partes_busqueda'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReciboArchivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('monto', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('fecha', models.DateField(db_index=True)),
+                ('descripcion', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('PENDING', 'Pendiente'), ('PAID', 'Pagado')], default='PAID', max_length=10)),
+                ('pagado_en', models.DateTimeField(blank=True, null=True)),
+                ('creado_en', models.DateTimeField()),
+                ('actualizado_en', models.DateTimeField(db_index=True)),
+                ('partes', models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255)),
+                ('archivado_en', models.DateTimeField(auto_now_add=True)),
+                ('emisor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recibos_archivados_emitidos', to=settings.AUTH_USER_MODEL)),
+                ('receptor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recibos_archivados_recibidos', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(crear_fulltext, borrar_fulltext),
+    ]
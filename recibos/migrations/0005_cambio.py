@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:00
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0004_reciboarchivado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Cambio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entidad', models.CharField(choices=[('recibo', 'Recibo'), ('transferencia', 'Transferencia')], max_length=20)),
+                ('objeto_id', models.BigIntegerField()),
+                ('accion', models.CharField(choices=[('created', 'Creado'), ('updated', 'Editado'), ('paid', 'Pagado'), ('deleted', 'Borrado'), ('archived', 'Archivado')], max_length=10)),
+                ('emisor_id', models.BigIntegerField(null=True)),
+                ('receptor_id', models.BigIntegerField(null=True)),
+                ('datos', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('creado_en', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['emisor_id', 'id'], name='cambio_emisor_idx'), models.Index(fields=['receptor_id', 'id'], name='cambio_receptor_idx')],
+            },
+        ),
+    ]
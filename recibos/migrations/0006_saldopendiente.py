@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def poblar_saldos(apps, schema_editor):
+    Recibo = apps.get_model("recibos", "Recibo")
+    SaldoPendiente = apps.get_model("recibos", "SaldoPendiente")
+    db = schema_editor.connection.alias
+    filas = (
+        Recibo.objects.using(db).filter(status="PENDING")
+        .values("receptor_id").annotate(total=Sum("monto"), count=Count("id"))
+    )
+    SaldoPendiente.objects.using(db).bulk_create(
+        [SaldoPendiente(receptor_id=f["receptor_id"], total=f["total"], count=f["count"]) for f in filas],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0005_cambio'),
+        ('usuarios_log', '0002_user_directorio_indices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoPendiente',
+            fields=[
+                ('receptor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='saldo_pendiente', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['total', 'receptor'], name='saldo_total_idx')],
+            },
+        ),
+        migrations.RunPython(poblar_saldos, migrations.RunPython.noop),
+    ]
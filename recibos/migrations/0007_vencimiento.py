@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0006_saldopendiente'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recibo',
+            name='vence_en',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='recibo',
+            name='vencido',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='reciboarchivado',
+            name='vence_en',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reciboarchivado',
+            name='vencido',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='recibo',
+            index=models.Index(fields=['status', 'vencido', 'vence_en'], name='recibo_barrido_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recibo',
+            index=models.Index(fields=['vencido', 'receptor'], name='recibo_vencido_idx'),
+        ),
+    ]
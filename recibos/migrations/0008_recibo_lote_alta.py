@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0007_vencimiento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recibo',
+            name='lote_alta',
+            field=models.UUIDField(blank=True, db_index=True, editable=False, null=True),
+        ),
+    ]
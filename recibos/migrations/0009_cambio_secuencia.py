@@ -0,0 +1,53 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:55
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def numerar_existentes(apps, schema_editor):
+    # secuencia = id en lo ya confirmado: los cursores que tienen los clientes siguen valiendo
+    Cambio = apps.get_model("recibos", "Cambio")
+    SecuenciaCambios = apps.get_model("recibos", "SecuenciaCambios")
+    db = schema_editor.connection.alias
+    Cambio.objects.using(db).update(secuencia=F("id"))
+    ultima = Cambio.objects.using(db).aggregate(m=Max("id"))["m"] or 0
+    SecuenciaCambios.objects.using(db).create(pk=1, ultima=ultima)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0008_recibo_lote_alta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecuenciaCambios',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultima', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='cambio',
+            name='cambio_emisor_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='cambio',
+            name='cambio_receptor_idx',
+        ),
+        migrations.AddField(
+            model_name='cambio',
+            name='secuencia',
+            field=models.BigIntegerField(editable=False, null=True, unique=True),
+        ),
+        migrations.RunPython(numerar_existentes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='cambio',
+            index=models.Index(fields=['emisor_id', 'secuencia'], name='cambio_emisor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cambio',
+            index=models.Index(fields=['receptor_id', 'secuencia'], name='cambio_receptor_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:10
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def marcar_purgado(apps, schema_editor):
+    # Lo compactado antes de existir la marca: todo lo anterior a la primera secuencia retenida
+    # (o todo lo entregado si el feed quedó vacío)
+    Cambio = apps.get_model("recibos", "Cambio")
+    SecuenciaCambios = apps.get_model("recibos", "SecuenciaCambios")
+    db = schema_editor.connection.alias
+    contador = SecuenciaCambios.objects.using(db).filter(pk=1).first()
+    if contador is None:
+        return
+    primera = Cambio.objects.using(db).aggregate(m=Min("secuencia"))["m"]
+    contador.purgada_hasta = contador.ultima if primera is None else primera - 1
+    contador.save(update_fields=["purgada_hasta"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0009_cambio_secuencia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='secuenciacambios',
+            name='purgada_hasta',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(marcar_purgado, migrations.RunPython.noop),
+    ]
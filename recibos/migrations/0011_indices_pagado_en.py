@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0010_secuenciacambios_purgada_hasta'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recibo',
+            index=models.Index(fields=['status', 'pagado_en'], name='recibo_pagado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reciboarchivado',
+            index=models.Index(fields=['pagado_en'], name='recibo_arch_pagado_idx'),
+        ),
+    ]
@@ -0,0 +1,130 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.module_loading import import_string
+
+
+def _lista_param(request, nombre):
+    raw = request.query_params.get(nombre) or ""
+    return [x.strip() for x in raw.split(",") if x.strip()]
+
+
+def _serializer_expandido(serializer_class, nombre):
+    ruta, kwargs = serializer_class.expandable_fields[nombre]
+    return import_string(ruta), kwargs
+
+
+def columnas_para(serializer_class, campos=None, expand=(), prefijo=""):
+    """
+    Traduce los campos pedidos de un serializer a (select_related, only).
+    Devuelve only=None cuando algún campo no se puede mapear a columnas
+    (p. ej. un SerializerMethodField sin `columnas_fuente`): entonces no se acota el SELECT.
+    """
+    model = serializer_class.Meta.model
+    fields = serializer_class().fields
+    extra = getattr(serializer_class, "columnas_fuente", {})
+    related, columnas = set(), set()
+
+    nombres = list(fields) + [n for n in expand if n not in fields]
+    for nombre in nombres:
+        if campos and nombre not in campos and nombre not in expand:
+            continue
+        if nombre in expand:
+            sub_class, _ = _serializer_expandido(serializer_class, nombre)
+            rel = prefijo + nombre
+            related.add(rel)
+            if model._meta.get_field(nombre).concrete:
+                columnas.add(rel)
+            sub_rel, sub_cols = columnas_para(sub_class, prefijo=rel + "__")
+            related |= sub_rel
+            if sub_cols is None:
+                return related, None
+            columnas |= sub_cols
+            continue
+        field = fields[nombre]
+        if field.write_only:
+            continue
+        if nombre in extra:
+            columnas.update(prefijo + c for c in extra[nombre])
+            continue
+        if field.source == "*":
+            return related, None
+
+        partes = field.source.split(".")
+        actual = model
+        try:
+            for i, parte in enumerate(partes):
+                f = actual._meta.get_field(parte)
+                if i < len(partes) - 1:
+                    related.add(prefijo + "__".join(partes[:i + 1]))
+                    actual = f.related_model
+        except FieldDoesNotExist:
+            return related, None
+        if len(partes) > 1:
+            columnas.add(prefijo + partes[0])
+        columnas.add(prefijo + "__".join(partes))
+
+    return related, columnas
+
+
+class CamposDinamicosMixin:
+    """
+    ModelSerializer con campos dinámicos:
+      context["fields"] → solo esas columnas en la salida
+      context["expand"] → reemplaza relaciones por el objeto anidado (expandable_fields)
+    """
+    # nombre -> ("ruta.al.Serializer", kwargs)
+    expandable_fields = {}
+    # campo calculado -> columnas del modelo que necesita (para .only())
+    columnas_fuente = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        campos = self.context.get("fields")
+        expand = self.context.get("expand") or ()
+
+        for nombre in expand:
+            if nombre in self.expandable_fields:
+                sub_class, sub_kwargs = _serializer_expandido(type(self), nombre)
+                self.fields[nombre] = sub_class(read_only=True, **sub_kwargs)
+
+        if campos:
+            permitidos = set(campos) | set(expand)
+            for nombre in list(self.fields):
+                if nombre not in permitidos:
+                    self.fields.pop(nombre)
+
+
+class CamposDinamicosViewMixin:
+    """
+    Para ViewSets cuyo serializer usa CamposDinamicosMixin.
+    En lecturas (GET) aplica ?fields= con .only() y ?expand= con select_related,
+    así el SQL trae solo lo que el cliente va a usar.
+    """
+
+    def _es_lectura(self):
+        request = getattr(self, "request", None)
+        return request is not None and request.method in ("GET", "HEAD")
+
+    def _campos_y_expand(self):
+        ser = self.get_serializer_class()
+        expand = [n for n in _lista_param(self.request, "expand") if n in ser.expandable_fields]
+        return _lista_param(self.request, "fields"), expand
+
+    def get_serializer_context(self):
+        ctx = super().get_serializer_context()
+        if self._es_lectura():
+            ctx["fields"], ctx["expand"] = self._campos_y_expand()
+        return ctx
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if not self._es_lectura():
+            return qs
+        campos, expand = self._campos_y_expand()
+        if not campos and not expand:
+            return qs
+        related, columnas = columnas_para(self.get_serializer_class(), campos, expand)
+        if related:
+            qs = qs.select_related(*sorted(related))
+        if campos and columnas is not None:
+            qs = qs.only(*sorted(columnas))
+        return qs
@@ -1,9 +1,21 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
 
 User = settings.AUTH_USER_MODEL
 
+PARTES_MAX = 255
+
+
+def construir_partes(*usuarios):
+    """Texto desnormalizado con username/nombre/apellido de las partes (para búsqueda)."""
+    textos = []
+    for u in usuarios:
+        textos += [u.username, u.first_name, u.last_name]
+    return " ".join(t for t in textos if t)[:PARTES_MAX]
+
+
 class Recibo(models.Model):
     class Status(models.TextChoices):
         PENDIENTE = "PENDING", "Pendiente"
@@ -18,6 +30,53 @@ class Recibo(models.Model):
     status      = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDIENTE)
     pagado_en   = models.DateTimeField(null=True, blank=True)
     creado_en   = models.DateTimeField(auto_now_add=True)
+    actualizado_en = models.DateTimeField(auto_now=True, db_index=True)
+    # Nombres de emisor y receptor; junto con descripcion forma el índice FULLTEXT (MySQL)
+    partes      = models.CharField(max_length=PARTES_MAX, blank=True, default="", db_index=True, editable=False)
+    vence_en    = models.DateField(null=True, blank=True)
+    # PENDIENTE con vence_en pasado. save() lo mantiene; el paso de los días, recibos/vencimiento.py
+    vencido     = models.BooleanField(default=False, editable=False)
+    # Marca del alta en bloque que lo insertó, solo en backends cuyo bulk_create no devuelve
+    # pk (MySQL): con ella se recuperan los ids (bloque.asignar_ids_en_orden)
+    lote_alta   = models.UUIDField(null=True, blank=True, editable=False, db_index=True)
+
+    class Meta:
+        indexes = [
+            # barrido: pendientes aún no marcados cuyo vencimiento ya pasó
+            models.Index(fields=["status", "vencido", "vence_en"], name="recibo_barrido_idx"),
+            # lo vencido agrupado por receptor
+            models.Index(fields=["vencido", "receptor"], name="recibo_vencido_idx"),
+            # pagados por rango de pago (comprobantes de un mes, archivado)
+            models.Index(fields=["status", "pagado_en"], name="recibo_pagado_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {n: instance.__dict__.get(n) for n in field_names}
+        return instance
+
+    def calcular_vencido(self, hoy=None):
+        return (
+            self.status == self.Status.PENDIENTE and self.vence_en is not None
+            and self.vence_en < (hoy or timezone.localdate())
+        )
+
+    def save(self, *args, **kwargs):
+        cargados = getattr(self, "_loaded_values", {})
+        if self._state.adding or (
+            (cargados.get("emisor_id"), cargados.get("receptor_id")) != (self.emisor_id, self.receptor_id)
+        ):
+            self.partes = construir_partes(self.emisor, self.receptor)
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "partes"}
+        vencido = self.calcular_vencido()
+        if vencido != self.vencido:
+            self.vencido = vencido
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "vencido"}
+        super().save(*args, **kwargs)
+        self._loaded_values = {f.attname: getattr(self, f.attname) for f in self._meta.concrete_fields}
 
     def marcar_pagado(self):
         self.status = self.Status.PAGADO
@@ -25,4 +84,99 @@ class Recibo(models.Model):
         self.save()
 
     def __str__(self):
-        return f"Recibo #{self.id} {self.emisor} → {self.receptor} | {self.monto} ({self.status})"
\ No newline at end of file
+        return f"Recibo #{self.id} {self.emisor} → {self.receptor} | {self.monto} ({self.status})"
+
+
+class ReciboArchivado(models.Model):
+    """
+    Recibos PAGADOS antiguos movidos fuera de la tabla viva por `archivar_recibos`.
+    Conserva el mismo id que tenía en Recibo. Solo lectura.
+    """
+    id       = models.BigIntegerField(primary_key=True)
+    emisor   = models.ForeignKey(User, on_delete=models.CASCADE, related_name="recibos_archivados_emitidos")
+    receptor = models.ForeignKey(User, on_delete=models.CASCADE, related_name="recibos_archivados_recibidos")
+
+    monto       = models.DecimalField(max_digits=12, decimal_places=2)
+    fecha       = models.DateField(db_index=True)
+    descripcion = models.TextField(blank=True)
+    status      = models.CharField(max_length=10, choices=Recibo.Status.choices, default=Recibo.Status.PAGADO)
+    pagado_en   = models.DateTimeField(null=True, blank=True)
+    creado_en   = models.DateTimeField()
+    actualizado_en = models.DateTimeField(db_index=True)
+    partes      = models.CharField(max_length=PARTES_MAX, blank=True, default="", db_index=True, editable=False)
+    vence_en    = models.DateField(null=True, blank=True)
+    vencido     = models.BooleanField(default=False, editable=False)  # siempre False: solo se archivan pagados
+    archivado_en = models.DateTimeField(auto_now_add=True)
+
+    Status = Recibo.Status
+
+    class Meta:
+        indexes = [
+            # todos están pagados: comprobantes por rango de pago
+            models.Index(fields=["pagado_en"], name="recibo_arch_pagado_idx"),
+        ]
+
+    def __str__(self):
+        return f"Recibo archivado #{self.id} {self.emisor_id} → {self.receptor_id} | {self.monto}"
+
+
+class Cambio(models.Model):
+    """
+    Registro append-only de cambios de recibos y transferencias (feed incremental).
+    La secuencia es el cursor: GET /api/changes/?since=<secuencia>. emisor_id/receptor_id
+    acotan quién puede ver cada entrada (son ids sueltos: sobreviven al borrado del recibo).
+    """
+    class Entidad(models.TextChoices):
+        RECIBO        = "recibo",        "Recibo"
+        TRANSFERENCIA = "transferencia", "Transferencia"
+
+    class Accion(models.TextChoices):
+        CREADO    = "created",  "Creado"
+        EDITADO   = "updated",  "Editado"
+        PAGADO    = "paid",     "Pagado"
+        BORRADO   = "deleted",  "Borrado"
+        ARCHIVADO = "archived", "Archivado"
+
+    entidad     = models.CharField(max_length=20, choices=Entidad.choices)
+    objeto_id   = models.BigIntegerField()
+    accion      = models.CharField(max_length=10, choices=Accion.choices)
+    emisor_id   = models.BigIntegerField(null=True)
+    receptor_id = models.BigIntegerField(null=True)
+    datos       = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    creado_en   = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Orden de commit (no el de inserción como el id): la asigna cambios.sellar() a las
+    # entradas ya confirmadas. Null mientras tanto; esas aún no se entregan.
+    secuencia   = models.BigIntegerField(null=True, unique=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["emisor_id", "secuencia"], name="cambio_emisor_idx"),
+            models.Index(fields=["receptor_id", "secuencia"], name="cambio_receptor_idx"),
+        ]
+
+    def __str__(self):
+        return f"Cambio #{self.id} {self.entidad} {self.objeto_id} {self.accion}"
+
+
+class SecuenciaCambios(models.Model):
+    """Última secuencia asignada en el feed (una sola fila). Su bloqueo ordena los sellados."""
+    ultima = models.BigIntegerField(default=0)
+    # Mayor secuencia borrada por la compactación: `since` menor → 410
+    purgada_hasta = models.BigIntegerField(default=0)
+
+
+class SaldoPendiente(models.Model):
+    """
+    Total PENDIENTE por receptor, mantenido incrementalmente (recibos/ranking.py)
+    en cada alta/edición/pago/borrado de recibos. El ranking de deudores es un
+    recorrido del índice (total, receptor) en vez de un GROUP BY sobre Recibo.
+    """
+    receptor = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="saldo_pendiente")
+    total    = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count    = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=["total", "receptor"], name="saldo_total_idx")]
+
+    def __str__(self):
+        return f"Saldo pendiente de {self.receptor_id}: {self.total} ({self.count})"
@@ -0,0 +1,89 @@
+"""
+user-overview para muchos usuarios a la vez.
+
+Por cada tramo de ids se hacen las mismas consultas agrupadas (usuarios, emitidos,
+recibidos, pagos y saldo pendiente), sin importar cuántos usuarios tenga el tramo,
+y se va generando el JSON tramo a tramo para no armar la respuesta entera en memoria.
+Los montos son Decimal y cada item lo codifica el mismo renderer que user-overview,
+así las dos respuestas dan los mismos números.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Sum
+
+from sist_rec_api.renderers import JSONRapidoRenderer
+
+from .archivo import combinar_series, fuentes_recibos, fuentes_transferencias
+from .models import SaldoPendiente
+
+User = get_user_model()
+
+TRAMO = 1000
+
+
+def max_ids():
+    return getattr(settings, "OVERVIEW_BATCH_MAX", 5000)
+
+
+def _contar(querysets, campo, ids, **aggs):
+    """{id: fila} agrupando por `campo` en cada fuente (vivos y, si aplica, archivados)."""
+    series = [
+        qs.filter(**{f"{campo}__in": ids}).values(campo).annotate(**aggs).order_by()
+        for qs in querysets
+    ]
+    return {fila[campo]: fila for fila in combinar_series(series, campo)}
+
+
+def tramo(ids, archivo=False):
+    usuarios = {
+        u["id"]: u for u in
+        User.objects.filter(pk__in=ids).values("id", "username", "first_name", "last_name")
+    }
+    emitidos = _contar(fuentes_recibos(archivo), "emisor_id", ids, n=Count("id"))
+    recibidos = _contar(fuentes_recibos(archivo), "receptor_id", ids, n=Count("id"))
+    pagos = _contar(fuentes_transferencias(archivo), "pagador_id", ids, n=Count("id"), s=Sum("monto"))
+    # Lo pendiente solo vive en Recibo y ya está agregado por receptor en SaldoPendiente
+    pendientes = dict(
+        SaldoPendiente.objects.filter(receptor_id__in=ids).values_list("receptor_id", "total")
+    )
+
+    for uid in ids:
+        u = usuarios.get(uid)
+        if u is None:
+            continue
+        pago = pagos.get(uid, {})
+        sum_pagado = Decimal(pago.get("s") or 0)
+        sum_pendiente = Decimal(pendientes.get(uid) or 0)
+        yield {
+            "user": {
+                "id": uid,
+                "username": u["username"],
+                "display_name": (f'{u["first_name"]} {u["last_name"]}'.strip() or u["username"]),
+            },
+            "emitidos_count": emitidos.get(uid, {}).get("n", 0),
+            "recibidos_count": recibidos.get(uid, {}).get("n", 0),
+            "pagos_count": pago.get("n", 0),
+            "sum_pagado": sum_pagado,
+            "sum_pendiente_pagar": sum_pendiente,
+            "saldo": sum_pagado - sum_pendiente,
+        }
+
+
+def generar_json(ids, archivo=False, renderer=None):
+    """Genera {"count": N, "items": [...], "missing": [...]} por trozos (bytes)."""
+    renderer = renderer or JSONRapidoRenderer()
+    yield b'{"count": %d, "items": [' % len(ids)
+    encontrados = set()
+    primero = True
+    for i in range(0, len(ids), TRAMO):
+        partes = []
+        for item in tramo(ids[i:i + TRAMO], archivo):
+            encontrados.add(item["user"]["id"])
+            partes.append(renderer.render(item))
+        if partes:
+            yield (b"" if primero else b",") + b",".join(partes)
+            primero = False
+    faltan = [uid for uid in ids if uid not in encontrados]
+    yield b'], "missing": ' + renderer.render(faltan) + b"}"
@@ -0,0 +1,177 @@
+"""
+Presupuesto de tiempo para consultas de stats y respaldo "stale-while-revalidate".
+
+`limite_consulta(ms)` hace que la propia BD corte las consultas que se pasan:
+- MySQL: max_execution_time (ms, por SELECT); MariaDB: max_statement_time (s).
+- PostgreSQL: statement_timeout (ms, por sentencia).
+- SQLite (desarrollo/tests): progress handler que interrumpe pasado el plazo (total del bloque).
+
+`con_presupuesto` envuelve una acción: si alguna consulta se corta devuelve el último
+resultado bueno guardado en caché con "stale": true y lanza un recálculo en segundo
+plano (sin bloquear al cliente); si aún no hay nada guardado responde 503.
+"""
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, OperationalError, connections
+from rest_framework.response import Response
+
+from sist_rec_api.db_router import alias_lectura
+
+logger = logging.getLogger(__name__)
+
+ER_QUERY_TIMEOUT = 3024        # MySQL
+ER_STATEMENT_TIMEOUT = 1969    # MariaDB
+PG_QUERY_CANCELED = "57014"
+
+
+class PresupuestoExcedido(Exception):
+    pass
+
+
+def _excedido(conn, exc):
+    if conn.vendor == "mysql":
+        return bool(exc.args) and exc.args[0] in (ER_QUERY_TIMEOUT, ER_STATEMENT_TIMEOUT)
+    if conn.vendor == "postgresql":
+        return getattr(exc.__cause__, "pgcode", None) == PG_QUERY_CANCELED
+    if conn.vendor == "sqlite":
+        return "interrupted" in str(exc)
+    return False
+
+
+def _sentencias(conn, ms):
+    """(activar, restaurar) del límite por sesión, o (None, None) si el backend no tiene."""
+    if conn.vendor == "mysql":
+        if conn.mysql_is_mariadb:
+            activar = ("SET SESSION max_statement_time = %s", [ms / 1000])
+            restaurar = "SET SESSION max_statement_time = 0"
+        else:
+            activar = ("SET SESSION max_execution_time = %s", [int(ms)])
+            restaurar = "SET SESSION max_execution_time = 0"
+    elif conn.vendor == "postgresql":
+        activar = ("SET statement_timeout = %s", [int(ms)])
+        restaurar = "SET statement_timeout = DEFAULT"
+    else:
+        activar = restaurar = None
+    return activar, restaurar
+
+
+@contextmanager
+def _limite_alias(using, ms):
+    """
+    El límite se fija con la primera consulta del bloque (execute_wrapper): si la acción
+    no consulta no cuesta nada, y si la conexión falla no se tira la petición por el
+    límite (falla o no la consulta, como sin presupuesto).
+    """
+    conn = connections[using]
+    activar, restaurar = _sentencias(conn, ms)
+    estado = {"visto": False, "activo": False}
+
+    def fijar(execute, sql, params, many, context):
+        if not estado["visto"]:
+            estado["visto"] = True  # antes de ejecutar: el SET de abajo también pasa por aquí
+            try:
+                if activar:
+                    with conn.cursor() as cur:
+                        cur.execute(*activar)
+                elif conn.vendor == "sqlite":
+                    limite = time.monotonic() + ms / 1000
+                    # Se llama cada N instrucciones de la VM; devolver 1 interrumpe la consulta
+                    conn.connection.set_progress_handler(lambda: int(time.monotonic() > limite), 10000)
+                estado["activo"] = True
+            except DatabaseError:
+                logger.warning("No se pudo fijar el presupuesto en %s", using, exc_info=True)
+        return execute(sql, params, many, context)
+
+    try:
+        with conn.execute_wrapper(fijar):
+            yield
+    finally:
+        if estado["activo"]:
+            try:
+                if restaurar:
+                    with conn.cursor() as cur:
+                        cur.execute(restaurar)
+                elif conn.vendor == "sqlite" and conn.connection is not None:
+                    conn.connection.set_progress_handler(None, 0)
+            except DatabaseError:
+                # Conexión rota: Django la descarta al acabar la petición (close_old_connections)
+                logger.warning("No se pudo quitar el presupuesto en %s", using, exc_info=True)
+
+
+@contextmanager
+def limite_consulta(ms, using=None):
+    """
+    Las consultas dentro del bloque que pasen de `ms` lanzan PresupuestoExcedido.
+    Sin `using` se aplica solo al alias que atiende las lecturas de la petición.
+    """
+    alias = using or alias_lectura()
+    with _limite_alias(alias, ms):
+        try:
+            yield
+        except OperationalError as e:
+            if _excedido(connections[alias], e):
+                raise PresupuestoExcedido(str(e)) from e
+            raise
+
+
+def _clave(func, request):
+    return f"swr:{func.__name__}:{request.get_full_path()}"
+
+
+def _recalcular(func, view, request, args, kwargs, clave):
+    try:
+        with limite_consulta(settings.STATS_RECALCULO_MS):
+            response = func(view, request, *args, **kwargs)
+        if response.status_code == 200 and hasattr(response, "data"):
+            cache.set(clave, response.data, settings.STATS_SWR_TTL)
+    except Exception:
+        logger.exception("Recálculo en segundo plano de %s falló", clave)
+    finally:
+        cache.delete(f"{clave}:recalculando")
+        connections.close_all()
+
+
+def con_presupuesto(nombre):
+    """
+    Decorador para acciones de stats. `nombre` es la clave en STATS_PRESUPUESTO_MS.
+    Va por fuera de @condicional: así las consultas del validador ETag también tienen presupuesto
+    y una respuesta vieja nunca sale con el ETag de los datos actuales.
+    """
+    def deco(func):
+        @wraps(func)
+        def wrapper(self, request, *args, **kwargs):
+            ms = settings.STATS_PRESUPUESTO_MS.get(nombre)
+            if not ms:
+                return func(self, request, *args, **kwargs)
+            clave = _clave(func, request)
+            try:
+                with limite_consulta(ms):
+                    response = func(self, request, *args, **kwargs)
+            except PresupuestoExcedido:
+                logger.warning("%s pasó de %s ms", request.get_full_path(), ms)
+                if cache.add(f"{clave}:recalculando", 1, settings.STATS_RECALCULO_MS // 1000 + 60):
+                    ctx = contextvars.copy_context()  # mismo enrutado a réplica que la petición
+                    threading.Thread(
+                        target=ctx.run, args=(_recalcular, func, self, request, args, kwargs, clave),
+                        daemon=True,
+                    ).start()
+                guardado = cache.get(clave)
+                if guardado is None:
+                    return Response(
+                        {"detail": "La consulta tardó demasiado; se está calculando, reintenta en unos segundos."},
+                        status=503, headers={"Retry-After": "5"},
+                    )
+                return Response({**guardado, "stale": True})
+
+            if response.status_code == 200 and hasattr(response, "data"):
+                cache.set(clave, response.data, settings.STATS_SWR_TTL)
+            return response
+        return wrapper
+    return deco
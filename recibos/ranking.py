@@ -0,0 +1,135 @@
+"""
+Mantenimiento incremental de SaldoPendiente (total PENDIENTE por receptor) y
+consultas del ranking de deudores.
+
+Cada recibo PENDIENTE aporta (monto, 1) al saldo de su receptor. En cada cambio se
+resta el aporte anterior (_loaded_values) y se suma el nuevo con UPDATE ... F().
+Los caminos en bloque (bulk_create, etc.) llaman a `ajustar_lote` directamente.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import Recibo, SaldoPendiente
+
+User = get_user_model()
+
+CAMPOS_APORTE = ("status", "monto", "receptor_id")
+
+
+def aporte(status, monto, receptor_id):
+    if status == Recibo.Status.PENDIENTE and receptor_id:
+        return receptor_id, Decimal(monto), 1
+    return None
+
+
+def _sumar(receptor_id, d_total, d_count):
+    return SaldoPendiente.objects.filter(receptor_id=receptor_id).update(
+        total=F("total") + d_total, count=F("count") + d_count,
+    )
+
+
+def ajustar(receptor_id, d_total, d_count):
+    if not d_total and not d_count:
+        return
+    if _sumar(receptor_id, d_total, d_count):
+        return
+    # Sin fila no hay nada que restar: o el receptor se está borrando (la fila cayó en
+    # cascada antes que sus recibos) o nunca tuvo pendientes. Solo un aporte nuevo la crea.
+    if d_count <= 0:
+        return
+    try:
+        with transaction.atomic():
+            SaldoPendiente.objects.create(receptor_id=receptor_id, total=d_total, count=d_count)
+    except IntegrityError:
+        # Otro proceso la creó entre el UPDATE y el INSERT: un único reintento. Si tampoco
+        # hay fila, el receptor ya no existe (FK) y no hay saldo que mantener.
+        _sumar(receptor_id, d_total, d_count)
+
+
+def ajustar_lote(deltas):
+    """deltas: {receptor_id: (d_total, d_count)}"""
+    for receptor_id, (d_total, d_count) in sorted(deltas.items()):
+        ajustar(receptor_id, d_total, d_count)
+
+
+def deltas_de(recibos, signo=1):
+    """Aportes de una lista de recibos (signo=-1 para restarlos)."""
+    deltas = defaultdict(lambda: (Decimal("0"), 0))
+    for r in recibos:
+        a = aporte(r.status, r.monto, r.receptor_id)
+        if a:
+            t, c = deltas[a[0]]
+            deltas[a[0]] = (t + signo * a[1], c + signo * a[2])
+    return dict(deltas)
+
+
+def recibo_cambiado(recibo, created):
+    nuevo = aporte(recibo.status, recibo.monto, recibo.receptor_id)
+    if created:
+        anterior = None
+    else:
+        cargados = getattr(recibo, "_loaded_values", None)
+        if cargados is None or any(c not in cargados for c in CAMPOS_APORTE):
+            # No sabemos el aporte anterior: se recalcula el receptor entero
+            recalcular(recibo.receptor_id)
+            if cargados and cargados.get("receptor_id") not in (None, recibo.receptor_id):
+                recalcular(cargados["receptor_id"])
+            return
+        anterior = aporte(cargados["status"], cargados["monto"], cargados["receptor_id"])
+
+    if anterior and nuevo and anterior[0] == nuevo[0]:
+        ajustar(nuevo[0], nuevo[1] - anterior[1], 0)
+        return
+    if anterior:
+        ajustar(anterior[0], -anterior[1], -1)
+    if nuevo:
+        ajustar(nuevo[0], nuevo[1], 1)
+
+
+def recibo_borrado(recibo, origin=None):
+    """`origin`: lo que inició el borrado (post_delete). Si es el propio receptor, su saldo se va con él."""
+    if isinstance(origin, User) and origin.pk == recibo.receptor_id:
+        return
+    a = aporte(recibo.status, recibo.monto, recibo.receptor_id)
+    if a:
+        ajustar(a[0], -a[1], -1)
+
+
+def recalcular(receptor_id=None):
+    """Reconstruye SaldoPendiente desde Recibo (un receptor o todos)."""
+    qs = Recibo.objects.filter(status=Recibo.Status.PENDIENTE)
+    saldos = SaldoPendiente.objects.all()
+    if receptor_id is not None:
+        qs = qs.filter(receptor_id=receptor_id)
+        saldos = saldos.filter(receptor_id=receptor_id)
+    filas = qs.values("receptor_id").annotate(total=Sum("monto"), count=Count("id"))
+    with transaction.atomic():
+        saldos.delete()
+        SaldoPendiente.objects.bulk_create(
+            [SaldoPendiente(receptor_id=f["receptor_id"], total=f["total"], count=f["count"]) for f in filas],
+            batch_size=1000,
+        )
+
+
+# ---------- consultas ----------
+
+def deudores():
+    return SaldoPendiente.objects.filter(total__gt=0).order_by("-total", "-receptor_id")
+
+
+def delante_de(total, receptor_id):
+    """Filtro de los deudores que van antes de (total, receptor_id) en el ranking."""
+    return Q(total__gt=total) | Q(total=total, receptor_id__gt=receptor_id)
+
+
+def despues_de(total, receptor_id):
+    return Q(total__lt=total) | Q(total=total, receptor_id__lt=receptor_id)
+
+
+def posicion(saldo, using=None):
+    qs = deudores().using(using) if using else deudores()
+    return qs.filter(delante_de(saldo.total, saldo.receptor_id)).count() + 1
@@ -1,9 +1,25 @@
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Recibo
+from sist_rec_api.renderers import DineroField
+from .mixins import CamposDinamicosMixin
+from .models import Recibo, ReciboArchivado
 
-class ReciboSerializer(serializers.ModelSerializer):
+
+def validar_vencimiento(fecha, vence_en):
+    if fecha and vence_en and vence_en < fecha:
+        raise serializers.ValidationError({"vence_en": "No puede ser anterior a la fecha del recibo."})
+
+
+class ReciboSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     emisor_username   = serializers.ReadOnlyField(source="emisor.username")
     receptor_username = serializers.ReadOnlyField(source="receptor.username")
+    monto             = DineroField(max_digits=12, decimal_places=2)
+
+    expandable_fields = {
+        "transferencia": ("transferencias.serializers.TransferenciaSerializer", {}),
+        "emisor":        ("usuarios_log.serializers.UserDirectorySerializer", {}),
+        "receptor":      ("usuarios_log.serializers.UserDirectorySerializer", {}),
+    }
 
     class Meta:
         model = Recibo
@@ -13,12 +29,17 @@ class ReciboSerializer(serializers.ModelSerializer):
             "receptor", "receptor_username",
             "monto", "fecha", "descripcion",
             "status", "pagado_en", "creado_en",
+            "vence_en", "vencido",
         ]
-        read_only_fields = ["emisor", "status", "pagado_en", "creado_en"]
+        read_only_fields = ["emisor", "status", "pagado_en", "creado_en", "vencido"]
 
     def validate(self, attrs):
         receptor = attrs.get("receptor")
         request = self.context.get("request")
+        validar_vencimiento(
+            attrs.get("fecha", getattr(self.instance, "fecha", None)),
+            attrs.get("vence_en", getattr(self.instance, "vence_en", None)),
+        )
 
         if request and request.method == "POST":
             if receptor and request.user.id == receptor.id:
@@ -28,3 +49,66 @@ class ReciboSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data["emisor"] = self.context["request"].user
         return super().create(validated_data)
+
+
+# Campo de ReciboSerializer → columna para values_list()
+COLUMNAS_FILA = {
+    "id": "id",
+    "emisor": "emisor_id", "emisor_username": "emisor__username",
+    "receptor": "receptor_id", "receptor_username": "receptor__username",
+    "monto": "monto", "fecha": "fecha", "descripcion": "descripcion",
+    "status": "status", "pagado_en": "pagado_en", "creado_en": "creado_en",
+    "vence_en": "vence_en", "vencido": "vencido",
+}
+
+
+def filas_recibos(qs, campos=None, dinero=str):
+    """
+    La salida de ReciboSerializer (sin ?expand=) construida directamente desde values_list():
+    una consulta con JOIN a los usuarios y sin instanciar modelos ni fields de DRF.
+    `dinero` convierte monto (str como el DecimalField de DRF, centavos en MessagePack);
+    las fechas-hora pasan a la zona actual igual que DateTimeField y el resto lo codifica el renderer.
+    """
+    nombres = [n for n in ReciboSerializer.Meta.fields if not campos or n in campos]
+    zona = timezone.get_current_timezone()
+    conversiones = [
+        (i, dinero if n == "monto" else (lambda v: v.astimezone(zona)))
+        for i, n in enumerate(nombres) if n in ("monto", "pagado_en", "creado_en")
+    ]
+    consulta = qs.values_list(*(COLUMNAS_FILA[n] for n in nombres)) if nombres else qs.values_list("pk")
+    salida = []
+    for fila in consulta.iterator(chunk_size=2000):
+        if conversiones:
+            fila = list(fila)
+            for i, conv in conversiones:
+                if fila[i] is not None:
+                    fila[i] = conv(fila[i])
+        salida.append(dict(zip(nombres, fila)))
+    return salida
+
+
+
+class ReciboLoteSerializer(serializers.Serializer):
+    """
+    Un elemento de POST /api/recibos/batch/. receptor es un id suelto: los receptores
+    se buscan todos juntos en la vista (un PrimaryKeyRelatedField haría una consulta por elemento).
+    """
+    receptor    = serializers.IntegerField(min_value=1)
+    monto       = serializers.DecimalField(max_digits=12, decimal_places=2)
+    fecha       = serializers.DateField()
+    descripcion = serializers.CharField(required=False, allow_blank=True, default="")
+    vence_en    = serializers.DateField(required=False, allow_null=True, default=None)
+
+    def validate(self, attrs):
+        validar_vencimiento(attrs["fecha"], attrs["vence_en"])
+        return attrs
+
+class ReciboArchivadoSerializer(ReciboSerializer):
+    expandable_fields = {
+        **ReciboSerializer.expandable_fields,
+        "transferencia": ("transferencias.serializers.TransferenciaArchivadaSerializer", {}),
+    }
+
+    class Meta(ReciboSerializer.Meta):
+        model = ReciboArchivado
+        read_only_fields = ReciboSerializer.Meta.fields
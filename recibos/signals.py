@@ -0,0 +1,127 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from transferencias.models import Transferencia
+from usuarios_log import auditoria
+from . import cambios, eventos, ranking
+from .models import Cambio, Recibo, ReciboArchivado, construir_partes
+
+User = get_user_model()
+
+LOTE_PARTES = 1000
+
+
+NOMBRES = ("emisor__username", "emisor__first_name", "emisor__last_name",
+           "receptor__username", "receptor__first_name", "receptor__last_name")
+
+
+def _por_lotes(modelo, user_id, campos):
+    """Recibos (vivos o archivados) donde participa el usuario, en lotes por pk."""
+    qs = (
+        modelo.objects.filter(Q(emisor_id=user_id) | Q(receptor_id=user_id))
+        .select_related("emisor", "receptor").only(*campos, "partes", *NOMBRES).order_by("pk")
+    )
+    ultimo = 0
+    while True:
+        lote = list(qs.filter(pk__gt=ultimo)[:LOTE_PARTES])
+        if not lote:
+            return
+        yield lote
+        ultimo = lote[-1].pk
+
+
+def actualizar_partes(user_id):
+    """
+    Tras renombrar a un usuario: recalcula `partes` de los recibos donde participa y les
+    sube actualizado_en, porque los listados muestran emisor_username/receptor_username y
+    sus validadores (condicional.py) tienen que moverse. En los vivos deja además una
+    entrada 'updated' en el feed (la versión de los admins).
+    """
+    ahora = timezone.now()
+    for modelo, campos in ((Recibo, cambios.CAMPOS_RECIBO), (ReciboArchivado, ("id",))):
+        for lote in _por_lotes(modelo, user_id, campos):
+            for r in lote:
+                r.partes = construir_partes(r.emisor, r.receptor)
+                r.actualizado_en = ahora
+            modelo.objects.bulk_update(lote, ["partes", "actualizado_en"])
+            if modelo is Recibo and not cambios.silenciado():
+                cambios.registrar_lote([
+                    cambios.nuevo(Cambio.Entidad.RECIBO, Cambio.Accion.EDITADO, r.pk, r.emisor_id, r.receptor_id,
+                                  cambios.instantanea(r, cambios.CAMPOS_RECIBO))
+                    for r in lote
+                ])
+    # ?expand=pagador en el listado de transferencias
+    Transferencia.objects.filter(pagador_id=user_id).update(actualizado_en=ahora)
+
+
+@receiver(post_save, sender=User)
+def usuario_renombrado(sender, instance, created, **kwargs):
+    # Los nombres con que se guardó (o se leyó, User.from_db) son la base del siguiente save
+    antes = getattr(instance, "_nombres_cargados", None)
+    ahora = (instance.username, instance.first_name, instance.last_name)
+    if not created and antes is not None and antes != ahora:
+        actualizar_partes(instance.pk)
+    instance._nombres_cargados = ahora
+
+
+@receiver(post_save, sender=Recibo)
+def recibo_guardado(sender, instance, created, **kwargs):
+    ranking.recibo_cambiado(instance, created)
+    if cambios.silenciado():
+        return
+    if created:
+        accion = Cambio.Accion.CREADO
+    elif (
+        instance.status == Recibo.Status.PAGADO
+        and getattr(instance, "_loaded_values", {}).get("status") != Recibo.Status.PAGADO
+    ):
+        accion = Cambio.Accion.PAGADO
+    else:
+        accion = Cambio.Accion.EDITADO
+    datos = cambios.instantanea(instance, cambios.CAMPOS_RECIBO)
+    cambios.registrar(Cambio.Entidad.RECIBO, accion, instance.pk, instance.emisor_id, instance.receptor_id, datos)
+    auditoria.registrar(f"recibo.{accion}", "recibo", instance.pk, datos)
+    if accion in (Cambio.Accion.CREADO, Cambio.Accion.PAGADO):
+        eventos.publicar(f"recibo.{accion}", (instance.emisor_id, instance.receptor_id), datos)
+
+
+@receiver(post_delete, sender=Recibo)
+def recibo_borrado(sender, instance, origin=None, **kwargs):
+    ranking.recibo_borrado(instance, origin)
+    if cambios.silenciado():
+        return
+    cambios.registrar(
+        Cambio.Entidad.RECIBO, Cambio.Accion.BORRADO, instance.pk, instance.emisor_id, instance.receptor_id,
+    )
+    auditoria.registrar("recibo.deleted", "recibo", instance.pk, cambios.instantanea(instance, cambios.CAMPOS_RECIBO))
+
+
+def _partes_transferencia(transferencia):
+    partes = Recibo.objects.filter(pk=transferencia.recibo_id).values_list("emisor_id", "receptor_id").first()
+    return partes or (None, None)
+
+
+@receiver(post_save, sender=Transferencia)
+def transferencia_guardada(sender, instance, created, **kwargs):
+    if cambios.silenciado():
+        return
+    emisor_id, receptor_id = _partes_transferencia(instance)
+    datos = cambios.instantanea(instance, cambios.CAMPOS_TRANSFERENCIA)
+    accion = Cambio.Accion.CREADO if created else Cambio.Accion.EDITADO
+    cambios.registrar(Cambio.Entidad.TRANSFERENCIA, accion, instance.pk, emisor_id, receptor_id, datos)
+    auditoria.registrar(f"transferencia.{accion}", "transferencia", instance.pk, datos)
+    if created:
+        eventos.publicar("transferencia.created", (emisor_id, receptor_id, instance.pagador_id), datos)
+
+
+@receiver(post_delete, sender=Transferencia)
+def transferencia_borrada(sender, instance, **kwargs):
+    if cambios.silenciado():
+        return
+    emisor_id, receptor_id = _partes_transferencia(instance)
+    datos = cambios.instantanea(instance, cambios.CAMPOS_TRANSFERENCIA)
+    cambios.registrar(Cambio.Entidad.TRANSFERENCIA, Cambio.Accion.BORRADO, instance.pk, emisor_id, receptor_id, datos)
+    auditoria.registrar("transferencia.deleted", "transferencia", instance.pk, datos)
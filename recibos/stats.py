@@ -0,0 +1,233 @@
+"""
+Cálculos de /api/recibos/stats/*.
+
+Cada función devuelve el cuerpo de la respuesta ya serializable. Las usan tanto las
+acciones sueltas como el dashboard, que las ejecuta todas sobre la misma conexión
+(`using`) dentro de un snapshot de lectura repetible. Los montos van como Decimal: el
+renderer los escribe como número en JSON y como centavos enteros en MessagePack.
+"""
+import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import contextvars
+from decimal import Decimal
+
+from django.db import connections, router, transaction
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from . import ranking, vencimiento
+from .archivo import agregar, combinar_series, fuentes_recibos
+from .models import Recibo
+
+dec0 = Value(0, output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def _en(querysets, using):
+    return [qs.using(using) for qs in querysets] if using else querysets
+
+
+def resumen(archivo=False, using=None):
+    pend = Q(status=Recibo.Status.PENDIENTE)
+    pag = Q(status=Recibo.Status.PAGADO)
+
+    tot = agregar(
+        _en(fuentes_recibos(archivo), using),
+        total=Count("id"),
+        pendientes=Count("id", filter=pend),
+        pagados=Count("id", filter=pag),
+        monto_total=Coalesce(Sum("monto"), dec0),
+        monto_pendiente=Coalesce(Sum("monto", filter=pend), dec0),
+        monto_pagado=Coalesce(Sum("monto", filter=pag), dec0),
+    )
+
+    return {
+        "recibos": {
+            "total": tot["total"],
+            "pendientes": tot["pendientes"],
+            "pagados": tot["pagados"],
+            "monto_total": Decimal(tot["monto_total"] or 0),
+            "monto_pendiente": Decimal(tot["monto_pendiente"] or 0),
+            "monto_pagado": Decimal(tot["monto_pagado"] or 0),
+        }
+    }
+
+
+def mensual(year, archivo=False, using=None):
+    monthly = combinar_series([
+        qs.filter(fecha__year=year)
+        .annotate(month=TruncMonth("fecha"))
+        .values("month")
+        .annotate(
+            count=Count("id"),
+            total_monto=Coalesce(Sum("monto"), dec0),
+
+            pendientes=Count("id", filter=Q(status=Recibo.Status.PENDIENTE)),
+            pagados=Count("id",   filter=Q(status=Recibo.Status.PAGADO)),
+
+            monto_pendiente=Coalesce(
+                Sum("monto",
+                    filter=Q(status=Recibo.Status.PENDIENTE),
+                    output_field=DecimalField(max_digits=12, decimal_places=2)),
+                dec0
+            ),
+            monto_pagado=Coalesce(
+                Sum("monto",
+                    filter=Q(status=Recibo.Status.PAGADO),
+                    output_field=DecimalField(max_digits=12, decimal_places=2)),
+                dec0
+            ),
+        )
+        .order_by("month")
+        for qs in _en(fuentes_recibos(archivo), using)
+    ], clave="month")
+
+    data = []
+    for row in monthly:
+        m = row["month"]
+        data.append({
+            "month": m.strftime("%Y-%m"),
+            "count": row["count"],
+            "monto_total": Decimal(row["total_monto"] or 0),
+            "pendientes": row["pendientes"],
+            "pagados": row["pagados"],
+            "monto_pendiente": Decimal(row["monto_pendiente"] or 0),
+            "monto_pagado": Decimal(row["monto_pagado"] or 0),
+        })
+    return {"year": year, "series": data}
+
+
+def top_deudores(limit=10, offset=0, cursor=None, using=None):
+    """cursor: (total, receptor_id) del último elemento de la página anterior."""
+    qs = ranking.deudores().select_related("receptor")
+    if using:
+        qs = qs.using(using)
+    if cursor:
+        qs = qs.filter(ranking.despues_de(*cursor))
+        offset = 0
+
+    saldos = list(qs[offset:offset + limit + 1])
+    hay_mas = len(saldos) > limit
+    saldos = saldos[:limit]
+
+    primero = None
+    if saldos:
+        primero = offset + 1 if not cursor else ranking.posicion(saldos[0], using)
+
+    items = []
+    for n, s in enumerate(saldos):
+        u = s.receptor
+        items.append({
+            "rank": primero + n,
+            "user_id": s.receptor_id,
+            "display_name": (f"{u.first_name} {u.last_name}".strip() or u.username),
+            "count": s.count,
+            "monto_pendiente": s.total,
+        })
+
+    next_cursor = f"{saldos[-1].total}:{saldos[-1].receptor_id}" if hay_mas else None
+    return {"limit": limit, "offset": offset, "next_cursor": next_cursor, "items": items}
+
+
+def antiguedad(b1=30, b2=60, using=None):
+    """Pendientes por días desde `fecha`, en una sola agregación (cada tramo es un rango de fecha)."""
+    today = timezone.now().date()
+    corte1 = today - datetime.timedelta(days=b1)  # días <= b1  ⇔  fecha >= corte1
+    corte2 = today - datetime.timedelta(days=b2)
+    tramos = {
+        f"0-{b1}": Q(fecha__gte=corte1),
+        f"{b1+1}-{b2}": Q(fecha__lt=corte1, fecha__gte=corte2),
+        f">{b2}": Q(fecha__lt=corte2),
+    }
+
+    pendientes = Recibo.objects.filter(status=Recibo.Status.PENDIENTE)
+    if using:
+        pendientes = pendientes.using(using)
+    agg = {}
+    for n, q in enumerate(tramos.values()):
+        agg[f"c{n}"] = Count("id", filter=q)
+        agg[f"m{n}"] = Coalesce(Sum("monto", filter=q), dec0)
+    tot = pendientes.aggregate(**agg)
+
+    out = {k: {"count": tot[f"c{n}"], "monto": tot[f"m{n}"]} for n, k in enumerate(tramos)}
+    return {"as_of": today.isoformat(), "buckets": out}
+
+
+def vencidos(limit=None, using=None):
+    """Recibos vencidos (Recibo.vencido, lo pone al día barrer_vencidos) agrupados por receptor."""
+    filas = vencimiento.por_receptor(using)
+    items = [
+        {
+            "user_id": f["receptor_id"],
+            "display_name": (f"{f['receptor__first_name']} {f['receptor__last_name']}".strip()
+                             or f["receptor__username"]),
+            "count": f["count"],
+            "monto": f["monto"],
+            "since": f["desde"],
+        }
+        for f in filas
+    ]
+    return {
+        "count": sum(i["count"] for i in items),
+        "monto": sum((i["monto"] for i in items), Decimal("0")),
+        "receptores": len(items),
+        "items": items[:limit] if limit else items,
+    }
+
+
+# ---------- dashboard ----------
+
+@contextmanager
+def snapshot(using):
+    """
+    Transacción de solo lectura en la que todas las consultas ven los mismos datos.
+    MySQL (READ COMMITTED por defecto en Django) y PostgreSQL necesitan REPEATABLE READ
+    explícito; en SQLite una transacción ya lee de un único snapshot.
+    """
+    with transaction.atomic(using=using):
+        conn = connections[using]
+        if conn.vendor in ("mysql", "postgresql"):
+            with conn.cursor() as cur:
+                cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        yield
+
+
+def _medir(fn, *args, **kwargs):
+    inicio = time.perf_counter()
+    datos = fn(*args, **kwargs)
+    return datos, round((time.perf_counter() - inicio) * 1000, 2)
+
+
+def _en_hilo(fn, *args, **kwargs):
+    # Cada hilo abre su propia conexión: se cierra al terminar para no dejarla colgada
+    try:
+        return _medir(fn, *args, **kwargs)
+    finally:
+        connections.close_all()
+
+
+def dashboard(secciones, consistente=True, max_hilos=4):
+    """
+    secciones: {nombre: (función, kwargs)}. Devuelve (datos, tiempos_ms).
+    Con `consistente` todo corre en serie sobre una conexión y un snapshot; si no,
+    en paralelo (cada hilo con su conexión, sin garantía de que los números cuadren).
+    """
+    using = router.db_for_read(Recibo)
+    datos, tiempos = {}, {}
+    if consistente:
+        with snapshot(using):
+            for nombre, (fn, kwargs) in secciones.items():
+                datos[nombre], tiempos[nombre] = _medir(fn, using=using, **kwargs)
+        return datos, tiempos
+
+    with ThreadPoolExecutor(max_workers=min(max_hilos, len(secciones)) or 1) as pool:
+        futuros = {
+            # copy_context: el hilo hereda el enrutado a réplica de la petición
+            nombre: pool.submit(contextvars.copy_context().run, _en_hilo, fn, using=using, **kwargs)
+            for nombre, (fn, kwargs) in secciones.items()
+        }
+        for nombre, futuro in futuros.items():
+            datos[nombre], tiempos[nombre] = futuro.result()
+    return datos, tiempos
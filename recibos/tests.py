@@ -1,3 +1,544 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+from decimal import Decimal
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from sist_rec_api import throttling
+from sist_rec_api.renderers import msgpack
+from transferencias.models import Transferencia, TransferenciaArchivada
+
+from . import archivo, busqueda, cambios, presupuesto, vencimiento
+from .models import Cambio, Recibo, ReciboArchivado, SaldoPendiente
+
+User = get_user_model()
+
+
+@override_settings(AUDITORIA_ACTIVA=False)
+class SaldoPendienteTests(TestCase):
+    def setUp(self):
+        self.emisor = User.objects.create_user("emisor", password="pw123456")
+        self.receptor = User.objects.create_user("receptor", password="pw123456")
+
+    def _recibo(self, monto="10.00", **kw):
+        return Recibo.objects.create(
+            emisor=self.emisor, receptor=self.receptor, monto=Decimal(monto), fecha=datetime.date(2024, 1, 1), **kw
+        )
+
+    def test_alta_y_borrado_ajustan_el_saldo(self):
+        r1 = self._recibo("10.00")
+        self._recibo("5.50")
+        saldo = SaldoPendiente.objects.get(receptor=self.receptor)
+        self.assertEqual((saldo.total, saldo.count), (Decimal("15.50"), 2))
+        r1.delete()
+        saldo.refresh_from_db()
+        self.assertEqual((saldo.total, saldo.count), (Decimal("5.50"), 1))
+
+    def test_borrar_receptor_con_pendientes(self):
+        self._recibo("10.00")
+        self._recibo("3.00")
+        self.receptor.delete()
+        self.assertFalse(Recibo.objects.exists())
+        self.assertFalse(SaldoPendiente.objects.exists())
+
+    def test_borrar_emisor_descuenta_del_receptor(self):
+        self._recibo("10.00")
+        otro = User.objects.create_user("otro", password="pw123456")
+        Recibo.objects.create(emisor=otro, receptor=self.receptor, monto=Decimal("4.00"), fecha=datetime.date(2024, 1, 2))
+        self.emisor.delete()
+        saldo = SaldoPendiente.objects.get(receptor=self.receptor)
+        self.assertEqual((saldo.total, saldo.count), (Decimal("4.00"), 1))
+
+    def test_borrado_sin_fila_no_crea_saldo_negativo(self):
+        r = self._recibo("10.00")
+        SaldoPendiente.objects.all().delete()
+        r.delete()
+        self.assertFalse(SaldoPendiente.objects.exists())
+
+
+@override_settings(AUDITORIA_ACTIVA=False, THROTTLE_BUCKETS={})
+class BatchTests(TestCase):
+    def setUp(self):
+        self.emisor = User.objects.create_user("emisor", password="pw123456")
+        self.receptores = [User.objects.create_user(f"r{i}", password="pw123456") for i in range(3)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.emisor)
+
+    def _items(self):
+        return [
+            {"receptor": u.id, "monto": f"{i + 1}.25", "fecha": "2024-03-01", "descripcion": f"d{i}"}
+            for i, u in enumerate(self.receptores)
+        ]
+
+    def _comprobar(self, resp):
+        self.assertEqual(resp.status_code, 201, resp.content)
+        ids = [r["id"] for r in resp.json()["results"]]
+        self.assertNotIn(None, ids)
+        por_id = Recibo.objects.in_bulk(ids)
+        self.assertEqual([por_id[i].receptor_id for i in ids], [u.id for u in self.receptores])
+        self.assertEqual(
+            set(Cambio.objects.filter(entidad=Cambio.Entidad.RECIBO, accion=Cambio.Accion.CREADO).values_list("objeto_id", flat=True)),
+            set(ids),
+        )
+
+    def test_ids_y_feed(self):
+        self._comprobar(self.client.post("/api/recibos/batch/", self._items(), format="json"))
+        self.assertFalse(Recibo.objects.exclude(lote_alta=None).exists())
+
+    def test_ids_sin_returning(self):
+        # Como MySQL: bulk_create no devuelve pk y se recuperan por la marca de lote
+        with mock.patch.object(type(connection.features), "can_return_rows_from_bulk_insert", False):
+            self._comprobar(self.client.post("/api/recibos/batch/", self._items(), format="json"))
+
+    def test_atomic_no_inserta_si_falla_uno(self):
+        items = self._items() + [{"receptor": self.emisor.id, "monto": "1.00", "fecha": "2024-03-01"}]
+        resp = self.client.post("/api/recibos/batch/", items, format="json")
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(Recibo.objects.exists())
+
+    def test_partial_inserta_los_validos(self):
+        items = self._items() + [{"receptor": 999999, "monto": "1.00", "fecha": "2024-03-01"}]
+        resp = self.client.post("/api/recibos/batch/", {"mode": "partial", "items": items}, format="json")
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual((resp.json()["created"], resp.json()["failed"]), (3, 1))
+        self.assertEqual(SaldoPendiente.objects.get(receptor=self.receptores[2]).total, Decimal("3.25"))
+
+
+@override_settings(AUDITORIA_ACTIVA=False, THROTTLE_BUCKETS={})
+class CambiosTests(TestCase):
+    def setUp(self):
+        self.emisor = User.objects.create_user("emisor", password="pw123456")
+        self.receptor = User.objects.create_user("receptor", password="pw123456")
+        self.otro = User.objects.create_user("otro", password="pw123456")
+        self.client = APIClient()
+        self.client.force_authenticate(self.receptor)
+
+    def _recibo(self, emisor=None, receptor=None):
+        return Recibo.objects.create(
+            emisor=emisor or self.emisor, receptor=receptor or self.receptor,
+            monto=Decimal("1.00"), fecha=datetime.date(2024, 1, 1),
+        )
+
+    def _leer(self, since):
+        resp = self.client.get("/api/changes/", {"since": since})
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return resp.json()
+
+    def test_cursor_y_visibilidad(self):
+        cursor = self.client.get("/api/changes/").json()["cursor"]
+        r = self._recibo()
+        self._recibo(emisor=self.otro, receptor=self.emisor)  # no es del receptor
+        r.marcar_pagado()
+        datos = self._leer(cursor)
+        self.assertEqual([(c["objeto_id"], c["accion"]) for c in datos["changes"]], [(r.id, "created"), (r.id, "paid")])
+        self.assertEqual(self._leer(datos["cursor"])["changes"], [])
+
+    def test_commit_tardio_con_id_menor(self):
+        # Una transacción larga inserta un id menor y confirma después de que el cursor lo pasó
+        r = self._recibo()
+        hueco = Cambio.objects.order_by("-id").first().id + 1
+        Cambio.objects.create(
+            id=hueco + 10, entidad=Cambio.Entidad.RECIBO, accion=Cambio.Accion.EDITADO,
+            objeto_id=r.id, emisor_id=self.emisor.id, receptor_id=self.receptor.id,
+        )
+        cursor = self._leer(0)["cursor"]
+        tardio = Cambio.objects.create(
+            id=hueco, entidad=Cambio.Entidad.RECIBO, accion=Cambio.Accion.EDITADO,
+            objeto_id=r.id, emisor_id=self.emisor.id, receptor_id=self.receptor.id,
+        )
+        self.assertEqual([c["id"] for c in self._leer(cursor)["changes"]], [tardio.id])
+
+    def _purgar_hasta(self, secuencia):
+        Cambio.objects.filter(secuencia__lte=secuencia).update(creado_en=timezone.now() - datetime.timedelta(days=30))
+        return cambios.purgar(timezone.now() - datetime.timedelta(days=1))
+
+    def test_cursor_expirado(self):
+        for _ in range(3):
+            self._recibo()
+        cursor = self._leer(0)["cursor"]
+        self._recibo()
+        self._leer(cursor)
+        self.assertEqual(self._purgar_hasta(cursor), 3)
+        self.assertEqual(self.client.get("/api/changes/", {"since": 1}).status_code, 410)
+        self.assertEqual(self.client.get("/api/changes/", {"since": cursor}).status_code, 200)
+
+    def test_cursor_expirado_con_el_feed_vacio(self):
+        viejo = self._leer(0)["cursor"]
+        for _ in range(3):
+            self._recibo()
+        cursor = self._leer(viejo)["cursor"]
+        self._purgar_hasta(cursor)
+        self.assertFalse(Cambio.objects.exists())
+        self.assertEqual(self.client.get("/api/changes/", {"since": viejo}).status_code, 410)
+        self.assertEqual(self._leer(cursor)["changes"], [])
+
+    def test_sin_pendientes_no_bloquea_el_contador(self):
+        self._recibo()
+        cambios.sellar()
+        with self.assertNumQueries(1):
+            self.assertEqual(cambios.sellar(), 0)
+
+
+@override_settings(AUDITORIA_ACTIVA=False, THROTTLE_BUCKETS={})
+class VencimientoTests(TestCase):
+    def setUp(self):
+        self.emisor = User.objects.create_user("emisor", password="pw123456")
+        self.receptor = User.objects.create_user("receptor", password="pw123456")
+        self.hoy = timezone.localdate()
+        self.luego = self.hoy + datetime.timedelta(days=10)
+
+    def _recibo(self, monto="1.00", receptor=None, dias=3):
+        return Recibo.objects.create(
+            emisor=self.emisor, receptor=receptor or self.receptor, monto=Decimal(monto),
+            fecha=self.hoy, vence_en=self.hoy + datetime.timedelta(days=dias),
+        )
+
+    def _vencidos(self):
+        return set(Recibo.objects.filter(vencido=True).values_list("id", flat=True))
+
+    def test_marca_y_desmarca(self):
+        pagado, aplazado, sigue = self._recibo(), self._recibo(), self._recibo()
+        self._recibo(dias=20)  # aún no vence
+        self.assertEqual(vencimiento.barrer(self.luego), (3, 0))
+        self.assertEqual(self._vencidos(), {pagado.id, aplazado.id, sigue.id})
+        # Cambios en bloque que no pasan por save(): el barrido los corrige
+        Recibo.objects.filter(pk=pagado.pk).update(status=Recibo.Status.PAGADO)
+        Recibo.objects.filter(pk=aplazado.pk).update(vence_en=self.luego + datetime.timedelta(days=5))
+        self.assertEqual(vencimiento.barrer(self.luego), (0, 2))
+        self.assertEqual(self._vencidos(), {sigue.id})
+        self.assertEqual(vencimiento.barrer(self.luego), (0, 0))
+
+    def test_tramos_hasta_uno_incompleto(self):
+        for _ in range(5):
+            self._recibo()
+        with mock.patch.object(vencimiento, "_tramo", wraps=vencimiento._tramo) as tramo:
+            self.assertEqual(vencimiento.barrer(self.luego, lote=2), (5, 0))
+        # marcar: 2 + 2 + 1 (el incompleto corta); desmarcar: 0
+        self.assertEqual([c.args[1:3] for c in tramo.call_args_list], [(True, 2)] * 3 + [(False, 2)])
+
+    def test_feed_y_actualizado_en(self):
+        a, b = self._recibo(), self._recibo()
+        self._recibo(dias=20)
+        antes = {r.id: r.actualizado_en for r in (a, b)}
+        ultimo = Cambio.objects.order_by("-id").values_list("id", flat=True).first()
+        vencimiento.barrer(self.luego)
+        nuevos = Cambio.objects.filter(id__gt=ultimo)
+        self.assertEqual(
+            sorted(nuevos.values_list("objeto_id", "accion")),
+            [(a.id, Cambio.Accion.EDITADO), (b.id, Cambio.Accion.EDITADO)],
+        )
+        self.assertTrue(all(c.datos["vencido"] for c in nuevos))
+        for r in Recibo.objects.filter(pk__in=antes):
+            self.assertGreater(r.actualizado_en, antes[r.id])
+
+    def test_por_receptor(self):
+        otro = User.objects.create_user("otro", password="pw123456")
+        tercero = User.objects.create_user("tercero", password="pw123456")
+        self._recibo("5.00")
+        self._recibo("5.00")
+        self._recibo("30.00", receptor=otro, dias=1)
+        self._recibo("10.00", receptor=tercero)
+        self._recibo("99.00", receptor=tercero, dias=20)  # no vencido
+        vencimiento.barrer(self.luego)
+        filas = vencimiento.por_receptor()
+        self.assertEqual(
+            [(f["receptor_id"], f["count"], f["monto"]) for f in filas],
+            [(otro.id, 1, Decimal("30.00")), (self.receptor.id, 2, Decimal("10.00")), (tercero.id, 1, Decimal("10.00"))],
+        )
+        self.assertEqual(filas[0]["desde"], self.hoy + datetime.timedelta(days=1))
+
+    def test_comando(self):
+        self._recibo("7.00")
+        salida = io.StringIO()
+        call_command("barrer_vencidos", fecha=self.luego.isoformat(), stdout=salida)
+        self.assertIn("1 recibo(s) vencidos, 0 desmarcados", salida.getvalue())
+        self.assertIn("receptor", salida.getvalue())
+        with self.assertRaises(CommandError):
+            call_command("barrer_vencidos", fecha="mañana", stdout=io.StringIO())
+
+
+@override_settings(AUDITORIA_ACTIVA=False, THROTTLE_BUCKETS={})
+class ArchivoTests(TestCase):
+    CORTE = datetime.date(2021, 1, 1)
+
+    def setUp(self):
+        self.emisor = User.objects.create_user("emisor", password="pw123456")
+        self.receptor = User.objects.create_user("receptor", password="pw123456")
+        self.otro = User.objects.create_user("otro", password="pw123456")
+        self.pagado = self._recibo(datetime.date(2020, 3, 1), "25.00", Recibo.Status.PAGADO)
+        self.transferencia = Transferencia.objects.create(
+            recibo=self.pagado, pagador=self.receptor, monto=self.pagado.monto,
+            fecha=self.pagado.pagado_en, referencia="TRX-9",
+        )
+        self.pendiente = self._recibo(datetime.date(2020, 3, 2), "7.00")
+        self.reciente = self._recibo(datetime.date(2021, 6, 1), "3.00", Recibo.Status.PAGADO)
+
+    def _recibo(self, fecha, monto, status=Recibo.Status.PENDIENTE):
+        pagado_en = timezone.make_aware(datetime.datetime.combine(fecha, datetime.time(12))) if status == Recibo.Status.PAGADO else None
+        return Recibo.objects.create(
+            emisor=self.emisor, receptor=self.receptor, monto=Decimal(monto), fecha=fecha,
+            status=status, pagado_en=pagado_en, descripcion="alquiler",
+        )
+
+    def _cliente(self, user):
+        c = APIClient()
+        c.force_authenticate(user)
+        return c
+
+    def test_mueve_recibo_y_transferencia_con_sus_ids(self):
+        ultimo = Cambio.objects.order_by("-id").values_list("id", flat=True).first()
+        self.assertEqual(archivo.archivar_lote(self.CORTE), 1)
+
+        self.assertEqual(
+            set(Recibo.objects.values_list("id", flat=True)), {self.pendiente.id, self.reciente.id},
+        )
+        self.assertFalse(Transferencia.objects.exists())
+        r = ReciboArchivado.objects.get(pk=self.pagado.id)
+        self.assertEqual(
+            (r.emisor_id, r.receptor_id, r.monto, r.fecha, r.status, r.pagado_en, r.descripcion, r.partes),
+            (self.emisor.id, self.receptor.id, Decimal("25.00"), self.pagado.fecha, Recibo.Status.PAGADO,
+             self.pagado.pagado_en, "alquiler", self.pagado.partes),
+        )
+        t = TransferenciaArchivada.objects.get(pk=self.transferencia.id)
+        self.assertEqual((t.recibo_id, t.pagador_id, t.referencia), (self.pagado.id, self.receptor.id, "TRX-9"))
+
+        # En el feed solo 'archived' (nada de 'deleted'); el saldo pendiente no cambia
+        self.assertEqual(
+            list(Cambio.objects.filter(id__gt=ultimo).values_list("entidad", "objeto_id", "accion")),
+            [(Cambio.Entidad.RECIBO, self.pagado.id, Cambio.Accion.ARCHIVADO)],
+        )
+        saldo = SaldoPendiente.objects.get(receptor=self.receptor)
+        self.assertEqual((saldo.total, saldo.count), (Decimal("7.00"), 1))
+        self.assertEqual(archivo.archivar_lote(self.CORTE), 0)
+
+    def test_lectura_del_archivo_respeta_el_alcance(self):
+        archivo.archivar_lote(self.CORTE)
+        rid, tid = self.pagado.id, self.transferencia.id
+        for user, ve in ((self.receptor, True), (self.emisor, True), (self.otro, False)):
+            c = self._cliente(user)
+            recibos = {f["id"] for f in c.get("/api/recibos/", {"archivo": 1}).json()}
+            self.assertEqual(recibos, {rid} if ve else set(), user.username)
+            self.assertEqual(c.get(f"/api/recibos/{rid}/", {"archivo": 1}).status_code, 200 if ve else 404)
+            transferencias = {f["id"] for f in c.get("/api/transferencias/", {"archivo": 1}).json()}
+            self.assertEqual(transferencias, {tid} if ve else set(), user.username)
+            self.assertEqual(c.get(f"/api/transferencias/{tid}/", {"archivo": 1}).status_code, 200 if ve else 404)
+        # Sin ?archivo= ya no aparece
+        self.assertEqual(self._cliente(self.receptor).get(f"/api/recibos/{rid}/").status_code, 404)
+
+
+@override_settings(AUDITORIA_ACTIVA=False, THROTTLE_BUCKETS={})
+class BusquedaTests(TestCase):
+    def setUp(self):
+        self.emisor = User.objects.create_user("emisor", password="pw123456", first_name="Lucía", last_name="Pérez")
+        self.receptor = User.objects.create_user("receptor", password="pw123456")
+        self.alquiler = self._recibo("Alquiler de marzo")
+        self.luz = self._recibo("Luz y gas")
+        self.client = APIClient()
+        self.client.force_authenticate(self.receptor)
+
+    def _recibo(self, descripcion, emisor=None):
+        return Recibo.objects.create(
+            emisor=emisor or self.emisor, receptor=self.receptor, monto=Decimal("1.00"),
+            fecha=datetime.date(2024, 1, 1), descripcion=descripcion,
+        )
+
+    def _buscar(self, q):
+        resp = self.client.get("/api/recibos/", {"q": q})
+        self.assertEqual(resp.status_code, 200)
+        return {f["id"] for f in resp.json()}
+
+    def test_por_descripcion_y_partes(self):
+        self.assertEqual(self._buscar("alquiler"), {self.alquiler.id})
+        self.assertEqual(self._buscar("pérez MARZO"), {self.alquiler.id})
+        self.assertEqual(self._buscar("lucía"), {self.alquiler.id, self.luz.id})
+        self.assertEqual(self._buscar("pérez agua"), set())
+        # Los operadores de MATCH se ignoran
+        self.assertEqual(self._buscar('+"luz"* -'), {self.luz.id})
+
+    def test_renombre_de_usuario_recien_creado(self):
+        nuevo = User.objects.create_user("nuevo", password="pw123456")
+        r = self._recibo("Expensas", emisor=nuevo)
+        nuevo.last_name = "Gómez"
+        nuevo.save()
+        self.assertEqual(self._buscar("gómez"), {r.id})
+        nuevo.username = "renombrado"
+        nuevo.save()
+        self.assertEqual(self._buscar("renombrado"), {r.id})
+        self.assertEqual(self._buscar("nuevo"), set())
+
+    def test_fulltext_en_mysql(self):
+        with mock.patch.object(connection, "vendor", "mysql"):
+            sql = str(busqueda.buscar(Recibo.objects.all(), "alquiler de marzo").query)
+        self.assertIn("MATCH (\"recibos_recibo\".descripcion, \"recibos_recibo\".partes) AGAINST (+alquiler* +marzo* IN BOOLEAN MODE)", sql)
+        # "de" es más corto que el token mínimo del índice: va con LIKE
+        self.assertIn("%de%", sql)
+        self.assertNotIn("%alquiler%", sql)
+
+
+class PresupuestoTests(TestCase):
+    LENTA = "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 50000000) SELECT count(*) FROM n"
+
+    def test_corta_la_consulta_lenta(self):
+        with self.assertRaises(presupuesto.PresupuestoExcedido):
+            with presupuesto.limite_consulta(50):
+                with connection.cursor() as cur:
+                    cur.execute(self.LENTA)
+        # Fuera del bloque ya no hay límite
+        with connection.cursor() as cur:
+            cur.execute("SELECT 1")
+        self.assertEqual(connection.execute_wrappers, [])
+
+    def test_sin_consultas_no_toca_la_conexion(self):
+        # Con una réplica caída tampoco debe fallar si la acción no llega a consultar
+        with mock.patch.object(connection, "ensure_connection", side_effect=AssertionError("conectó")):
+            with presupuesto.limite_consulta(50):
+                pass
+
+
+@override_settings(AUDITORIA_ACTIVA=False, THROTTLE_BUCKETS={})
+class CondicionalTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user("admin", password="pw123456", role=1)
+        self.emisor = User.objects.create_user("emisor", password="pw123456")
+        self.receptor = User.objects.create_user("receptor", password="pw123456")
+        self.recibos = [
+            Recibo.objects.create(emisor=self.emisor, receptor=self.receptor, monto=Decimal("2.00"), fecha=datetime.date(2024, 1, d))
+            for d in (1, 2)
+        ]
+
+    def _cliente(self, user):
+        c = APIClient()
+        c.force_authenticate(user)
+        return c
+
+    def _tras_borrar(self, user):
+        c = self._cliente(user)
+        resp = c.get("/api/recibos/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn("Last-Modified", resp)
+        etag = resp["ETag"]
+        self.recibos[0].delete()
+        resp = c.get("/api/recibos/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.json()), 1)
+        self.assertEqual(c.get("/api/recibos/", HTTP_IF_NONE_MATCH=resp["ETag"]).status_code, 304)
+
+    def test_listado_admin_tras_borrar(self):
+        self._tras_borrar(self.admin)
+
+    def test_listado_usuario_tras_borrar(self):
+        self._tras_borrar(self.receptor)
+
+    def test_detalle_con_last_modified(self):
+        c = self._cliente(self.receptor)
+        resp = c.get(f"/api/recibos/{self.recibos[1].id}/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(c.get(f"/api/recibos/{self.recibos[1].id}/", HTTP_IF_MODIFIED_SINCE=resp["Last-Modified"]).status_code, 304)
+
+    def test_admin_ve_cambios_de_transferencias(self):
+        r = self.recibos[1]
+        t = Transferencia.objects.create(recibo=r, pagador=self.receptor, monto=r.monto)
+        c = self._cliente(self.admin)
+        etag = c.get("/api/transferencias/")["ETag"]
+        t.nota = "corregida"
+        t.save()
+        self.assertEqual(c.get("/api/transferencias/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_renombre_invalida_los_listados(self):
+        for user in (self.admin, self.receptor):
+            c = self._cliente(user)
+            etag = c.get("/api/recibos/")["ETag"]
+            emisor = User.objects.get(pk=self.emisor.pk)
+            emisor.username = f"emisor-{user.username}"
+            emisor.save()
+            resp = c.get("/api/recibos/", HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual({f["emisor_username"] for f in resp.json()}, {emisor.username})
+
+    def test_usuario_con_expand_ve_cambios_de_la_transferencia(self):
+        r = self.recibos[1]
+        t = Transferencia.objects.create(recibo=r, pagador=self.receptor, monto=r.monto)
+        c = self._cliente(self.receptor)
+        etag = c.get("/api/recibos/", {"expand": "transferencia"})["ETag"]
+        t.nota = "corregida"
+        t.save()
+        resp = c.get("/api/recibos/", {"expand": "transferencia"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("corregida", [f["transferencia"] and f["transferencia"]["nota"] for f in resp.json()])
+        self.assertEqual(c.get("/api/recibos/", {"expand": "transferencia"}, HTTP_IF_NONE_MATCH=resp["ETag"]).status_code, 304)
+
+
+@override_settings(AUDITORIA_ACTIVA=False, THROTTLE_BUCKETS={})
+class FormatosTests(TestCase):
+    def setUp(self):
+        self.emisor = User.objects.create_user("emisor", password="pw123456")
+        self.receptor = User.objects.create_user("receptor", password="pw123456")
+        self.recibo = Recibo.objects.create(
+            emisor=self.emisor, receptor=self.receptor, monto=Decimal("10.50"), fecha=datetime.date(2024, 1, 1),
+        )
+        Transferencia.objects.create(recibo=self.recibo, pagador=self.receptor, monto=Decimal("10.50"))
+        self.client = APIClient()
+        self.client.force_authenticate(self.receptor)
+
+    def _msgpack(self, url):
+        resp = self.client.get(url, HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp["Content-Type"], "application/msgpack")
+        return msgpack.unpackb(resp.content)
+
+    @skipIf(msgpack is None, "msgpack no está instalado")
+    def test_msgpack_siempre_en_centavos(self):
+        self.assertEqual(self._msgpack("/api/recibos/")[0]["monto"], 1050)
+        expandido = self._msgpack("/api/recibos/?expand=transferencia")[0]
+        self.assertEqual((expandido["monto"], expandido["transferencia"]["monto"]), (1050, 1050))
+        self.assertEqual(self._msgpack(f"/api/recibos/{self.recibo.id}/")["monto"], 1050)
+        self.assertEqual(self._msgpack("/api/transferencias/")[0]["monto"], 1050)
+
+    def test_json_sigue_en_texto(self):
+        self.assertEqual(self.client.get("/api/recibos/?expand=transferencia").json()[0]["monto"], "10.50")
+        self.assertEqual(self.client.get(f"/api/recibos/{self.recibo.id}/").json()["monto"], "10.50")
+
+
+@override_settings(
+    AUDITORIA_ACTIVA=False, THROTTLE_BUCKETS={},
+    THROTTLE_CONCURRENCIA={"stats": {"usuario": 1, "total": 1}},
+    THROTTLE_STORE="sist_rec_api.throttling.MemoriaStore",
+)
+class OverviewBatchTests(TestCase):
+    def setUp(self):
+        throttling._store = None
+        self.addCleanup(setattr, throttling, "_store", None)
+        self.admin = User.objects.create_user("admin", password="pw123456", role=1)
+        self.receptor = User.objects.create_user("receptor", password="pw123456")
+        Recibo.objects.create(emisor=self.admin, receptor=self.receptor, monto=Decimal("3.00"), fecha=datetime.date(2024, 1, 1))
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _batch(self):
+        return self.client.post("/api/recibos/user-overview/batch/", {"user_ids": [self.receptor.id, 999999]}, format="json")
+
+    def test_hueco_de_stats_hasta_terminar_el_stream(self):
+        resp = self._batch()
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self._batch().status_code, 429)
+        datos = json.loads(b"".join(resp.streaming_content))
+        self.assertEqual((datos["count"], datos["missing"]), (2, [999999]))
+        otra = self._batch()
+        self.assertEqual(otra.status_code, 200)
+        otra.close()
+
+    def test_mismos_montos_que_user_overview(self):
+        r = Recibo.objects.create(emisor=self.admin, receptor=self.receptor, monto=Decimal("2.10"), fecha=datetime.date(2024, 1, 2))
+        Transferencia.objects.create(recibo=r, pagador=self.receptor, monto=Decimal("2.10"))
+        resp = self._batch()
+        item = json.loads(b"".join(resp.streaming_content))["items"][0]
+        unico = self.client.get("/api/recibos/user-overview/", {"user_id": self.receptor.id})
+        self.assertEqual(item, unico.json())
+        self.assertEqual(item["sum_pagado"], 2.1)
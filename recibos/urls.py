@@ -1,10 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ReciboViewSet
+from .views import ReciboViewSet, CambiosView
 
 router = DefaultRouter()
 router.register(r"recibos", ReciboViewSet, basename="recibo")
 
 urlpatterns = [
+    path("changes/", CambiosView.as_view()),
     path("", include(router.urls)),
 ]
@@ -0,0 +1,81 @@
+"""
+Vencimiento de recibos.
+
+Recibo.vencido es un dato derivado (PENDIENTE con vence_en < hoy) con índice, así que
+contar o listar lo vencido no recorre todos los pendientes. save() lo mantiene al editar
+o pagar; el paso de los días lo aplica `barrer()` (manage.py barrer_vencidos, cada pocos
+minutos): UPDATEs por tramos que solo tocan las filas que cambian de estado, con
+actualizado_en (ETag) y entradas del feed de cambios en bloque.
+"""
+from django.db import transaction
+from django.db.models import Count, Min, Q, Sum
+from django.utils import timezone
+
+from . import cambios
+from .models import Cambio, Recibo
+
+
+def por_vencer(hoy):
+    """Pendientes que ya vencieron y aún no están marcados (recibo_barrido_idx)."""
+    return Recibo.objects.filter(status=Recibo.Status.PENDIENTE, vencido=False, vence_en__lt=hoy)
+
+
+def por_desmarcar(hoy):
+    """Marcados que ya no lo están: pagados o con vence_en cambiado por un update() en bloque."""
+    return Recibo.objects.filter(vencido=True).filter(
+        ~Q(status=Recibo.Status.PENDIENTE) | Q(vence_en__isnull=True) | Q(vence_en__gte=hoy)
+    )
+
+
+def _tramo(qs, valor, lote, ahora):
+    """Marca `vencido=valor` en hasta `lote` filas de `qs`. Devuelve cuántas cambió."""
+    with transaction.atomic():
+        filas = list(
+            qs.select_for_update().order_by("pk").values(*cambios.CAMPOS_RECIBO)[:lote]
+        )
+        if not filas:
+            return 0
+        cambiadas = Recibo.objects.filter(pk__in=[f["id"] for f in filas]).update(
+            vencido=valor, actualizado_en=ahora,
+        )
+        if not cambios.silenciado():
+            lote_cambios = []
+            for f in filas:
+                f["vencido"] = valor
+                datos = {c.removesuffix("_id") if c != "id" else c: f[c] for c in cambios.CAMPOS_RECIBO}
+                lote_cambios.append(cambios.nuevo(
+                    Cambio.Entidad.RECIBO, Cambio.Accion.EDITADO, f["id"], f["emisor_id"], f["receptor_id"], datos,
+                ))
+            cambios.registrar_lote(lote_cambios)
+    return cambiadas
+
+
+def barrer(hoy=None, lote=5000):
+    """
+    Pone al día Recibo.vencido a fecha `hoy` (por defecto la local). Cada tramo es una
+    transacción corta; las filas ya tratadas salen del filtro, así que no hace falta cursor.
+    Devuelve (marcados, desmarcados).
+    """
+    hoy = hoy or timezone.localdate()
+    totales = []
+    for qs, valor in ((por_vencer(hoy), True), (por_desmarcar(hoy), False)):
+        total = 0
+        while True:
+            n = _tramo(qs, valor, lote, timezone.now())
+            total += n
+            if n < lote:
+                break
+        totales.append(total)
+    return tuple(totales)
+
+
+def por_receptor(using=None):
+    """Lo vencido agrupado por receptor, de mayor a menor monto, en una sola consulta."""
+    qs = Recibo.objects.filter(vencido=True)
+    if using:
+        qs = qs.using(using)
+    return list(
+        qs.values("receptor_id", "receptor__username", "receptor__first_name", "receptor__last_name")
+        .annotate(count=Count("id"), monto=Sum("monto"), desde=Min("vence_en"))
+        .order_by("-monto", "receptor_id")
+    )
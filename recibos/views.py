@@ -1,27 +1,63 @@
-import csv, io, datetime, re
+import csv, io, datetime, re, time, uuid
 from decimal import Decimal, InvalidOperation
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import transaction
-from rest_framework.parsers import MultiPartParser, FormParser
-from rest_framework import viewsets, permissions, status
+from django.db import connections, router, transaction
+from django.http import StreamingHttpResponse
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
+from rest_framework import generics, viewsets, permissions, status
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from rest_framework.decorators import action
 from django.db.models import Q
 from django.utils import timezone
-from .models import Recibo
-from .serializers import ReciboSerializer
+from .models import Cambio, Recibo, ReciboArchivado, construir_partes
+from . import bloque, cambios, comprobantes, overview, ranking, stats
+from .serializers import ReciboSerializer, ReciboArchivadoSerializer, ReciboLoteSerializer, filas_recibos
+from .mixins import CamposDinamicosViewMixin
+from .condicional import condicional, fuente_listado, fuente_detalle
+from .busqueda import buscar
+from .presupuesto import con_presupuesto
+from .archivo import (
+    ArchivoViewMixin, agregar, combinar_series, fuentes_recibos, fuentes_transferencias, incluir_archivo,
+)
 from django.db.models import Sum, Count, Case, When, F, DecimalField, Value, Q
 from django.db.models.functions import TruncMonth, Coalesce
 from transferencias.models import Transferencia
+from sist_rec_api.db_router import LecturaReplicaMixin
+from sist_rec_api.renderers import conversor_dinero
+from sist_rec_api.throttling import LimiteConcurrenciaMixin
 
 class EsAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
         return request.user.is_authenticated and getattr(request.user, "role", 0) == 1
 User = get_user_model()
-class ReciboViewSet(viewsets.ModelViewSet):
+
+def fuente_recibos(view, request, *args, **kwargs):
+    return fuentes_recibos(incluir_archivo(request))
+
+def fuente_recibos_y_transferencias(view, request, *args, **kwargs):
+    archivo = incluir_archivo(request)
+    return fuentes_recibos(archivo) + fuentes_transferencias(archivo)
+
+class ReciboViewSet(LimiteConcurrenciaMixin, LecturaReplicaMixin, ArchivoViewMixin, CamposDinamicosViewMixin, viewsets.ModelViewSet):
     queryset = Recibo.objects.all().order_by("-creado_en")
     serializer_class = ReciboSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Clase de throttling de las acciones que no se deducen del nombre (stats_* → stats)
+    throttle_clases = {
+        "import_csv": "imports", "batch": "imports", "receipts": "imports",
+        "stats_user_overview_batch": "stats",
+    }
+    acciones_replica = {
+        "list", "retrieve",
+        "stats_summary", "stats_monthly", "stats_top_debtors", "stats_top_debtors_rank", "stats_aging", "stats_overdue",
+        "stats_dashboard",
+        "stats_user", "stats_user_overview",
+    }
+    # ?archivo=1 en list/retrieve lee del archivo (recibos pagados antiguos)
+    queryset_archivo = ReciboArchivado.objects.all().order_by("-creado_en")
+    serializer_class_archivo = ReciboArchivadoSerializer
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -38,8 +74,28 @@ class ReciboViewSet(viewsets.ModelViewSet):
         status_param = self.request.query_params.get("status")
         if status_param in ("PENDING", "PAID"):
             qs = qs.filter(status=status_param)
+
+        if self.request.query_params.get("overdue") in ("1", "true"):
+            qs = qs.filter(vencido=True)
+
+        q = self.request.query_params.get("q")
+        if q:
+            qs = buscar(qs, q)
         return qs
 
+    @condicional(fuente_listado)
+    def list(self, request, *args, **kwargs):
+        campos, expand = self._campos_y_expand()
+        if expand or self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+        # Sin objetos anidados la salida sale directa de las filas (ver filas_recibos)
+        qs = self.filter_queryset(self.get_queryset())
+        return Response(filas_recibos(qs, campos, conversor_dinero(request)))
+
+    @condicional(fuente_detalle, detalle=True)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         serializer.save()
 
@@ -84,6 +140,85 @@ class ReciboViewSet(viewsets.ModelViewSet):
         recibo.pagado_en = timezone.now()
         recibo.save()
         return Response({"detail": "Pago registrado correctamente."}, status=200)
+
+    @action(detail=False, methods=["post"], url_path="batch", parser_classes=[JSONParser])
+    def batch(self, request):
+        """
+        Alta de muchos recibos: POST [ {receptor, monto, fecha, descripcion, vence_en}, ... ]
+        o {"mode": "atomic"|"partial", "items": [...]} (también ?mode=). El emisor es el usuario.
+        - atomic (por defecto): si algún elemento falla no se inserta nada (400).
+        - partial: se insertan los válidos y se informa el error de cada uno de los demás.
+        Receptores en una sola consulta e inserción con bulk_create. Si la BD no devuelve filas
+        en inserciones múltiples (MySQL) los recibos llevan una marca de lote (lote_alta) y los
+        ids se leen en la misma transacción: todos vuelven con id y generan feed y eventos.
+        """
+        data = request.data
+        mode = request.query_params.get("mode")
+        if isinstance(data, dict):
+            mode = data.get("mode", mode)
+            data = data.get("items")
+        mode = mode or "atomic"
+        if mode not in ("atomic", "partial"):
+            return Response({"detail": "mode debe ser atomic o partial."}, status=400)
+        if not isinstance(data, list) or not data:
+            return Response({"detail": "Se espera una lista de recibos."}, status=400)
+        if len(data) > settings.RECIBOS_BATCH_MAX:
+            return Response({"detail": f"Máximo {settings.RECIBOS_BATCH_MAX} recibos por petición."}, status=400)
+
+        user = request.user
+        resultados = [None] * len(data)
+        validos = []
+        # Un solo serializer para todos: instanciar uno por elemento copia sus campos cada vez
+        ser = ReciboLoteSerializer()
+        for i, item in enumerate(data):
+            try:
+                validos.append((i, ser.run_validation(item)))
+            except ValidationError as e:
+                resultados[i] = {"index": i, "ok": False, "errors": e.detail}
+
+        receptores = User.objects.only("id", "username", "first_name", "last_name").in_bulk(
+            {v["receptor"] for _, v in validos}
+        )
+        recibos = []
+        for i, v in validos:
+            receptor = receptores.get(v["receptor"])
+            if receptor is None:
+                resultados[i] = {"index": i, "ok": False, "errors": {"receptor": ["Usuario no encontrado."]}}
+            elif receptor.id == user.id:
+                resultados[i] = {"index": i, "ok": False, "errors": {"non_field_errors": ["No puedes emitir un recibo para ti mismo."]}}
+            else:
+                # bulk_create no pasa por save(): partes se calcula aquí
+                recibo = Recibo(
+                    emisor=user, receptor=receptor, monto=v["monto"], fecha=v["fecha"],
+                    descripcion=v["descripcion"], partes=construir_partes(user, receptor),
+                    vence_en=v["vence_en"],
+                )
+                recibo.vencido = recibo.calcular_vencido()
+                recibos.append((i, recibo))
+
+        fallidos = sum(1 for r in resultados if r is not None)
+        if mode == "atomic" and fallidos:
+            return Response({
+                "mode": mode, "created": 0, "failed": fallidos,
+                "results": [r for r in resultados if r is not None],
+            }, status=400)
+
+        nuevos = [r for _, r in recibos]
+        db = router.db_for_write(Recibo)
+        marca = None if connections[db].features.can_return_rows_from_bulk_insert else uuid.uuid4()
+        for r in nuevos:
+            r.lote_alta = marca
+        with transaction.atomic(using=db):
+            Recibo.objects.using(db).bulk_create(nuevos, batch_size=1000)
+            if marca:
+                bloque.asignar_ids_en_orden(nuevos, Recibo.objects.using(db).filter(lote_alta=marca))
+            bloque.recibos_creados(nuevos)
+
+        for i, r in recibos:
+            resultados[i] = {"index": i, "ok": True, "id": r.pk}
+        return Response({
+            "mode": mode, "created": len(recibos), "failed": fallidos, "results": resultados,
+        }, status=201 if recibos else 400)
     
     @action(
         detail=False,
@@ -101,7 +236,7 @@ class ReciboViewSet(viewsets.ModelViewSet):
         CSV requerido:
           receptor_id,monto,fecha
         Opcional:
-          descripcion
+          descripcion, vence_en (mismos formatos que fecha)
 
         Fecha aceptada en: YYYY-MM-DD, DD/MM/YYYY, MM/DD/YYYY o serial Excel (días desde 1899-12-30).
         Reglas:
@@ -183,6 +318,7 @@ class ReciboViewSet(viewsets.ModelViewSet):
             monto_raw   = row.get("monto") or ""
             fecha_raw   = row.get("fecha") or ""
             descripcion = row.get("descripcion") or ""
+            vence_raw   = row.get("vence_en") or ""
 
             
             try:
@@ -211,6 +347,15 @@ class ReciboViewSet(viewsets.ModelViewSet):
                 errors.append({"row": i, "error": f"Fecha inválida: {fecha_raw} ({e})"})
                 continue
 
+            try:
+                vence_en = parse_fecha(vence_raw) if vence_raw else None
+            except Exception as e:
+                errors.append({"row": i, "error": f"Vencimiento inválido: {vence_raw} ({e})"})
+                continue
+            if vence_en and vence_en < fecha_obj:
+                errors.append({"row": i, "error": "El vencimiento no puede ser anterior a la fecha."})
+                continue
+
             try:
                 with transaction.atomic():
                     Recibo.objects.create(
@@ -219,6 +364,7 @@ class ReciboViewSet(viewsets.ModelViewSet):
                         monto=monto,
                         fecha=fecha_obj,
                         descripcion=descripcion,
+                        vence_en=vence_en,
                     )
                     inserted += 1
             except Exception as e:
@@ -227,136 +373,152 @@ class ReciboViewSet(viewsets.ModelViewSet):
 
         return Response({"inserted": inserted, "errors": errors}, status=200)
     
+    @action(detail=False, methods=["get"], url_path="receipts", permission_classes=[permissions.IsAuthenticated, EsAdmin])
+    def receipts(self, request):
+        """
+        ZIP con un comprobante HTML por recibo PAGADO (y su transferencia), en streaming.
+        Filtros: ?month=YYYY-MM o ?from=&to= (YYYY-MM-DD, por fecha de pago), emisor, receptor, archivo=1.
+        """
+        params = request.query_params
+        try:
+            if params.get("month"):
+                desde, hasta = comprobantes.rango_mes(params["month"])
+            else:
+                desde = params.get("from") and datetime.date.fromisoformat(params["from"])
+                hasta = params.get("to") and datetime.date.fromisoformat(params["to"])
+            emisor = int(params["emisor"]) if params.get("emisor") else None
+            receptor = int(params["receptor"]) if params.get("receptor") else None
+        except ValueError:
+            return Response({"detail": "month (YYYY-MM), from/to (YYYY-MM-DD) o emisor/receptor inválidos."}, status=400)
+
+        filas = comprobantes.filas(desde, hasta, emisor, receptor, incluir_archivo(request))
+        nombre = f"comprobantes-{params.get('month') or (desde or 'inicio')}"
+        if not params.get("month") and hasta:
+            nombre += f"-{hasta}"
+        response = StreamingHttpResponse(comprobantes.generar_zip(filas), content_type="application/zip")
+        response["Content-Disposition"] = f'attachment; filename="{nombre}.zip"'
+        return response
+
     @action(detail=False, methods=["get"], url_path="stats/summary", permission_classes=[permissions.IsAuthenticated, EsAdmin])
+    @condicional(fuente_recibos)
     def stats_summary(self, request):
-        qs = Recibo.objects.all()
-
-        dec0 = Value(0, output_field=DecimalField(max_digits=12, decimal_places=2))
-
-        sum_total        = qs.aggregate(s=Coalesce(Sum("monto"), dec0))["s"]
-        pending_qs       = qs.filter(status=Recibo.Status.PENDIENTE)
-        paid_qs          = qs.filter(status=Recibo.Status.PAGADO)
-        sum_pendiente    = pending_qs.aggregate(s=Coalesce(Sum("monto"), dec0))["s"]
-        sum_pagado       = paid_qs.aggregate(s=Coalesce(Sum("monto"), dec0))["s"]
-
-        return Response({
-            "recibos": {
-                "total": qs.count(),
-                "pendientes": pending_qs.count(),
-                "pagados": paid_qs.count(),
-                "monto_total": float(sum_total or 0),
-                "monto_pendiente": float(sum_pendiente or 0),
-                "monto_pagado": float(sum_pagado or 0),
-            }
-        })
+        return Response(stats.resumen(incluir_archivo(request)))
 
     @action(detail=False, methods=["get"], url_path="stats/monthly", permission_classes=[permissions.IsAuthenticated, EsAdmin])
+    @con_presupuesto("stats_monthly")
+    @condicional(fuente_recibos)
     def stats_monthly(self, request):
         year = int(request.query_params.get("year", timezone.now().year))
-        qs = Recibo.objects.filter(fecha__year=year)
-
-        dec0 = Value(0, output_field=DecimalField(max_digits=12, decimal_places=2))
-
-        monthly = (
-            qs.annotate(month=TruncMonth("fecha"))
-            .values("month")
-            .annotate(
-                count=Count("id"),
-                total_monto=Coalesce(Sum("monto"), dec0),
-
-                pendientes=Count("id", filter=Q(status=Recibo.Status.PENDIENTE)),
-                pagados=Count("id",   filter=Q(status=Recibo.Status.PAGADO)),
-
-                monto_pendiente=Coalesce(
-                    Sum("monto",
-                        filter=Q(status=Recibo.Status.PENDIENTE),
-                        output_field=DecimalField(max_digits=12, decimal_places=2)),
-                    dec0
-                ),
-                monto_pagado=Coalesce(
-                    Sum("monto",
-                        filter=Q(status=Recibo.Status.PAGADO),
-                        output_field=DecimalField(max_digits=12, decimal_places=2)),
-                    dec0
-                ),
-            )
-            .order_by("month")
-        )
-
-        data = []
-        for row in monthly:
-            m = row["month"]
-            data.append({
-                "month": m.strftime("%Y-%m"),
-                "count": row["count"],
-                "monto_total": float(row["total_monto"] or 0),
-                "pendientes": row["pendientes"],
-                "pagados": row["pagados"],
-                "monto_pendiente": float(row["monto_pendiente"] or 0),
-                "monto_pagado": float(row["monto_pagado"] or 0),
-            })
-        return Response({"year": year, "series": data})
+        return Response(stats.mensual(year, incluir_archivo(request)))
+
+    def _params_top_debtors(self, request):
+        """(limit, offset, cursor) validados; ValueError si no son válidos."""
+        limit = min(max(int(request.query_params.get("limit", 10)), 1), 100)
+        offset = max(int(request.query_params.get("offset", 0)), 0)
+        cursor = request.query_params.get("cursor")
+        if cursor:
+            try:
+                total_c, id_c = cursor.split(":")
+                cursor = (Decimal(total_c), int(id_c))
+            except InvalidOperation:
+                raise ValueError(cursor)
+        return limit, offset, cursor
 
     @action(detail=False, methods=["get"], url_path="stats/top-debtors",
             permission_classes=[permissions.IsAuthenticated, EsAdmin])
+    @con_presupuesto("stats_top_debtors")
+    @condicional(fuente_recibos)
     def stats_top_debtors(self, request):
-        limit = int(request.query_params.get("limit", 10))
-
-        dec0 = Value(0, output_field=DecimalField(max_digits=12, decimal_places=2))
-
-        pending = (
-            Recibo.objects.filter(status=Recibo.Status.PENDIENTE)
-            .values("receptor_id", "receptor__username", "receptor__first_name", "receptor__last_name")
-            .annotate(
-                monto_pendiente=Coalesce(Sum("monto"), dec0),
-                count=Count("id"),
-            )
-            .order_by("-monto_pendiente")[:limit]
-        )
-
-        items = []
-        for r in pending:
-            name = (f'{r["receptor__first_name"]} {r["receptor__last_name"]}'.strip() or r["receptor__username"])
-            items.append({
-                "user_id": r["receptor_id"],
-                "display_name": name,
-                "count": r["count"],
-                "monto_pendiente": float(r["monto_pendiente"] or 0),
-            })
+        """
+        Ranking leído de SaldoPendiente (mantenido por señales) con índice (total, receptor).
+        Paginación: ?offset=N o ?cursor=<total>:<user_id> (keyset, devuelto en next_cursor).
+        """
+        try:
+            limit, offset, cursor = self._params_top_debtors(request)
+        except ValueError:
+            return Response({"detail": "limit, offset o cursor inválidos."}, status=400)
+        return Response(stats.top_deudores(limit, offset, cursor))
 
-        return Response({"limit": limit, "items": items})
+    @action(detail=False, methods=["get"], url_path=r"stats/top-debtors/rank/(?P<user_id>\d+)",
+            permission_classes=[permissions.IsAuthenticated, EsAdmin])
+    @condicional(fuente_recibos)
+    def stats_top_debtors_rank(self, request, user_id=None):
+        saldo = (ranking.deudores().select_related("receptor")
+                 .filter(receptor_id=user_id).first())
+        if saldo is None:
+            return Response({"user_id": int(user_id), "rank": None, "count": 0, "monto_pendiente": 0.0})
+        u = saldo.receptor
+        return Response({
+            "user_id": saldo.receptor_id,
+            "display_name": (f"{u.first_name} {u.last_name}".strip() or u.username),
+            "rank": ranking.posicion(saldo),
+            "count": saldo.count,
+            "monto_pendiente": saldo.total,
+        })
 
     @action(detail=False, methods=["get"], url_path="stats/aging", permission_classes=[permissions.IsAuthenticated, EsAdmin])
+    @condicional(fuente_recibos)
     def stats_aging(self, request):
         b1 = int(request.query_params.get("b1", 30))
         b2 = int(request.query_params.get("b2", 60))
-        today = timezone.now().date()
+        return Response(stats.antiguedad(b1, b2))
 
-        pend = Recibo.objects.filter(status=Recibo.Status.PENDIENTE).annotate(
-            dias=(Value(today, output_field=DecimalField()) - F("fecha"))
-        )
-        buckets = {
-            f"0-{b1}": {"count": 0, "monto": Decimal("0")},
-            f"{b1+1}-{b2}": {"count": 0, "monto": Decimal("0")},
-            f">{b2}": {"count": 0, "monto": Decimal("0")},
-        }
-
-        for r in Recibo.objects.filter(status=Recibo.Status.PENDIENTE).only("id", "monto", "fecha"):
-            dias = (today - r.fecha).days
-            if dias <= b1:
-                key = f"0-{b1}"
-            elif dias <= b2:
-                key = f"{b1+1}-{b2}"
-            else:
-                key = f">{b2}"
-            buckets[key]["count"] += 1
-            buckets[key]["monto"] += r.monto
+    @action(detail=False, methods=["get"], url_path="stats/overdue", permission_classes=[permissions.IsAuthenticated, EsAdmin])
+    @condicional(fuente_recibos)
+    def stats_overdue(self, request):
+        """Vencidos por receptor (mayor monto primero). ?limit= acota la lista, no los totales."""
+        try:
+            limit = int(request.query_params.get("limit", 0)) or None
+        except ValueError:
+            return Response({"detail": "limit debe ser entero."}, status=400)
+        return Response(stats.vencidos(limit))
 
-        out = {k: {"count": v["count"], "monto": float(v["monto"])} for k, v in buckets.items()}
-        return Response({"as_of": today.isoformat(), "buckets": out})                
+    @action(detail=False, methods=["get"], url_path="stats/dashboard",
+            permission_classes=[permissions.IsAuthenticated, EsAdmin])
+    @condicional(fuente_recibos)
+    def stats_dashboard(self, request):
+        """
+        Varias secciones de stats en una sola petición:
+        ?sections=summary,monthly,aging,top_debtors,overdue (por defecto todas) + sus parámetros
+        (year, b1, b2, limit, archivo). Por defecto se calculan en un único snapshot
+        REPEATABLE READ para que los números cuadren entre secciones; ?consistent=0 las
+        lanza en paralelo, cada una con su conexión. Devuelve el tiempo de cada sección.
+        """
+        params = request.query_params
+        archivo = incluir_archivo(request)
+        try:
+            disponibles = {
+                "summary": (stats.resumen, {"archivo": archivo}),
+                "monthly": (stats.mensual, {"year": int(params.get("year", timezone.now().year)), "archivo": archivo}),
+                "aging": (stats.antiguedad, {"b1": int(params.get("b1", 30)), "b2": int(params.get("b2", 60))}),
+                "top_debtors": (stats.top_deudores, {"limit": min(max(int(params.get("limit", 10)), 1), 100)}),
+                "overdue": (stats.vencidos, {"limit": min(max(int(params.get("limit", 10)), 1), 100)}),
+            }
+        except ValueError:
+            return Response({"detail": "year, b1, b2 y limit deben ser enteros."}, status=400)
+
+        pedidas = [s.strip() for s in params.get("sections", "").split(",") if s.strip()] or list(disponibles)
+        desconocidas = [s for s in pedidas if s not in disponibles]
+        if desconocidas:
+            return Response(
+                {"detail": f"Secciones desconocidas: {', '.join(desconocidas)}. Válidas: {', '.join(disponibles)}."},
+                status=400,
+            )
+
+        consistente = params.get("consistent", "1").lower() not in ("0", "false", "no")
+        inicio = time.perf_counter()
+        datos, tiempos = stats.dashboard({s: disponibles[s] for s in pedidas}, consistente)
+        return Response({
+            "consistent": consistente,
+            "sections": datos,
+            "timings_ms": tiempos,
+            "total_ms": round((time.perf_counter() - inicio) * 1000, 2),
+        })
 
     @action(detail=False, methods=["get"], url_path=r"stats/user/(?P<user_id>\d+)",
             permission_classes=[permissions.IsAuthenticated, EsAdmin])
+    @con_presupuesto("stats_user")
+    @condicional(fuente_recibos_y_transferencias)
     def stats_user(self, request, user_id=None):
         try:
             u = User.objects.get(pk=int(user_id))
@@ -365,54 +527,55 @@ class ReciboViewSet(viewsets.ModelViewSet):
 
         dec0 = Value(0, output_field=DecimalField(max_digits=12, decimal_places=2))
         year = int(request.query_params.get("year", timezone.now().year))
+        archivo = incluir_archivo(request)
 
-        emitidos_qs  = Recibo.objects.filter(emisor=u)
-        recibidos_qs = Recibo.objects.filter(receptor=u)
-        pagado_qs    = Transferencia.objects.filter(pagador=u)
-
-        emitidos_total = emitidos_qs.count()
-        emitidos_total_monto = emitidos_qs.aggregate(s=Coalesce(Sum("monto"), dec0))["s"]
+        emitidos_qs  = [qs.filter(emisor=u) for qs in fuentes_recibos(archivo)]
+        recibidos_qs = [qs.filter(receptor=u) for qs in fuentes_recibos(archivo)]
+        pagado_qs    = [qs.filter(pagador=u) for qs in fuentes_transferencias(archivo)]
 
-        recibidos_total = recibidos_qs.count()
-        recibidos_total_monto = recibidos_qs.aggregate(s=Coalesce(Sum("monto"), dec0))["s"]
-
-        debe_monto = recibidos_qs.filter(status=Recibo.Status.PENDIENTE) \
-            .aggregate(s=Coalesce(Sum("monto"), dec0))["s"]
-
-        cobrado_monto = emitidos_qs.filter(status=Recibo.Status.PAGADO) \
-            .aggregate(s=Coalesce(Sum("monto"), dec0))["s"]
+        emitidos = agregar(
+            emitidos_qs,
+            count=Count("id"),
+            suma=Coalesce(Sum("monto"), dec0),
+            cobrado=Coalesce(Sum("monto", filter=Q(status=Recibo.Status.PAGADO)), dec0),
+        )
+        recibidos = agregar(
+            recibidos_qs,
+            count=Count("id"),
+            suma=Coalesce(Sum("monto"), dec0),
+            debe=Coalesce(Sum("monto", filter=Q(status=Recibo.Status.PENDIENTE)), dec0),
+        )
+        emitidos_total, emitidos_total_monto = emitidos["count"], emitidos["suma"]
+        recibidos_total, recibidos_total_monto = recibidos["count"], recibidos["suma"]
+        debe_monto = recibidos["debe"]
+        cobrado_monto = emitidos["cobrado"]
 
-        pagado_monto = pagado_qs.aggregate(s=Coalesce(Sum("monto"), dec0))["s"]
+        pagado_monto = agregar(pagado_qs, s=Coalesce(Sum("monto"), dec0))["s"]
 
         saldo = (cobrado_monto or 0) - (pagado_monto or 0)
 
-        em_series = (
-            emitidos_qs.filter(fecha__year=year)
-            .annotate(m=TruncMonth("fecha"))
-            .values("m")
-            .annotate(
-                count=Count("id"),
-                total_monto=Coalesce(Sum("monto"), dec0),
-            )
-            .order_by("m")
-        )
-        rc_series = (
-            recibidos_qs.filter(fecha__year=year)
-            .annotate(m=TruncMonth("fecha"))
-            .values("m")
-            .annotate(
-                count=Count("id"),
-                total_monto=Coalesce(Sum("monto"), dec0),
-            )
-            .order_by("m")
-        )
+        def serie(querysets):
+            return combinar_series([
+                qs.filter(fecha__year=year)
+                .annotate(m=TruncMonth("fecha"))
+                .values("m")
+                .annotate(
+                    count=Count("id"),
+                    total_monto=Coalesce(Sum("monto"), dec0),
+                )
+                .order_by("m")
+                for qs in querysets
+            ], clave="m")
+
+        em_series = serie(emitidos_qs)
+        rc_series = serie(recibidos_qs)
 
         def serialize_monthly(rows):
             return [
                 {
                     "month": r["m"].strftime("%Y-%m"),
                     "count": r["count"],
-                    "monto": float(r["total_monto"] or 0),
+                    "monto": Decimal(r["total_monto"] or 0),
                 }
                 for r in rows
             ]
@@ -421,12 +584,12 @@ class ReciboViewSet(viewsets.ModelViewSet):
 
         return Response({
             "user": {"id": u.id, "username": u.username, "display_name": display_name},
-            "emitidos": {"count": emitidos_total, "monto": float(emitidos_total_monto or 0)},
-            "recibidos": {"count": recibidos_total, "monto": float(recibidos_total_monto or 0)},
-            "pagado_por_el_usuario": float(pagado_monto or 0),
-            "debe": float(debe_monto or 0),
-            "cobrado": float(cobrado_monto or 0),
-            "saldo": float(saldo or 0),
+            "emitidos": {"count": emitidos_total, "monto": Decimal(emitidos_total_monto or 0)},
+            "recibidos": {"count": recibidos_total, "monto": Decimal(recibidos_total_monto or 0)},
+            "pagado_por_el_usuario": Decimal(pagado_monto or 0),
+            "debe": Decimal(debe_monto or 0),
+            "cobrado": Decimal(cobrado_monto or 0),
+            "saldo": Decimal(saldo or 0),
             "series": {
                 "year": year,
                 "emitidos": serialize_monthly(em_series),
@@ -440,6 +603,7 @@ class ReciboViewSet(viewsets.ModelViewSet):
         url_path="user-overview",
         permission_classes=[permissions.IsAuthenticated, EsAdmin],
     )
+    @condicional(fuente_recibos_y_transferencias)
     def stats_user_overview(self, request):
         """
         Devuelve:
@@ -462,11 +626,17 @@ class ReciboViewSet(viewsets.ModelViewSet):
 
         dec0 = Value(0, output_field=DecimalField(max_digits=12, decimal_places=2))
 
-        emitidos_count   = Recibo.objects.filter(emisor=u).count()
-        recibidos_count  = Recibo.objects.filter(receptor=u).count()
-        pagos_count      = Transferencia.objects.filter(pagador=u).count()
+        archivo = incluir_archivo(request)
+
+        emitidos_count   = agregar([qs.filter(emisor=u) for qs in fuentes_recibos(archivo)], n=Count("id"))["n"]
+        recibidos_count  = agregar([qs.filter(receptor=u) for qs in fuentes_recibos(archivo)], n=Count("id"))["n"]
+        pagos = agregar(
+            [qs.filter(pagador=u) for qs in fuentes_transferencias(archivo)],
+            n=Count("id"), s=Coalesce(Sum("monto"), dec0),
+        )
+        pagos_count, sum_pagado = pagos["n"], pagos["s"]
 
-        sum_pagado = Transferencia.objects.filter(pagador=u).aggregate(s=Coalesce(Sum("monto"), dec0))["s"]
+        # Los archivados están todos pagados: lo pendiente solo vive en Recibo
         sum_pendiente_pagar = Recibo.objects.filter(
             receptor=u, status=Recibo.Status.PENDIENTE
         ).aggregate(s=Coalesce(Sum("monto"), dec0))["s"]
@@ -480,7 +650,65 @@ class ReciboViewSet(viewsets.ModelViewSet):
             "emitidos_count": emitidos_count,
             "recibidos_count": recibidos_count,
             "pagos_count": pagos_count,
-            "sum_pagado": float(sum_pagado or 0),
-            "sum_pendiente_pagar": float(sum_pendiente_pagar or 0),
-            "saldo": float(saldo or 0),
-        })
\ No newline at end of file
+            "sum_pagado": Decimal(sum_pagado or 0),
+            "sum_pendiente_pagar": Decimal(sum_pendiente_pagar or 0),
+            "saldo": Decimal(saldo or 0),
+        })
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="user-overview/batch",
+        permission_classes=[permissions.IsAuthenticated, EsAdmin],
+    )
+    def stats_user_overview_batch(self, request):
+        """
+        POST {"user_ids": [1, 2, ...]} (o la lista directamente) → mismo cálculo que
+        user-overview para cada usuario, con un número fijo de consultas agrupadas por
+        cada tramo de ids. La respuesta JSON se envía en streaming.
+        """
+        ids = request.data.get("user_ids") if isinstance(request.data, dict) else request.data
+        if not isinstance(ids, list) or not ids:
+            return Response({"detail": "Se espera user_ids: lista de ids."}, status=400)
+        try:
+            ids = list(dict.fromkeys(int(i) for i in ids))
+        except (TypeError, ValueError):
+            return Response({"detail": "Los ids deben ser enteros."}, status=400)
+        if len(ids) > overview.max_ids():
+            return Response({"detail": f"Máximo {overview.max_ids()} usuarios por petición."}, status=400)
+
+        return StreamingHttpResponse(
+            overview.generar_json(ids, incluir_archivo(request)),
+            content_type="application/json",
+        )
+
+
+class CambiosView(generics.GenericAPIView):
+    """
+    Feed incremental: GET /api/changes/?since=<cursor>&limit=<n>
+    Sin `since` devuelve solo el cursor actual (el cliente acaba de hacer la carga completa).
+    Si `since` es anterior a lo retenido responde 410 y el cliente debe recargar todo.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    max_limit = 1000
+
+    def get(self, request):
+        try:
+            limit = min(int(request.query_params.get("limit", 500)), self.max_limit)
+            since = request.query_params.get("since")
+            since = int(since) if since not in (None, "") else None
+        except ValueError:
+            return Response({"detail": "since y limit deben ser enteros."}, status=400)
+
+        if since is None:
+            return Response({"cursor": cambios.cursor_actual(), "has_more": False, "changes": []})
+
+        if since < cambios.purgada_hasta():
+            return Response({"detail": "Cursor expirado, vuelve a cargar los datos completos."}, status=410)
+
+        filas, has_more = cambios.leer(request.user, since, limit)
+        return Response({
+            "cursor": filas[-1]["secuencia"] if filas else since,
+            "has_more": has_more,
+            "changes": filas,
+        })
@@ -2,6 +2,8 @@
 ASGI config for sist_rec_api project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+/api/events/ (Server-Sent Events) se atiende aquí, fuera de Django, con una
+corrutina por conexión; el resto va a la aplicación Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +15,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sist_rec_api.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from recibos.eventos import sse_app  # noqa: E402  (requiere Django configurado)
+
+SSE_PATH = "/api/events/"
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "http" and scope["path"] == SSE_PATH:
+        return await sse_app(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -0,0 +1,150 @@
+"""
+Enrutado de lecturas a réplicas.
+
+Por defecto todo va a la primaria ("default"). Solo las vistas con LecturaReplicaMixin
+marcan como "leer de réplica" sus acciones seguras (list/retrieve/stats); lo demás
+(pay, imports, altas, ediciones) y cualquier lectura dentro de esas peticiones de
+escritura se queda en la primaria.
+
+La réplica se elige una vez por petición (round-robin entre las sanas) y se guarda en
+un ContextVar: todas las lecturas de la petición van a la misma, sin repetir la elección
+en cada consulta.
+
+Read-after-write: tras una escritura correcta el usuario queda fijado a la primaria
+REPLICA_PIN_SECONDS (en la caché, compartida si hay REDIS_URL).
+
+Salud: cada réplica se comprueba como mucho cada REPLICA_HEALTH_TTL segundos; si falla
+se descarta ese tiempo y se usa otra (o la primaria).
+"""
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+
+_replica = ContextVar("replica_lectura", default=None)  # alias elegido para la petición
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def replicas():
+    return [alias for alias in settings.DATABASES if alias != "default"]
+
+
+class _Salud:
+    def __init__(self):
+        self._estado = {}  # alias -> (ok, comprobado_en)
+        self._lock = threading.Lock()
+        self._turno = itertools.count()
+
+    def _comprobar(self, alias):
+        try:
+            conn = connections[alias]
+            if conn.connection is None:
+                conn.ensure_connection()
+            return conn.is_usable()
+        except DatabaseError:
+            return False
+
+    def sana(self, alias):
+        ok, cuando = self._estado.get(alias, (None, 0))
+        if ok is not None and time.monotonic() - cuando < settings.REPLICA_HEALTH_TTL:
+            return ok
+        ok = self._comprobar(alias)
+        with self._lock:
+            self._estado[alias] = (ok, time.monotonic())
+        return ok
+
+    def elegir(self):
+        """Réplica sana por round-robin, o None si no hay ninguna."""
+        disponibles = replicas()
+        if not disponibles:
+            return None
+        inicio = next(self._turno)
+        for i in range(len(disponibles)):
+            alias = disponibles[(inicio + i) % len(disponibles)]
+            if self.sana(alias):
+                return alias
+        return None
+
+
+salud = _Salud()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _replica.get() or "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Permite `migrate --database replicaN` para montar réplicas SQLite locales
+        return True
+
+
+@contextmanager
+def leer_de_replica():
+    """Las lecturas del bloque van a una réplica sana elegida al entrar (o a la primaria)."""
+    token = _replica.set(salud.elegir())
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+def alias_lectura():
+    """Alias que atiende las lecturas en el contexto actual."""
+    return _replica.get() or "default"
+
+
+def _clave_pin(user):
+    return f"replica:pin:{user.pk}"
+
+
+def fijar_primaria(user):
+    cache.set(_clave_pin(user), 1, settings.REPLICA_PIN_SECONDS)
+
+
+def fijado_a_primaria(user):
+    return bool(cache.get(_clave_pin(user)))
+
+
+class LecturaReplicaMixin:
+    """
+    Para vistas DRF. Las acciones de `acciones_replica` (None = todas las seguras)
+    leen de una réplica salvo que el usuario haya escrito hace poco.
+    """
+    acciones_replica = {"list", "retrieve"}
+
+    def _usa_replica(self, request):
+        if not replicas() or request.method not in SAFE_METHODS:
+            return False
+        if self.acciones_replica is not None and getattr(self, "action", None) not in self.acciones_replica:
+            return False
+        return not (request.user.is_authenticated and fijado_a_primaria(request.user))
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        alias = self._usa_replica(request) and salud.elegir()
+        if alias:
+            self._token_replica = _replica.set(alias)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, "_token_replica", None)
+        if token is not None:
+            _replica.reset(token)
+            self._token_replica = None
+        if (
+            replicas() and request.method not in SAFE_METHODS
+            and response.status_code < 400 and request.user.is_authenticated
+        ):
+            fijar_primaria(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él se usa gzip
+    brotli = None
+
+re_accepts_br = _lazy_re_compile(r"\bbr\b")
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Comprime la respuesta según Accept-Encoding: brotli si el cliente lo acepta
+    (y la librería está instalada), si no gzip. Las respuestas streaming van en gzip.
+    """
+    min_length = 200
+    brotli_quality = 5  # balance CPU / tamaño para respuestas dinámicas
+    ya_comprimidos = ("application/zip",)  # recomprimir solo gastaría CPU
+
+    def process_response(self, request, response):
+        if response.get("Content-Type", "").startswith(self.ya_comprimidos):
+            return response
+        if (
+            brotli is None
+            or response.streaming
+            or response.has_header("Content-Encoding")
+            or len(response.content) < self.min_length
+            or not re_accepts_br.search(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        ):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        compressed = brotli.compress(response.content, quality=self.brotli_quality)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response["Content-Length"] = str(len(response.content))
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = "br"
+        return response
+
+
+class PerfiladoMiddleware:
+    """
+    Perfila la petición si un admin lo pide con `X-Profile: 1|sample` o `?_profile=1|sample`
+    (ver sist_rec_api.perfilado). Sin la marca solo cuesta mirar la cabecera; con
+    PERFILADO_ACTIVO=0 ni siquiera se instala.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PERFILADO_ACTIVO:
+            raise MiddlewareNotUsed
+        from . import perfilado
+        self.perfilado = perfilado
+        self.get_response = get_response
+
+    def __call__(self, request):
+        modo = self.perfilado.modo_pedido(request)
+        if modo is None:
+            return self.get_response(request)
+        user = self.perfilado.admin_de(request)
+        if user is None:
+            return self.get_response(request)
+        return self.perfilado.perfilar(request, self.get_response, modo, user)
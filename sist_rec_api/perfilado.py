@@ -0,0 +1,260 @@
+"""
+Perfilado bajo demanda de una sola petición (solo admins).
+
+Se activa con la cabecera `X-Profile: 1` (o `?_profile=1`); `sample` en lugar de `1`
+usa el perfilador por muestreo en vez de cProfile. Sin esa marca el middleware solo
+mira una cabecera y la query string: el resto no se ejecuta.
+
+Cada perfil se guarda en PERFILADO_DIR como:
+- <id>.json       resumen: ruta, usuario, status, tiempos y cada SQL con su duración
+- <id>.pstats     cProfile (abrir con `python -m pstats`, snakeviz, gprof2dot...)
+- <id>.collapsed  pilas colapsadas "a;b;c N" (flamegraph.pl, speedscope) en modo sample
+
+GET /api/profiles/ lista los perfiles y /api/profiles/<id>/<tipo>/ los descarga.
+Solo cubre hasta que la vista devuelve la respuesta: el cuerpo de un StreamingHttpResponse
+se genera después y no entra en el perfil.
+"""
+import cProfile
+import json
+import os
+import pstats
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.http import FileResponse
+from django.utils import timezone
+from rest_framework import generics, permissions
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from usuarios_log.views import EsAdmin
+
+MODOS = {"1": "cprofile", "cprofile": "cprofile", "sample": "sample"}
+TIPOS = {"json": "application/json", "pstats": "application/octet-stream", "collapsed": "text/plain"}
+re_id = re.compile(r"^\d{8}T\d{12}-[0-9a-f]{8}$")
+
+# cProfile no admite dos perfiles activos a la vez en el mismo proceso
+_ocupado = threading.Lock()
+
+
+def modo_pedido(request):
+    """Modo pedido por la petición o None. Es lo único que se paga sin perfilado."""
+    valor = request.META.get("HTTP_X_PROFILE")
+    if valor is None:
+        qs = request.META.get("QUERY_STRING", "")
+        if "_profile=" not in qs:
+            return None
+        valor = request.GET.get("_profile")
+    return MODOS.get((valor or "").strip().lower())
+
+
+def admin_de(request):
+    """
+    La marca la puede mandar cualquiera: autentica aquí (el JWT de la cabecera) y
+    devuelve el usuario solo si es admin.
+    """
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        drf = Request(request, authenticators=[c() for c in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+        try:
+            user = drf.user
+        except APIException:
+            return None
+    if user and user.is_authenticated and (getattr(user, "role", 0) == 1 or user.is_superuser):
+        return user
+    return None
+
+
+def directorio():
+    d = Path(settings.PERFILADO_DIR)
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+
+class CapturaSQL:
+    """execute_wrapper que anota cada sentencia con su alias y duración."""
+
+    def __init__(self):
+        self.consultas = []
+
+    def envolver(self, alias):
+        def wrapper(execute, sql, params, many, context):
+            inicio = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                self.consultas.append({
+                    "alias": alias,
+                    "sql": sql,
+                    "many": many,
+                    "ms": round((time.perf_counter() - inicio) * 1000, 3),
+                })
+        return wrapper
+
+
+class Muestreo:
+    """
+    Perfilador por muestreo: un hilo mira cada `intervalo` s la pila del hilo de la
+    petición (sys._current_frames) y cuenta las pilas iguales.
+    """
+
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self.pilas = Counter()
+        self._hilo_objetivo = threading.get_ident()
+        self._parar = threading.Event()
+        self._nombres = {}
+
+    def _nombre(self, code):
+        n = self._nombres.get(code)
+        if n is None:
+            n = self._nombres[code] = f"{Path(code.co_filename).stem}:{code.co_name}"
+        return n
+
+    def _bucle(self):
+        while not self._parar.wait(self.intervalo):
+            frame = sys._current_frames().get(self._hilo_objetivo)
+            pila = []
+            while frame is not None:
+                pila.append(self._nombre(frame.f_code))
+                frame = frame.f_back
+            if pila:
+                self.pilas[";".join(reversed(pila))] += 1
+
+    def __enter__(self):
+        self._hilo = threading.Thread(target=self._bucle, daemon=True)
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self._hilo.join()
+
+    def colapsado(self):
+        return "".join(f"{pila} {n}\n" for pila, n in self.pilas.most_common())
+
+
+def _top_funciones(profiler, n=30):
+    st = pstats.Stats(profiler)
+    filas = []
+    for (archivo, linea, func), (_, llamadas, propio, acumulado, _) in st.stats.items():
+        filas.append({
+            "func": f"{Path(archivo).name}:{linea}({func})",
+            "calls": llamadas,
+            "tottime_ms": round(propio * 1000, 3),
+            "cumtime_ms": round(acumulado * 1000, 3),
+        })
+    filas.sort(key=lambda f: f["cumtime_ms"], reverse=True)
+    return filas[:n]
+
+
+def perfilar(request, get_response, modo, user):
+    """Ejecuta la petición bajo el perfilador y guarda los artefactos. Devuelve la respuesta."""
+    if not _ocupado.acquire(blocking=False):
+        response = get_response(request)
+        response["X-Profile-Id"] = "busy"
+        return response
+
+    try:
+        ahora = timezone.now()
+        pid = f"{ahora:%Y%m%dT%H%M%S%f}-{secrets.token_hex(4)}"
+        sql = CapturaSQL()
+        profiler = cProfile.Profile() if modo == "cprofile" else None
+        muestreo = None
+        with ExitStack() as pila:
+            for conn in connections.all():
+                pila.enter_context(conn.execute_wrapper(sql.envolver(conn.alias)))
+            if profiler is None:
+                muestreo = pila.enter_context(Muestreo(settings.PERFILADO_MUESTREO_MS / 1000))
+            inicio = time.perf_counter()
+            if profiler is not None:
+                profiler.enable()
+            try:
+                response = get_response(request)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                total_ms = round((time.perf_counter() - inicio) * 1000, 3)
+
+        d = directorio()
+        resumen = {
+            "id": pid,
+            "mode": modo,
+            "method": request.method,
+            "path": request.get_full_path(),
+            "user_id": user.pk,
+            "status": response.status_code,
+            "started": ahora.isoformat(),
+            "total_ms": total_ms,
+            "sql_count": len(sql.consultas),
+            "sql_ms": round(sum(q["ms"] for q in sql.consultas), 3),
+            "sql": sql.consultas,
+        }
+        if profiler is not None:
+            profiler.dump_stats(d / f"{pid}.pstats")
+            resumen["top"] = _top_funciones(profiler)
+        else:
+            (d / f"{pid}.collapsed").write_text(muestreo.colapsado())
+            resumen["samples"] = sum(muestreo.pilas.values())
+        (d / f"{pid}.json").write_text(json.dumps(resumen, default=str))
+        podar(d)
+    finally:
+        _ocupado.release()
+
+    response["X-Profile-Id"] = pid
+    return response
+
+
+def podar(d):
+    """Deja solo los PERFILADO_MAX perfiles más recientes (los ids ordenan por fecha)."""
+    ids = sorted(p.stem for p in d.glob("*.json"))
+    for viejo in ids[:max(0, len(ids) - settings.PERFILADO_MAX)]:
+        for tipo in TIPOS:
+            (d / f"{viejo}.{tipo}").unlink(missing_ok=True)
+
+
+# ---------- endpoints ----------
+
+class PerfilListView(generics.GenericAPIView):
+    """GET /api/profiles/ → perfiles guardados, del más reciente al más antiguo (sin el detalle SQL)."""
+    permission_classes = [permissions.IsAuthenticated, EsAdmin]
+
+    def get(self, request):
+        d = directorio()
+        items = []
+        for p in sorted(d.glob("*.json"), reverse=True):
+            try:
+                datos = json.loads(p.read_text())
+            except (OSError, ValueError):
+                continue
+            datos.pop("sql", None)
+            datos.pop("top", None)
+            datos["files"] = [t for t in TIPOS if (d / f"{p.stem}.{t}").exists()]
+            items.append(datos)
+        return Response({"count": len(items), "items": items})
+
+
+class PerfilDescargaView(generics.GenericAPIView):
+    """GET /api/profiles/<id>/ (resumen JSON completo) o /api/profiles/<id>/<json|pstats|collapsed>/."""
+    permission_classes = [permissions.IsAuthenticated, EsAdmin]
+
+    def get(self, request, pid, tipo="json"):
+        if not re_id.match(pid) or tipo not in TIPOS:
+            return Response({"detail": "Perfil no encontrado."}, status=404)
+        ruta = directorio() / f"{pid}.{tipo}"
+        if not ruta.exists():
+            return Response({"detail": "Perfil no encontrado."}, status=404)
+        return FileResponse(
+            open(ruta, "rb"), as_attachment=tipo != "json",
+            filename=os.path.basename(ruta), content_type=TIPOS[tipo],
+        )
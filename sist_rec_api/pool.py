@@ -0,0 +1,71 @@
+"""
+Pool de procesos para trabajo de CPU (hash de contraseñas, render de recibos...).
+
+Se usa el contexto "spawn": cada proceso arranca limpio (sin heredar conexiones de BD
+ni hilos del worker web) y el initializer ejecuta django.setup() una vez por proceso.
+El pool vive solo durante la llamada: no quedan procesos ociosos en cada worker web.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from multiprocessing import get_context
+
+from django.conf import settings
+
+
+def _inicializar():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "sist_rec_api.settings")
+    import django
+    django.setup()
+
+
+def procesos():
+    return getattr(settings, "POOL_PROCESOS", None) or os.cpu_count() or 1
+
+
+def mapear(fn, elementos, minimo=None):
+    """
+    list(map(fn, elementos)) repartido entre procesos. `fn` debe ser importable a
+    nivel de módulo (se envía por pickle). Con pocos elementos o un solo núcleo se
+    ejecuta en el propio proceso: arrancar el pool costaría más que el trabajo.
+    """
+    elementos = list(elementos)
+    n = min(procesos(), len(elementos))
+    minimo = getattr(settings, "POOL_MINIMO", 8) if minimo is None else minimo
+    if n <= 1 or len(elementos) < minimo:
+        return [fn(e) for e in elementos]
+
+    chunksize = max(1, len(elementos) // (n * 4))
+    with ProcessPoolExecutor(max_workers=n, mp_context=get_context("spawn"), initializer=_inicializar) as ex:
+        return list(ex.map(fn, elementos, chunksize=chunksize))
+
+
+def iterar(fn, elementos, minimo=None, tramo=1000):
+    """
+    Como mapear() pero perezoso: consume `elementos` (puede ser un iterador) por tramos y
+    devuelve los resultados en orden a medida que salen, con el pool vivo mientras se
+    recorre. En memoria hay como mucho dos tramos: el que se entrega y el siguiente,
+    que ya se está procesando.
+    """
+    elementos = iter(elementos)
+    minimo = getattr(settings, "POOL_MINIMO", 8) if minimo is None else minimo
+    primeros = list(islice(elementos, max(minimo, 1)))
+    n = procesos()
+    if n <= 1 or len(primeros) < minimo:
+        for e in chain(primeros, elementos):
+            yield fn(e)
+        return
+
+    pendientes = chain(primeros, elementos)
+    ex = ProcessPoolExecutor(max_workers=n, mp_context=get_context("spawn"), initializer=_inicializar)
+    try:
+        lote = list(islice(pendientes, tramo))
+        actual = ex.map(fn, lote, chunksize=max(1, len(lote) // (n * 4)))
+        while actual is not None:
+            lote = list(islice(pendientes, tramo))
+            siguiente = ex.map(fn, lote, chunksize=max(1, len(lote) // (n * 4))) if lote else None
+            yield from actual
+            actual = siguiente
+    finally:
+        # Si el consumidor corta (cliente desconectado) no se espera al trabajo pendiente
+        ex.shutdown(cancel_futures=True)
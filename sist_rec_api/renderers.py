@@ -0,0 +1,81 @@
+"""
+Renderers de DRF elegidos por Accept (o ?format=):
+
+- application/json → JSONRapidoRenderer: la misma salida que el JSONRenderer de DRF,
+  codificada con orjson (si está instalado). Con ?indent / "; indent=N" usa el de DRF.
+- application/msgpack → MsgPackRenderer: MessagePack; el dinero (Decimal) va como
+  entero de centavos exacto, no como float.
+
+Las vistas que construyen la salida a mano (filas de .values()) usan `renderer.dinero`
+para convertir los montos al formato de cada renderer; los serializers, `DineroField`.
+"""
+from decimal import Decimal
+
+from rest_framework import serializers
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa el encoder de DRF
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # sin msgpack settings no registra MsgPackRenderer
+    msgpack = None
+
+CENTAVO = Decimal("0.01")
+
+_encoder = JSONEncoder()
+
+
+def a_centavos(valor):
+    """Decimal (o int) de pesos → int de centavos, sin pasar por float."""
+    return int((Decimal(valor) / CENTAVO).to_integral_value())
+
+
+def conversor_dinero(request):
+    """Conversión de montos que espera el renderer elegido (str, como el DecimalField de DRF, si no define otra)."""
+    return getattr(getattr(request, "accepted_renderer", None), "dinero", str)
+
+
+class DineroField(serializers.DecimalField):
+    """DecimalField cuya salida sigue al renderer de la petición (centavos en MessagePack)."""
+
+    def to_representation(self, value):
+        dinero = conversor_dinero(self.context.get("request"))
+        if dinero is str:
+            return super().to_representation(value)
+        return dinero(value)
+
+
+class JSONRapidoRenderer(JSONRenderer):
+    dinero = staticmethod(str)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Lo que orjson no conoce (Decimal → float, lazy strings, QuerySet...) lo resuelve el encoder de DRF
+        return orjson.dumps(data, default=_encoder.default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, Decimal):
+        return a_centavos(obj)
+    return _encoder.default(obj)
+
+
+class MsgPackRenderer(BaseRenderer):
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+    dinero = staticmethod(a_centavos)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=_msgpack_default, use_bin_type=True, datetime=False)
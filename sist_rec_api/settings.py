@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 from datetime import timedelta
+from importlib.util import find_spec
 import os
 from pathlib import Path
 
@@ -51,6 +52,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.security.SecurityMiddleware',
+    "sist_rec_api.middleware.CompressionMiddleware",  # br/gzip según Accept-Encoding
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,6 +60,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    "sist_rec_api.middleware.PerfiladoMiddleware",  # X-Profile / ?_profile (solo admins)
 ]
 
 CORS_ALLOWED_ORIGINS = _csv("CORS_ALLOWED_ORIGINS")
@@ -67,17 +70,97 @@ AUTH_USER_MODEL = "usuarios_log.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # JWT de simplejwt + actor para la auditoría + tokens revocados
+        "usuarios_log.autenticacion.JWTRevocable",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
+    # Token bucket por usuario y clase de ruta (ver THROTTLE_* más abajo)
+    "DEFAULT_THROTTLE_CLASSES": (
+        "sist_rec_api.throttling.RutaThrottle",
+    ),
+    # Según Accept: JSON (orjson) o MessagePack con montos en centavos
+    "DEFAULT_RENDERER_CLASSES": tuple(filter(None, (
+        "sist_rec_api.renderers.JSONRapidoRenderer",
+        "sist_rec_api.renderers.MsgPackRenderer" if find_spec("msgpack") else None,
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ))),
+}
+
+# Recibos PAGADOS con más de ARCHIVO_DIAS se mueven al archivo (manage.py archivar_recibos)
+ARCHIVO_DIAS = int(os.environ.get("ARCHIVO_DIAS", "365"))
+
+# Feed de cambios (/api/changes/): retención (manage.py compactar_cambios)
+CAMBIOS_RETENCION_DIAS = int(os.environ.get("CAMBIOS_RETENCION_DIAS", "30"))
+
+# Presupuesto de tiempo (ms) por consulta de stats; si se pasa se sirve el último resultado
+# bueno con "stale": true y se recalcula en segundo plano (recibos.presupuesto)
+_PRESUPUESTO_MS = int(os.environ.get("STATS_PRESUPUESTO_MS", "3000"))
+STATS_PRESUPUESTO_MS = {
+    "stats_user": _PRESUPUESTO_MS,
+    "stats_monthly": _PRESUPUESTO_MS,
+    "stats_top_debtors": _PRESUPUESTO_MS,
 }
+STATS_RECALCULO_MS = int(os.environ.get("STATS_RECALCULO_MS", "60000"))  # recálculo en segundo plano
+STATS_SWR_TTL = int(os.environ.get("STATS_SWR_TTL", "86400"))  # cuánto se guarda el último resultado
+
+# Máximo de usuarios por POST /api/recibos/user-overview/batch/
+OVERVIEW_BATCH_MAX = int(os.environ.get("OVERVIEW_BATCH_MAX", "5000"))
+
+# Máximo de recibos por POST /api/recibos/batch/
+RECIBOS_BATCH_MAX = int(os.environ.get("RECIBOS_BATCH_MAX", "20000"))
+
+# Conciliación de extractos: días máximos entre movimiento y fecha del recibo
+CONCILIACION_VENTANA_DIAS = int(os.environ.get("CONCILIACION_VENTANA_DIAS", "30"))
+
+# Pool de procesos (sist_rec_api.pool): nº de procesos (por defecto, núcleos) y
+# mínimo de elementos para usarlo en vez de trabajar en el propio proceso
+POOL_PROCESOS = int(os.environ.get("POOL_PROCESOS", "0")) or None
+POOL_MINIMO = int(os.environ.get("POOL_MINIMO", "8"))
+# Comprobantes (recibos.comprobantes): desde cuántos se reparte el render entre procesos
+COMPROBANTES_POOL_MINIMO = int(os.environ.get("COMPROBANTES_POOL_MINIMO", "200"))
+# Máximo de usuarios por POST /api/auth/users/import/
+USUARIOS_IMPORT_MAX = int(os.environ.get("USUARIOS_IMPORT_MAX", "5000"))
+
+# Auditoría (usuarios_log.auditoria): entradas en memoria por worker que se escriben
+# en lotes de AUDITORIA_LOTE o cada AUDITORIA_INTERVALO segundos
+AUDITORIA_ACTIVA = os.environ.get("AUDITORIA_ACTIVA", "1") == "1"
+AUDITORIA_LOTE = int(os.environ.get("AUDITORIA_LOTE", "500"))
+AUDITORIA_INTERVALO = float(os.environ.get("AUDITORIA_INTERVALO", "2"))
+AUDITORIA_MAX_BUFFER = int(os.environ.get("AUDITORIA_MAX_BUFFER", "50000"))  # si la BD no responde
+AUDITORIA_RETENCION_DIAS = int(os.environ.get("AUDITORIA_RETENCION_DIAS", "365"))
+# Proxies propios delante de la app: la IP del cliente es la que añadió el más externo en
+# X-Forwarded-For (contando desde la derecha); lo anterior lo escribe el cliente. 0 = REMOTE_ADDR
+PROXIES_CONFIABLES = int(os.environ.get("PROXIES_CONFIABLES", "1"))
+
+# Revocación de JWT (usuarios_log.revocacion): filtro de Bloom por worker sincronizado con
+# la tabla cada REVOCACION_SYNC_SEGUNDOS y reconstruido cada REVOCACION_RECONSTRUIR_SEGUNDOS
+REVOCACION_SYNC_SEGUNDOS = float(os.environ.get("REVOCACION_SYNC_SEGUNDOS", "5"))
+REVOCACION_RECONSTRUIR_SEGUNDOS = int(os.environ.get("REVOCACION_RECONSTRUIR_SEGUNDOS", "3600"))
+REVOCACION_CAPACIDAD = int(os.environ.get("REVOCACION_CAPACIDAD", "100000"))
+REVOCACION_ERROR = float(os.environ.get("REVOCACION_ERROR", "0.001"))  # falsos positivos → consulta
+
+# Perfilado bajo demanda (sist_rec_api.perfilado): dónde se guardan los perfiles,
+# cuántos se conservan y cada cuánto muestrea el modo "sample"
+PERFILADO_ACTIVO = os.environ.get("PERFILADO_ACTIVO", "1") == "1"
+PERFILADO_DIR = os.environ.get("PERFILADO_DIR", str(BASE_DIR / "perfiles"))
+PERFILADO_MAX = int(os.environ.get("PERFILADO_MAX", "200"))
+PERFILADO_MUESTREO_MS = float(os.environ.get("PERFILADO_MUESTREO_MS", "2"))
+
+# Push SSE (/api/events/ bajo ASGI). Con varios workers usar recibos.eventos.BackendRedis
+EVENTOS_BACKEND = os.environ.get(
+    "EVENTOS_BACKEND",
+    "recibos.eventos.BackendRedis" if os.environ.get("REDIS_URL") else "recibos.eventos.BackendLocal",
+)
+EVENTOS_HEARTBEAT = int(os.environ.get("EVENTOS_HEARTBEAT", "15"))
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(hours=6),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
     "AUTH_HEADER_TYPES": ("Bearer",),
+    # /api/auth/refresh/ tampoco acepta refresh tokens revocados
+    "TOKEN_REFRESH_SERIALIZER": "usuarios_log.serializers.RefreshSerializer",
 }
 
 ROOT_URLCONF = 'sist_rec_api.urls'
@@ -103,20 +186,74 @@ WSGI_APPLICATION = 'sist_rec_api.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': os.environ.get("DB_NAME"),
-        'USER': os.environ.get("DB_USER"),
-        'PASSWORD': os.environ.get("DB_PASSWORD"),
-        'HOST': os.environ.get("DB_HOST"),
-        'PORT': os.environ.get("DB_PORT", "3306"),
-        "OPTIONS": {
-            "charset": "utf8mb4",
-            "init_command": "SET sql_mode='STRICT_TRANS_TABLES'",
-        },        
+DB_ENGINE = os.environ.get("DB_ENGINE", "mysql")
+
+if DB_ENGINE == "sqlite":
+    # Solo desarrollo/pruebas locales (p. ej. probar réplicas con dos archivos SQLite)
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get("DB_NAME") or BASE_DIR / "db.sqlite3",
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.mysql',
+            'NAME': os.environ.get("DB_NAME"),
+            'USER': os.environ.get("DB_USER"),
+            'PASSWORD': os.environ.get("DB_PASSWORD"),
+            'HOST': os.environ.get("DB_HOST"),
+            'PORT': os.environ.get("DB_PORT", "3306"),
+            "OPTIONS": {
+                "charset": "utf8mb4",
+                "init_command": "SET sql_mode='STRICT_TRANS_TABLES'",
+            },        
+        }
     }
+
+# Réplicas de lectura: hosts MySQL (host o host:puerto) o, con DB_ENGINE=sqlite, rutas de archivo.
+# Se registran como replica1, replica2, ... y las usa sist_rec_api.db_router.ReplicaRouter.
+DB_REPLICAS = _csv("DB_REPLICAS")
+for _i, _replica in enumerate(DB_REPLICAS, start=1):
+    _db = {**DATABASES["default"], "TEST": {"MIRROR": "default"}}
+    if DB_ENGINE == "sqlite":
+        _db["NAME"] = _replica
+    else:
+        _host, _, _port = _replica.partition(":")
+        _db.update(HOST=_host, PORT=_port or DATABASES["default"]["PORT"])
+    DATABASES[f"replica{_i}"] = _db
+
+DATABASE_ROUTERS = ["sist_rec_api.db_router.ReplicaRouter"] if DB_REPLICAS else []
+# Tras una escritura, las lecturas de ese usuario van a la primaria durante N segundos
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", "5"))
+# Cada cuánto se vuelve a comprobar una réplica (y cuánto se descarta si falla)
+REPLICA_HEALTH_TTL = int(os.environ.get("REPLICA_HEALTH_TTL", "10"))
+
+# Caché compartida entre workers (Redis) si hay REDIS_URL; si no, memoria local del proceso
+REDIS_URL = os.environ.get("REDIS_URL")
+if REDIS_URL:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": REDIS_URL}}
+else:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+# Límites por clase de ruta: "N/periodo" = ráfaga de N que se recarga a N por periodo
+THROTTLE_BUCKETS = {
+    "imports": os.environ.get("THROTTLE_IMPORTS", "10/hour"),
+    "stats":   os.environ.get("THROTTLE_STATS", "60/min"),
+    "writes":  os.environ.get("THROTTLE_WRITES", "120/min"),
+    "reads":   os.environ.get("THROTTLE_READS", "600/min"),
+}
+# Peticiones simultáneas por usuario y en total (en total solo es global con THROTTLE_STORE en caché)
+THROTTLE_CONCURRENCIA = {
+    "imports": {"usuario": 1, "total": int(os.environ.get("THROTTLE_IMPORTS_TOTAL", "1"))},
+    "stats":   {"usuario": 2, "total": int(os.environ.get("THROTTLE_STATS_TOTAL", "2"))},
 }
+THROTTLE_CONCURRENCIA_TTL = 600  # caducidad de un hueco si el worker muere sin liberarlo
+THROTTLE_STORE = os.environ.get(
+    "THROTTLE_STORE",
+    "sist_rec_api.throttling.CacheStore" if REDIS_URL else "sist_rec_api.throttling.MemoriaStore",
+)
 
 
 # Password validation
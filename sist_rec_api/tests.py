@@ -0,0 +1,136 @@
+import os
+import tempfile
+import warnings
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.utils import load_backend
+from django.http import StreamingHttpResponse
+from django.test import SimpleTestCase, override_settings
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from recibos.models import Recibo
+from usuarios_log.models import User
+
+from . import db_router, throttling
+
+
+class _Vista(db_router.LecturaReplicaMixin, APIView):
+    acciones_replica = None
+
+    def get(self, request):
+        # Dos consultas de la misma petición: deben ir al mismo alias
+        return Response({"db": [Recibo.objects.all().db, User.objects.all().db]})
+
+    def post(self, request):
+        return Response(status=201)
+
+
+@override_settings(
+    DATABASE_ROUTERS=["sist_rec_api.db_router.ReplicaRouter"],
+    REPLICA_PIN_SECONDS=60, REPLICA_HEALTH_TTL=60,
+)
+class ReplicaRouterTests(SimpleTestCase):
+    """
+    Réplicas SQLite en archivos temporales (replica3 apunta a un directorio que no existe).
+    Se montan como conexiones sueltas: el runner de tests no las conoce ni las bloquea.
+    """
+    REPLICAS = ("replica1", "replica2", "replica3")
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.dir = tempfile.TemporaryDirectory()
+        rutas = {
+            "replica1": os.path.join(cls.dir.name, "r1.sqlite3"),
+            "replica2": os.path.join(cls.dir.name, "r2.sqlite3"),
+            "replica3": os.path.join(cls.dir.name, "no-existe", "r3.sqlite3"),
+        }
+        bases = {**settings.DATABASES, **{a: {"ENGINE": "django.db.backends.sqlite3", "NAME": r} for a, r in rutas.items()}}
+        configuradas = connections.configure_settings(bases)
+        for alias in rutas:
+            connections[alias] = load_backend(configuradas[alias]["ENGINE"]).DatabaseWrapper(configuradas[alias], alias)
+        cls.ajustes = override_settings(DATABASES=bases)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")  # "Overriding setting DATABASES...": aquí solo lo lee replicas()
+            cls.ajustes.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.ajustes.disable()
+        for alias in cls.REPLICAS:
+            connections[alias].close()
+            del connections[alias]
+        cls.dir.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User(pk=1, username="lector")
+        self.factory = APIRequestFactory()
+        db_router.salud._estado.clear()
+        cache.clear()
+
+    def _pedir(self, metodo):
+        request = getattr(self.factory, metodo)("/")
+        force_authenticate(request, self.user)
+        return _Vista.as_view()(request)
+
+    def test_una_replica_por_peticion(self):
+        vistos = set()
+        for _ in range(4):
+            a, b = self._pedir("get").data["db"]
+            self.assertEqual(a, b)
+            vistos.add(a)
+        # Round-robin entre las sanas; replica3 no conecta y queda descartada
+        self.assertEqual(vistos, {"replica1", "replica2"})
+        self.assertFalse(db_router.salud.sana("replica3"))
+        # Fuera de la petición todo vuelve a la primaria
+        self.assertEqual(Recibo.objects.all().db, "default")
+
+    def test_fijado_a_primaria_tras_escribir(self):
+        self.assertEqual(self._pedir("post").status_code, 201)
+        self.assertEqual(self._pedir("get").data["db"], ["default", "default"])
+
+    def test_sin_replicas_sanas_lee_de_la_primaria(self):
+        for alias in ("replica1", "replica2"):
+            db_router.salud._estado[alias] = (False, float("inf"))
+        self.assertEqual(self._pedir("get").data["db"], ["default", "default"])
+        with db_router.leer_de_replica():
+            self.assertEqual(db_router.alias_lectura(), "default")
+
+
+class _Stream(throttling.LimiteConcurrenciaMixin, APIView):
+    throttle_clase = "imports"
+
+    def get(self, request):
+        return StreamingHttpResponse(iter([b"a", b"b"]))
+
+
+@override_settings(THROTTLE_BUCKETS={}, THROTTLE_CONCURRENCIA={"imports": {"usuario": 1, "total": 1}})
+class ConcurrenciaStreamTests(SimpleTestCase):
+    def setUp(self):
+        throttling._store = throttling.MemoriaStore()
+        self.addCleanup(setattr, throttling, "_store", None)
+        self.factory = APIRequestFactory()
+
+    def _pedir(self, pk=1):
+        request = self.factory.get("/")
+        force_authenticate(request, User(pk=pk, username=f"u{pk}"))
+        return _Stream.as_view()(request)
+
+    def test_hueco_ocupado_hasta_agotar_el_stream(self):
+        primera = self._pedir()
+        self.assertEqual(self._pedir(2).status_code, 429)  # total 1: sigue ocupado tras finalize_response
+        self.assertEqual(b"".join(primera.streaming_content), b"ab")
+        segunda = self._pedir(2)
+        self.assertEqual(segunda.status_code, 200)
+        segunda.close()
+
+    def test_cerrar_sin_leer_libera(self):
+        self._pedir().close()  # cliente que se desconecta antes del primer trozo
+        respuesta = self._pedir()
+        self.assertEqual(respuesta.status_code, 200)
+        respuesta.close()
@@ -0,0 +1,236 @@
+"""
+Limitación de peticiones por usuario y por clase de ruta.
+
+Cada petición cae en una clase (imports, stats, writes, reads) y consume un token del
+cubo (token bucket) de ese usuario para esa clase: THROTTLE_BUCKETS["stats"] = "60/min"
+son ráfagas de hasta 60 que se recargan a 1 por segundo. Sin tokens → 429 con Retry-After.
+
+Además, `LimiteConcurrenciaMixin` limita cuántas peticiones de imports/stats corren a
+la vez (por usuario y en total), para que una importación grande o un dashboard en bucle
+no ocupen todos los workers.
+
+Almacenes (THROTTLE_STORE):
+- MemoriaStore: dict en el proceso, sin E/S. Los límites son por worker.
+- CacheStore: la caché de Django (Redis con REDIS_URL), compartida entre workers.
+"""
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import Throttled
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+PERIODOS = {"s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600, "hour": 3600, "d": 86400, "day": 86400}
+
+
+def parse_tasa(tasa):
+    """'60/min' → (capacidad 60, 1.0 tokens por segundo)."""
+    n, _, periodo = tasa.partition("/")
+    n = int(n)
+    return n, n / PERIODOS[periodo.strip()]
+
+
+class MemoriaStore:
+    def __init__(self):
+        self._cubos = {}
+        self._ocupados = {}
+        self._lock = threading.Lock()
+
+    def tomar(self, clave, capacidad, tasa):
+        """Consume un token. Devuelve 0 si había, o los segundos hasta el siguiente."""
+        ahora = time.monotonic()
+        with self._lock:
+            tokens, ts = self._cubos.get(clave, (capacidad, ahora))
+            tokens = min(capacidad, tokens + (ahora - ts) * tasa)
+            if len(self._cubos) > 10000:
+                self._purgar(ahora)
+            if tokens >= 1:
+                self._cubos[clave] = (tokens - 1, ahora)
+                return 0.0
+            self._cubos[clave] = (tokens, ahora)
+            return (1 - tokens) / tasa
+
+    def _purgar(self, ahora):
+        # Lo que lleva una hora sin uso ya está lleno: equivale a no tener entrada
+        for clave in [c for c, (_, ts) in self._cubos.items() if ahora - ts > 3600]:
+            del self._cubos[clave]
+
+    def ocupar(self, clave, limite, ttl):
+        with self._lock:
+            n = self._ocupados.get(clave, 0)
+            if n >= limite:
+                return False
+            self._ocupados[clave] = n + 1
+            return True
+
+    def liberar(self, clave):
+        with self._lock:
+            n = self._ocupados.get(clave, 0) - 1
+            if n > 0:
+                self._ocupados[clave] = n
+            else:
+                self._ocupados.pop(clave, None)
+
+
+class CacheStore:
+    """
+    Sobre django.core.cache. El cubo es leer-calcular-escribir (no atómico): con carreras
+    puede dejar pasar algún token de más, a cambio de un solo GET/SET por petición.
+    Los contadores de concurrencia usan incr/decr (atómicos en Redis) y caducan a los
+    `ttl` segundos por si un worker muere sin liberar.
+    """
+
+    def tomar(self, clave, capacidad, tasa):
+        ahora = time.time()
+        tokens, ts = cache.get(clave) or (capacidad, ahora)
+        tokens = min(capacidad, tokens + (ahora - ts) * tasa)
+        espera = 0.0 if tokens >= 1 else (1 - tokens) / tasa
+        if not espera:
+            tokens -= 1
+        cache.set(clave, (tokens, ahora), timeout=math.ceil(capacidad / tasa) + 1)
+        return espera
+
+    def ocupar(self, clave, limite, ttl):
+        cache.add(clave, 0, ttl)
+        try:
+            n = cache.incr(clave)
+        except ValueError:  # caducó entre add e incr
+            cache.add(clave, 1, ttl)
+            n = 1
+        if n > limite:
+            self.liberar(clave)
+            return False
+        return True
+
+    def liberar(self, clave):
+        try:
+            cache.decr(clave)
+        except ValueError:
+            pass
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = import_string(settings.THROTTLE_STORE)()
+    return _store
+
+
+def clase_ruta(request, view):
+    """
+    Clase de la petición: la que declare la vista (`throttle_clases` por acción o
+    `throttle_clase` para toda la vista), 'stats' para las acciones stats_*, y si no
+    'reads' o 'writes' según el método.
+    """
+    accion = getattr(view, "action", None)
+    clase = getattr(view, "throttle_clases", {}).get(accion) or getattr(view, "throttle_clase", None)
+    if clase:
+        return clase
+    if accion and accion.startswith("stats_"):
+        return "stats"
+    return "reads" if request.method in SAFE_METHODS else "writes"
+
+
+def _ident(request, throttle):
+    user = request.user
+    return f"u{user.pk}" if user and user.is_authenticated else f"ip{throttle.get_ident(request)}"
+
+
+class RutaThrottle(BaseThrottle):
+    """Token bucket por usuario (o IP si es anónimo) y clase de ruta."""
+
+    def allow_request(self, request, view):
+        clase = clase_ruta(request, view)
+        tasa = settings.THROTTLE_BUCKETS.get(clase)
+        if not tasa:
+            return True
+        capacidad, por_segundo = parse_tasa(tasa)
+        self.espera = store().tomar(f"tb:{clase}:{_ident(request, self)}", capacidad, por_segundo)
+        return not self.espera
+
+    def wait(self):
+        return math.ceil(self.espera)
+
+
+class _LiberarAlCerrar:
+    """
+    Envuelve el contenido de un StreamingHttpResponse y libera los huecos cuando se agota
+    o se cierra (Django llama a close() al terminar la respuesta, también si el cliente
+    se desconecta antes del primer trozo). Un generador con finally no basta: si nunca
+    llegó a arrancar, close() no ejecuta su finally.
+    """
+
+    def __init__(self, contenido, claves):
+        self._contenido = iter(contenido)
+        self._claves = claves
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._contenido)
+        except StopIteration:
+            self.close()
+            raise
+
+    def close(self):
+        claves, self._claves = self._claves, ()
+        try:
+            cerrar = getattr(self._contenido, "close", None)
+            if cerrar:
+                cerrar()
+        finally:
+            for clave in claves:
+                store().liberar(clave)
+
+
+class LimiteConcurrenciaMixin:
+    """
+    Para vistas DRF: THROTTLE_CONCURRENCIA = {"imports": {"usuario": 1, "total": 2}, ...}
+    limita las peticiones simultáneas de esa clase. Se ocupa el hueco en initial() y se
+    libera en finalize_response(), que DRF llama también cuando la vista lanza una excepción.
+    Si la respuesta es un stream, el trabajo empieza al enviarlo: el hueco se libera al
+    terminar o cerrar el stream.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        clase = clase_ruta(request, self)
+        limites = settings.THROTTLE_CONCURRENCIA.get(clase)
+        if not limites:
+            return
+        ttl = settings.THROTTLE_CONCURRENCIA_TTL
+        ocupadas = []
+        claves = (
+            (f"tc:{clase}:{_ident(request, BaseThrottle())}", limites.get("usuario")),
+            (f"tc:{clase}:*", limites.get("total")),
+        )
+        for clave, limite in claves:
+            if not limite:
+                continue
+            if not store().ocupar(clave, limite, ttl):
+                for c in ocupadas:
+                    store().liberar(c)
+                raise Throttled(wait=1, detail="Demasiadas peticiones de este tipo en curso, reintenta en unos segundos.")
+            ocupadas.append(clave)
+        self._huecos_ocupados = ocupadas
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        ocupadas, self._huecos_ocupados = getattr(self, "_huecos_ocupados", ()), ()
+        if ocupadas and getattr(response, "streaming", False) and not getattr(response, "is_async", False):
+            response.streaming_content = _LiberarAlCerrar(response.streaming_content, ocupadas)
+        else:
+            for clave in ocupadas:
+                store().liberar(clave)
+        return super().finalize_response(request, response, *args, **kwargs)
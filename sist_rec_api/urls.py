@@ -18,9 +18,10 @@ from django.contrib import admin
 from django.urls import path, include
 from usuarios_log.views import RegisterView, LoginView
 from rest_framework_simplejwt.views import TokenRefreshView
-from usuarios_log.views import UserListView
-from usuarios_log.views import UserUpdateView
+from usuarios_log.views import UserListView, UserDirectoryView, UserImportView
+from usuarios_log.views import UserUpdateView, AuditoriaView, RevocarView
 from django.http import JsonResponse
+from sist_rec_api.perfilado import PerfilListView, PerfilDescargaView
 
 def health(_): return JsonResponse({"ok": True})
 urlpatterns = [
@@ -28,8 +29,15 @@ urlpatterns = [
     path("api/auth/register/", RegisterView.as_view()),
     path("api/auth/login/",    LoginView.as_view()),
     path("api/auth/refresh/",  TokenRefreshView.as_view()),
+    path("api/auth/revoke/",   RevocarView.as_view()),  # logout / revocar tokens
     path("api/auth/users/",    UserListView.as_view()),
+    path("api/auth/users/directory/", UserDirectoryView.as_view()),  # paginado + búsqueda
+    path("api/auth/users/import/", UserImportView.as_view()),  # alta masiva (admin)
     path("api/auth/users/<int:pk>/", UserUpdateView.as_view()),  # PATCH uno
+    path("api/auth/audit/", AuditoriaView.as_view()),  # registro de auditoría (admin)
+    path("api/profiles/", PerfilListView.as_view()),  # perfiles de X-Profile (admin)
+    path("api/profiles/<str:pid>/", PerfilDescargaView.as_view()),
+    path("api/profiles/<str:pid>/<str:tipo>/", PerfilDescargaView.as_view()),
     path("api/", include("recibos.urls")),
     path("api/", include("transferencias.urls")),
     path("health/", health),
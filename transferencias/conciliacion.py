@@ -0,0 +1,322 @@
+"""
+Conciliación de extractos bancarios (monto, fecha, referencia libre) contra recibos PENDIENTES.
+
+1. `leer_extracto` parsea el CSV.
+2. `Indice` carga en memoria solo los recibos pendientes con montos del extracto y fechas
+   dentro de la ventana, agrupados por (monto, receptor) y por monto, ordenados por fecha.
+3. `proponer` asigna cada línea (en orden de fecha y línea) al recibo más cercano en fecha;
+   a igual distancia gana el id más bajo. Si la referencia menciona el id de un candidato,
+   gana ese. Un recibo asignado sale del índice, así que no se propone dos veces.
+4. `aplicar` crea las Transferencias confirmadas con bulk_create y marca los recibos PAGADO
+   con bulk_update, dentro de una transacción.
+"""
+import bisect
+import csv
+import datetime
+import io
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from recibos import bloque
+from recibos.models import Recibo
+from .models import Transferencia
+
+User = get_user_model()
+
+LOTE = 1000
+
+MATCH = "matched"
+AMBIGUO = "ambiguous"
+REFERENCIA = "by_reference"
+SIN_MATCH = "unmatched"
+
+
+def parse_monto(raw: str) -> Decimal:
+    """Tolera '$1,234.50', '1.234,50', '1234'."""
+    s = (raw or "").strip()
+    if not s:
+        raise InvalidOperation()
+    # europeo 1.234,56
+    if re.search(r"\d\.\d{3}(?:\.\d{3})*,\d{2}$", s):
+        s = s.replace(".", "").replace(",", ".")
+    else:
+        s = re.sub(r"[^\d.,-]", "", s)
+        if s.count(",") == 1 and s.count(".") == 0:
+            s = s.replace(",", ".")
+        s = s.replace(",", "")
+    return Decimal(s)
+
+
+def parse_fecha_dt(raw: str) -> datetime.datetime:
+    """Devuelve datetime: soporta ISO, dd/mm/yyyy, mm/dd/yyyy o serial Excel."""
+    s = (raw or "").strip()
+    if not s:
+        return timezone.now()
+    for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y"):
+        try:
+            d = datetime.datetime.strptime(s, fmt).date()
+            return datetime.datetime.combine(d, datetime.time.min)
+        except Exception:
+            pass
+    try:
+        serial = int(s)
+        base = datetime.date(1899, 12, 30)
+        d = base + datetime.timedelta(days=serial)
+        return datetime.datetime.combine(d, datetime.time.min)
+    except Exception:
+        pass
+    raise ValueError(f"Formato de fecha no soportado: {s}")
+
+
+def ventana_dias():
+    return getattr(settings, "CONCILIACION_VENTANA_DIAS", 30)
+
+
+def leer_extracto(content):
+    """
+    CSV con monto,fecha (obligatorios) y referencia,nota,pagador (opcionales; pagador es
+    username o id del receptor del recibo). Devuelve (lineas, errores).
+    """
+    reader = csv.DictReader(io.StringIO(content))
+    headers = {h.strip() for h in (reader.fieldnames or [])}
+    if not {"monto", "fecha"}.issubset(headers):
+        raise ValueError("Encabezados requeridos: monto,fecha (referencia,nota,pagador opcionales)")
+
+    lineas, errores = [], []
+    for i, row in enumerate(reader, start=2):
+        row = {(k or "").strip(): (v.strip() if isinstance(v, str) else v) for k, v in row.items()}
+        try:
+            monto = parse_monto(row.get("monto") or "")
+            if monto <= 0:
+                raise InvalidOperation()
+        except Exception:
+            errores.append({"row": i, "error": f"Monto inválido: {row.get('monto')}"})
+            continue
+        try:
+            fecha = parse_fecha_dt(row.get("fecha") or "")
+        except ValueError as e:
+            errores.append({"row": i, "error": f"Fecha inválida: {row.get('fecha')} ({e})"})
+            continue
+        lineas.append({
+            "row": i,
+            "monto": monto.quantize(Decimal("0.01")),
+            "fecha": fecha,
+            "referencia": row.get("referencia") or "",
+            "nota": row.get("nota") or "",
+            "pagador": row.get("pagador") or "",
+        })
+    return lineas, errores
+
+
+def resolver_pagadores(lineas, errores):
+    """Cambia `pagador` (username o id) por el id de usuario con una consulta; quita las líneas sin usuario."""
+    nombres = {l["pagador"] for l in lineas if l["pagador"]}
+    if not nombres:
+        return lineas
+    ids = {int(n) for n in nombres if n.isdigit()}
+    por_nombre = dict(User.objects.filter(username__in=nombres).values_list("username", "id"))
+    por_id = set(User.objects.filter(pk__in=ids).values_list("id", flat=True)) if ids else set()
+
+    validas = []
+    for l in lineas:
+        p = l["pagador"]
+        if not p:
+            l["pagador"] = None
+        elif p in por_nombre:
+            l["pagador"] = por_nombre[p]
+        elif p.isdigit() and int(p) in por_id:
+            l["pagador"] = int(p)
+        else:
+            errores.append({"row": l["row"], "error": f"Pagador no encontrado: {p}"})
+            continue
+        validas.append(l)
+    return validas
+
+
+class Indice:
+    """
+    Recibos pendientes en listas ordenadas por (fecha, id), por monto y por (monto, receptor).
+    Cada entrada es (ordinal_fecha, id, receptor_id, monto).
+    """
+
+    def __init__(self, lineas, ventana):
+        self.ventana = ventana
+        self.por_monto = {}
+        self.por_par = {}
+        self.por_id = {}
+        if not lineas:
+            return
+
+        desde = min(l["fecha"] for l in lineas).date() - datetime.timedelta(days=ventana)
+        hasta = max(l["fecha"] for l in lineas).date() + datetime.timedelta(days=ventana)
+        montos = sorted({l["monto"] for l in lineas})
+        for i in range(0, len(montos), LOTE):
+            filas = (
+                Recibo.objects.filter(
+                    status=Recibo.Status.PENDIENTE, monto__in=montos[i:i + LOTE],
+                    fecha__gte=desde, fecha__lte=hasta,
+                )
+                .values_list("fecha", "id", "receptor_id", "monto")
+                .order_by()
+                .iterator(chunk_size=10000)
+            )
+            for fecha, rid, receptor_id, monto in filas:
+                e = (fecha.toordinal(), rid, receptor_id, monto)
+                self.por_monto.setdefault(monto, []).append(e)
+                self.por_par.setdefault((monto, receptor_id), []).append(e)
+                self.por_id[rid] = e
+        for lista in self.por_monto.values():
+            lista.sort()
+        for lista in self.por_par.values():
+            lista.sort()
+
+    def _lista(self, linea):
+        if linea["pagador"]:
+            return self.por_par.get((linea["monto"], linea["pagador"]), [])
+        return self.por_monto.get(linea["monto"], [])
+
+    def _quitar(self, e):
+        for lista in (self.por_monto[e[3]], self.por_par[(e[3], e[2])]):
+            lista.pop(bisect.bisect_left(lista, e))
+        del self.por_id[e[1]]
+
+    def _por_referencia(self, linea, dia):
+        for n in re.findall(r"\d+", linea["referencia"]):
+            e = self.por_id.get(int(n))
+            if (
+                e and e[3] == linea["monto"] and abs(e[0] - dia) <= self.ventana
+                and (not linea["pagador"] or e[2] == linea["pagador"])
+            ):
+                return e
+        return None
+
+    def buscar(self, linea):
+        """Devuelve (entrada o None, estado, candidatos en ventana) y consume la entrada elegida."""
+        dia = linea["fecha"].date().toordinal()
+        lista = self._lista(linea)
+        candidatos = (
+            bisect.bisect_right(lista, (dia + self.ventana, float("inf")))
+            - bisect.bisect_left(lista, (dia - self.ventana,))
+        )
+
+        e = self._por_referencia(linea, dia)
+        if e:
+            self._quitar(e)
+            return e, REFERENCIA, candidatos
+        if not candidatos:
+            return None, SIN_MATCH, 0
+
+        pos = bisect.bisect_left(lista, (dia,))
+        opciones = []
+        if pos < len(lista) and lista[pos][0] - dia <= self.ventana:
+            opciones.append(lista[pos])  # la primera de su fecha: ya es el id más bajo
+        if pos > 0 and dia - lista[pos - 1][0] <= self.ventana:
+            # la más cercana por la izquierda; de esa fecha, el id más bajo
+            opciones.append(lista[bisect.bisect_left(lista, (lista[pos - 1][0],))])
+        e = min(opciones, key=lambda o: (abs(o[0] - dia), o[1]))
+        self._quitar(e)
+        return e, (MATCH if candidatos == 1 else AMBIGUO), candidatos
+
+
+def proponer(lineas, ventana=None):
+    ventana = ventana_dias() if ventana is None else ventana
+    indice = Indice(lineas, ventana)
+    propuestas = []
+    for linea in sorted(lineas, key=lambda l: (l["fecha"], l["row"])):
+        e, estado, candidatos = indice.buscar(linea)
+        propuestas.append({
+            "row": linea["row"],
+            "monto": str(linea["monto"]),
+            "fecha": linea["fecha"].date().isoformat(),
+            "referencia": linea["referencia"],
+            "nota": linea["nota"],
+            "recibo_id": e[1] if e else None,
+            "receptor_id": e[2] if e else None,
+            "estado": estado,
+            "candidatos": candidatos,
+        })
+    propuestas.sort(key=lambda p: p["row"])
+    return propuestas
+
+
+def resumen(propuestas):
+    cuenta = {MATCH: 0, AMBIGUO: 0, REFERENCIA: 0, SIN_MATCH: 0}
+    for p in propuestas:
+        cuenta[p["estado"]] += 1
+    return {"rows": len(propuestas), **cuenta}
+
+
+def aplicar(matches):
+    """
+    matches: [{recibo_id, fecha?, referencia?, nota?, monto?}] confirmados por el usuario.
+    El pagador es el receptor del recibo. Devuelve (insertadas, errores).
+    """
+    errores = []
+    por_recibo = {}
+    for n, m in enumerate(matches):
+        try:
+            rid = int(m.get("recibo_id"))
+        except (TypeError, ValueError):
+            errores.append({"index": n, "error": f"recibo_id inválido: {m.get('recibo_id')}"})
+            continue
+        if rid in por_recibo:
+            errores.append({"index": n, "error": f"Recibo {rid} repetido."})
+            continue
+        por_recibo[rid] = (n, m)
+
+    insertadas = 0
+    ids = sorted(por_recibo)
+    with transaction.atomic():
+        for i in range(0, len(ids), LOTE):
+            recibos = {
+                r.id: r for r in
+                Recibo.objects.select_for_update().filter(pk__in=ids[i:i + LOTE])
+                .only("id", "emisor_id", "receptor_id", "monto", "fecha", "descripcion",
+                      "status", "pagado_en", "creado_en", "vence_en", "vencido")
+            }
+            transferencias, pagados = [], []
+            ahora = timezone.now()
+            for rid in ids[i:i + LOTE]:
+                n, m = por_recibo[rid]
+                r = recibos.get(rid)
+                if r is None:
+                    errores.append({"index": n, "error": f"Recibo no encontrado (id={rid})."})
+                    continue
+                if r.status != Recibo.Status.PENDIENTE:
+                    errores.append({"index": n, "error": f"El recibo {rid} ya está pagado."})
+                    continue
+                try:
+                    monto = parse_monto(str(m["monto"])) if m.get("monto") not in (None, "") else r.monto
+                    fecha = parse_fecha_dt(str(m.get("fecha") or ""))
+                except (InvalidOperation, ValueError):
+                    errores.append({"index": n, "error": "Monto o fecha inválidos."})
+                    continue
+                if monto != r.monto:
+                    errores.append({"index": n, "error": f"El monto ({monto}) no coincide con el del recibo ({r.monto})."})
+                    continue
+                if timezone.is_naive(fecha):
+                    fecha = timezone.make_aware(fecha)
+                transferencias.append(Transferencia(
+                    recibo_id=rid, pagador_id=r.receptor_id, monto=monto, fecha=fecha,
+                    referencia=(m.get("referencia") or None), nota=(m.get("nota") or None),
+                ))
+                r.status = Recibo.Status.PAGADO
+                r.pagado_en = fecha
+                r.actualizado_en = ahora
+                r.vencido = False
+                pagados.append(r)
+
+            if not pagados:
+                continue
+            Transferencia.objects.bulk_create(transferencias, batch_size=LOTE)
+            bloque.asignar_ids(transferencias, Transferencia, "recibo_id")
+            Recibo.objects.bulk_update(pagados, ["status", "pagado_en", "actualizado_en", "vencido"], batch_size=LOTE)
+            bloque.recibos_pagados(pagados)
+            bloque.transferencias_creadas(transferencias, recibos)
+            insertadas += len(transferencias)
+    return insertadas, errores
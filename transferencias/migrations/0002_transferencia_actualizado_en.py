@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transferencias', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transferencia',
+            name='actualizado_en',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0004_reciboarchivado'),
+        ('transferencias', '0002_transferencia_actualizado_en'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransferenciaArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('monto', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('fecha', models.DateTimeField()),
+                ('referencia', models.CharField(blank=True, max_length=100, null=True)),
+                ('nota', models.TextField(blank=True, null=True)),
+                ('actualizado_en', models.DateTimeField(db_index=True)),
+                ('pagador', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transferencias_archivadas', to=settings.AUTH_USER_MODEL)),
+                ('recibo', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='transferencia', to='recibos.reciboarchivado')),
+            ],
+        ),
+    ]
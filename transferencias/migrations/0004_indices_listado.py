@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0006_saldopendiente'),
+        ('transferencias', '0003_transferenciaarchivada'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transferencia',
+            index=models.Index(fields=['pagador', 'fecha'], name='transf_pagador_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transferencia',
+            index=models.Index(fields=['fecha'], name='transf_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transferenciaarchivada',
+            index=models.Index(fields=['pagador', 'fecha'], name='transfarch_pagador_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transferenciaarchivada',
+            index=models.Index(fields=['fecha'], name='transfarch_fecha_idx'),
+        ),
+    ]
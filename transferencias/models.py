@@ -1,7 +1,7 @@
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
-from recibos.models import Recibo
+from recibos.models import Recibo, ReciboArchivado
 
 User = settings.AUTH_USER_MODEL
 
@@ -12,6 +12,35 @@ class Transferencia(models.Model):
     fecha = models.DateTimeField(default=timezone.now)
     referencia = models.CharField(max_length=100, blank=True, null=True)
     nota = models.TextField(blank=True, null=True)
+    actualizado_en = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Estado de cuenta de un pagador por periodo y listados por fecha
+            models.Index(fields=["pagador", "fecha"], name="transf_pagador_fecha_idx"),
+            models.Index(fields=["fecha"], name="transf_fecha_idx"),
+        ]
 
     def __str__(self):
         return f"Transferencia #{self.id} de {self.pagador} por {self.monto}"
+
+
+class TransferenciaArchivada(models.Model):
+    """Transferencia de un ReciboArchivado (mismo id que tenía en Transferencia)."""
+    id = models.BigIntegerField(primary_key=True)
+    recibo = models.OneToOneField(ReciboArchivado, on_delete=models.CASCADE, related_name="transferencia")
+    pagador = models.ForeignKey(User, on_delete=models.CASCADE, related_name="transferencias_archivadas")
+    monto = models.DecimalField(max_digits=12, decimal_places=2)
+    fecha = models.DateTimeField()
+    referencia = models.CharField(max_length=100, blank=True, null=True)
+    nota = models.TextField(blank=True, null=True)
+    actualizado_en = models.DateTimeField(db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["pagador", "fecha"], name="transfarch_pagador_fecha_idx"),
+            models.Index(fields=["fecha"], name="transfarch_fecha_idx"),
+        ]
+
+    def __str__(self):
+        return f"Transferencia archivada #{self.id} de {self.pagador_id} por {self.monto}"
@@ -1,8 +1,16 @@
 from rest_framework import serializers
-from .models import Transferencia
+from recibos.mixins import CamposDinamicosMixin
+from sist_rec_api.renderers import DineroField
+from .models import Transferencia, TransferenciaArchivada
 
-class TransferenciaSerializer(serializers.ModelSerializer):
+class TransferenciaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     recibo_id = serializers.IntegerField(write_only=True)
+    monto = DineroField(max_digits=12, decimal_places=2)
+
+    expandable_fields = {
+        "recibo":  ("recibos.serializers.ReciboSerializer", {}),
+        "pagador": ("usuarios_log.serializers.UserDirectorySerializer", {}),
+    }
 
     class Meta:
         model = Transferencia
@@ -13,3 +21,13 @@ class TransferenciaSerializer(serializers.ModelSerializer):
         user = self.context["request"].user
         validated_data["pagador"] = user
         return super().create(validated_data)
+
+
+class TransferenciaArchivadaSerializer(TransferenciaSerializer):
+    expandable_fields = {
+        **TransferenciaSerializer.expandable_fields,
+        "recibo": ("recibos.serializers.ReciboArchivadoSerializer", {}),
+    }
+
+    class Meta(TransferenciaSerializer.Meta):
+        model = TransferenciaArchivada
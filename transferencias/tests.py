@@ -1,3 +1,184 @@
-from django.test import TestCase
+import datetime
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from recibos.models import Recibo
+
+from . import conciliacion
+from .models import Transferencia
+
+User = get_user_model()
+
+
+@override_settings(AUDITORIA_ACTIVA=False, THROTTLE_BUCKETS={})
+class ConciliacionTests(TestCase):
+    def setUp(self):
+        self.emisor = User.objects.create_user("emisor", password="pw123456")
+        self.juan = User.objects.create_user("juan", password="pw123456")
+        self.maria = User.objects.create_user("maria", password="pw123456")
+
+    def _recibo(self, dia, monto="100.00", receptor=None):
+        return Recibo.objects.create(
+            emisor=self.emisor, receptor=receptor or self.juan, monto=Decimal(monto),
+            fecha=datetime.date(2024, 3, dia),
+        )
+
+    def _linea(self, dia, monto="100.00", row=2, referencia="", pagador=None):
+        return {
+            "row": row, "monto": Decimal(monto), "fecha": datetime.datetime(2024, 3, dia),
+            "referencia": referencia, "nota": "", "pagador": pagador,
+        }
+
+    def _proponer(self, *lineas, ventana=5):
+        return {p["row"]: p for p in conciliacion.proponer(list(lineas), ventana)}
+
+    def test_gana_la_fecha_mas_cercana(self):
+        self._recibo(5)
+        cerca = self._recibo(11)
+        self._recibo(14)
+        p = self._proponer(self._linea(10))[2]
+        self.assertEqual((p["recibo_id"], p["estado"], p["candidatos"]), (cerca.id, conciliacion.AMBIGUO, 3))
+
+    def test_a_igual_distancia_gana_el_id_mas_bajo(self):
+        antes = self._recibo(12)
+        self._recibo(8)
+        self._recibo(12)
+        self.assertEqual(self._proponer(self._linea(10))[2]["recibo_id"], antes.id)
+
+    def test_unico_candidato_y_fuera_de_ventana(self):
+        r = self._recibo(10)
+        self._recibo(20)
+        self._recibo(10, monto="99.99")
+        p = self._proponer(self._linea(12))[2]
+        self.assertEqual((p["recibo_id"], p["estado"], p["candidatos"]), (r.id, conciliacion.MATCH, 1))
+        p = self._proponer(self._linea(28))[2]
+        self.assertEqual((p["recibo_id"], p["estado"]), (None, conciliacion.SIN_MATCH))
+
+    def test_la_referencia_manda_sobre_la_fecha(self):
+        self._recibo(10)
+        lejos = self._recibo(13)
+        p = self._proponer(self._linea(10, referencia=f"Pago recibo #{lejos.id}"))[2]
+        self.assertEqual((p["recibo_id"], p["estado"]), (lejos.id, conciliacion.REFERENCIA))
+
+    def test_referencia_con_otro_monto_no_cuenta(self):
+        cerca = self._recibo(10)
+        otro = self._recibo(10, monto="50.00")
+        p = self._proponer(self._linea(10, referencia=f"recibo {otro.id}"))[2]
+        self.assertEqual((p["recibo_id"], p["estado"]), (cerca.id, conciliacion.MATCH))
+
+    def test_un_recibo_no_se_propone_dos_veces(self):
+        r1 = self._recibo(10)
+        r2 = self._recibo(11)
+        p = self._proponer(self._linea(10, row=2), self._linea(10, row=3), self._linea(10, row=4))
+        self.assertEqual([p[n]["recibo_id"] for n in (2, 3, 4)], [r1.id, r2.id, None])
+        self.assertEqual(p[4]["estado"], conciliacion.SIN_MATCH)
+
+    def test_filtro_por_pagador(self):
+        self._recibo(10, receptor=self.juan)
+        de_maria = self._recibo(12, receptor=self.maria)
+        p = self._proponer(self._linea(10, pagador=self.maria.id))[2]
+        self.assertEqual((p["recibo_id"], p["receptor_id"], p["estado"]), (de_maria.id, self.maria.id, conciliacion.MATCH))
+        # Una referencia a un recibo de otro receptor no salta el filtro
+        p = self._proponer(self._linea(10, referencia=f"#{de_maria.id}", pagador=self.juan.id))[2]
+        self.assertEqual(p["estado"], conciliacion.MATCH)
+        self.assertNotEqual(p["recibo_id"], de_maria.id)
+
+    def test_resolver_pagadores(self):
+        errores = []
+        lineas = conciliacion.resolver_pagadores([
+            self._linea(10, row=2, pagador="maria"),
+            self._linea(10, row=3, pagador=str(self.juan.id)),
+            self._linea(10, row=4, pagador="nadie"),
+            self._linea(10, row=5, pagador=""),
+        ], errores)
+        self.assertEqual([l["pagador"] for l in lineas], [self.maria.id, self.juan.id, None])
+        self.assertEqual([e["row"] for e in errores], [4])
+
+    def test_aplicar_en_bloque(self):
+        r1 = self._recibo(10)
+        r2 = self._recibo(11, receptor=self.maria)
+        pagado = self._recibo(12)
+        pagado.status = Recibo.Status.PAGADO
+        pagado.save()
+
+        insertadas, errores = conciliacion.aplicar([
+            {"recibo_id": r1.id, "fecha": "2024-03-10", "referencia": "TRX-1"},
+            {"recibo_id": r2.id, "fecha": "2024-03-11", "monto": "100.00"},
+            {"recibo_id": r1.id},
+            {"recibo_id": pagado.id},
+            {"recibo_id": r2.id + 1000},
+        ])
+        self.assertEqual(insertadas, 2)
+        self.assertEqual([e["index"] for e in sorted(errores, key=lambda e: e["index"])], [2, 3, 4])
+        t1, t2 = Transferencia.objects.get(recibo=r1), Transferencia.objects.get(recibo=r2)
+        self.assertEqual((t1.pagador_id, t1.referencia), (self.juan.id, "TRX-1"))
+        self.assertEqual(t2.pagador_id, self.maria.id)
+        r1.refresh_from_db()
+        self.assertEqual(r1.status, Recibo.Status.PAGADO)
+
+    def test_aplicar_rechaza_monto_distinto(self):
+        r = self._recibo(10)
+        insertadas, errores = conciliacion.aplicar([{"recibo_id": r.id, "monto": "90.00"}])
+        self.assertEqual((insertadas, len(errores)), (0, 1))
+        r.refresh_from_db()
+        self.assertEqual(r.status, Recibo.Status.PENDIENTE)
+        self.assertFalse(Transferencia.objects.exists())
+
+
+@override_settings(AUDITORIA_ACTIVA=False, THROTTLE_BUCKETS={})
+class ListadoTests(TestCase):
+    def setUp(self):
+        self.ana, self.beto, self.carla, self.dani = (
+            User.objects.create_user(n, password="pw123456") for n in ("ana", "beto", "carla", "dani")
+        )
+        self.admin = User.objects.create_user("admin", password="pw123456", role=1)
+        # ana emite a beto y beto paga; ana paga un recibo de carla a dani; dani paga otro
+        self.t1 = self._transferencia(self.ana, self.beto, self.beto, datetime.date(2024, 3, 5), Recibo.Status.PAGADO)
+        self.t2 = self._transferencia(self.carla, self.dani, self.ana, datetime.date(2024, 3, 20), Recibo.Status.PENDIENTE)
+        self.t3 = self._transferencia(self.carla, self.dani, self.dani, datetime.date(2024, 4, 1), Recibo.Status.PAGADO)
+
+    def _transferencia(self, emisor, receptor, pagador, dia, status):
+        recibo = Recibo.objects.create(
+            emisor=emisor, receptor=receptor, monto=Decimal("10.00"), fecha=dia, status=status,
+        )
+        fecha = timezone.make_aware(datetime.datetime.combine(dia, datetime.time(12)))
+        return Transferencia.objects.create(recibo=recibo, pagador=pagador, monto=recibo.monto, fecha=fecha)
+
+    def _ids(self, user, **params):
+        c = APIClient()
+        c.force_authenticate(user)
+        resp = c.get("/api/transferencias/", params)
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return {f["id"] for f in resp.json()}
+
+    def test_alcance_por_usuario(self):
+        self.assertEqual(self._ids(self.ana), {self.t1.id, self.t2.id})
+        self.assertEqual(self._ids(self.beto), {self.t1.id})
+        self.assertEqual(self._ids(self.carla), {self.t2.id, self.t3.id})
+        self.assertEqual(self._ids(self.dani), {self.t2.id, self.t3.id})
+        self.assertEqual(self._ids(self.admin), {self.t1.id, self.t2.id, self.t3.id})
+
+    def test_filtro_pagador(self):
+        self.assertEqual(self._ids(self.ana, pagador="me"), {self.t2.id})
+        self.assertEqual(self._ids(self.ana, pagador=self.beto.id), {self.t1.id})
+        # El filtro no amplía el alcance
+        self.assertEqual(self._ids(self.beto, pagador=self.dani.id), set())
+
+    def test_filtro_por_periodo_y_estado(self):
+        self.assertEqual(self._ids(self.dani, **{"from": "2024-03-20"}), {self.t2.id, self.t3.id})
+        self.assertEqual(self._ids(self.dani, to="2024-03-20"), {self.t2.id})
+        self.assertEqual(self._ids(self.admin, **{"from": "2024-03-01", "to": "2024-03-31"}), {self.t1.id, self.t2.id})
+        self.assertEqual(self._ids(self.dani, status="PENDING"), {self.t2.id})
+        self.assertEqual(self._ids(self.admin, status="PAID", pagador=self.dani.id), {self.t3.id})
+
+    def test_parametros_invalidos(self):
+        c = APIClient()
+        c.force_authenticate(self.ana)
+        for params in ({"pagador": "beto"}, {"from": "2024-13-01"}, {"to": "20/03/2024"}):
+            resp = c.get("/api/transferencias/", params)
+            self.assertEqual(resp.status_code, 400, params)
+            self.assertIn("detail", resp.json())
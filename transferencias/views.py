@@ -1,24 +1,46 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
-from decimal import Decimal, InvalidOperation
-import csv, io, datetime, re
+from decimal import InvalidOperation
+import csv, io, datetime
 
 from recibos.models import Recibo
-from .models import Transferencia
-from .serializers import TransferenciaSerializer
+from recibos.mixins import CamposDinamicosViewMixin
+from recibos.archivo import ArchivoViewMixin
+from sist_rec_api.db_router import LecturaReplicaMixin
+from sist_rec_api.throttling import LimiteConcurrenciaMixin
+from recibos.condicional import condicional, fuente_listado, fuente_detalle
+from .models import Transferencia, TransferenciaArchivada
+from . import conciliacion
+from .conciliacion import parse_fecha_dt, parse_monto
+from .serializers import TransferenciaSerializer, TransferenciaArchivadaSerializer
 
 class IsAdminRole(permissions.BasePermission):
     def has_permission(self, request, view):
         return request.user.is_authenticated and getattr(request.user, "role", 0) == 1
 
-class TransferenciaViewSet(viewsets.ModelViewSet):
+class TransferenciaViewSet(LimiteConcurrenciaMixin, LecturaReplicaMixin, ArchivoViewMixin, CamposDinamicosViewMixin, viewsets.ModelViewSet):
     queryset = Transferencia.objects.all().order_by("-fecha")
     serializer_class = TransferenciaSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_clases = {
+        "import_csv": "imports", "conciliacion_preview": "imports", "conciliacion_apply": "imports",
+    }
+    queryset_archivo = TransferenciaArchivada.objects.all().order_by("-fecha")
+    serializer_class_archivo = TransferenciaArchivadaSerializer
+
+    @condicional(fuente_listado)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @condicional(fuente_detalle, detalle=True)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         recibo_id = self.request.data.get("recibo_id")
@@ -36,12 +58,65 @@ class TransferenciaViewSet(viewsets.ModelViewSet):
         recibo.save()
 
     def get_queryset(self):
+        """
+        Cada usuario ve las transferencias que pagó o las de recibos donde es emisor o
+        receptor; los admins ven todas. Filtros:
+          pagador    → id de usuario o "me"
+          from / to  → YYYY-MM-DD (inclusive) sobre fecha; con pagador usa el índice (pagador, fecha)
+          status     → PENDING | PAID (del recibo)
+          recibo_id
+        El alcance son tres condiciones que van cada una por su índice (pagador y, en
+        subconsultas sobre recibo, emisor y receptor) en vez de un OR sobre el JOIN;
+        ?expand=recibo,pagador trae las filas relacionadas con select_related
+        (CamposDinamicosViewMixin).
+        """
         qs = super().get_queryset()
-        rid = self.request.query_params.get("recibo_id")
+        user = self.request.user
+        params = self.request.query_params
+
+        if getattr(user, "role", 0) != 1 and not user.is_superuser:
+            # Recibo o ReciboArchivado según ?archivo=
+            recibos = qs.model._meta.get_field("recibo").related_model.objects
+            qs = qs.filter(
+                Q(pagador=user)
+                | Q(recibo_id__in=recibos.filter(emisor=user).values("pk"))
+                | Q(recibo_id__in=recibos.filter(receptor=user).values("pk"))
+            )
+
+        rid = params.get("recibo_id")
         if rid:
             qs = qs.filter(recibo_id=rid)
+
+        pagador = params.get("pagador")
+        if pagador == "me":
+            qs = qs.filter(pagador=user)
+        elif pagador:
+            if not pagador.isdigit():
+                raise ParseError("pagador debe ser un id o 'me'.")
+            qs = qs.filter(pagador_id=int(pagador))
+
+        # Rango sobre la columna (no fecha__date) para que el índice sirva
+        desde, hasta = self._dia(params.get("from"), "from"), self._dia(params.get("to"), "to")
+        if desde:
+            qs = qs.filter(fecha__gte=desde)
+        if hasta:
+            qs = qs.filter(fecha__lt=hasta + datetime.timedelta(days=1))
+
+        status_param = params.get("status")
+        if status_param in ("PENDING", "PAID"):
+            qs = qs.filter(recibo__status=status_param)
         return qs
 
+    @staticmethod
+    def _dia(raw, nombre):
+        if not raw:
+            return None
+        try:
+            d = datetime.date.fromisoformat(raw)
+        except ValueError:
+            raise ParseError(f"{nombre} debe tener formato YYYY-MM-DD.")
+        return timezone.make_aware(datetime.datetime.combine(d, datetime.time.min))
+
     # ========= CSV IMPORT =========
     @action(
         detail=False,
@@ -83,41 +158,6 @@ class TransferenciaViewSet(viewsets.ModelViewSet):
                 "detail": "Encabezados requeridos: recibo_id,monto (referencia,nota,fecha opcionales)"
             }, status=400)
 
-        def parse_monto(raw: str) -> Decimal:
-            """Tolera '$1,234.50', '1.234,50', '1234'."""
-            s = (raw or "").strip()
-            if not s:
-                raise InvalidOperation()
-            # europeo 1.234,56
-            if re.search(r"\d\.\d{3}(?:\.\d{3})*,\d{2}$", s):
-                s = s.replace(".", "").replace(",", ".")
-            else:
-                s = re.sub(r"[^\d.,-]", "", s)
-                if s.count(",") == 1 and s.count(".") == 0:
-                    s = s.replace(",", ".")
-                s = s.replace(",", "")
-            return Decimal(s)
-
-        def parse_fecha_dt(raw: str) -> datetime.datetime:
-            """Devuelve datetime: soporta ISO, dd/mm/yyyy, mm/dd/yyyy o serial Excel."""
-            s = (raw or "").strip()
-            if not s:
-                return timezone.now()
-            for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y"):
-                try:
-                    d = datetime.datetime.strptime(s, fmt).date()
-                    return datetime.datetime.combine(d, datetime.time.min)
-                except Exception:
-                    pass
-            try:
-                serial = int(s)
-                base = datetime.date(1899, 12, 30)
-                d = base + datetime.timedelta(days=serial)
-                return datetime.datetime.combine(d, datetime.time.min)
-            except Exception:
-                pass
-            raise ValueError(f"Formato de fecha no soportado: {s}")
-
         user = request.user
         is_admin = getattr(user, "role", 0) == 1 or user.is_superuser
 
@@ -180,7 +220,7 @@ class TransferenciaViewSet(viewsets.ModelViewSet):
                     )
                     recibo.status = Recibo.Status.PAGADO
                     recibo.pagado_en = fecha_dt
-                    recibo.save(update_fields=["status", "pagado_en"])
+                    recibo.save(update_fields=["status", "pagado_en", "actualizado_en"])
                     inserted += 1
             except Exception as e:
                 errors.append({"row": i, "error": f"Error al guardar: {str(e)}"})
@@ -192,3 +232,64 @@ class TransferenciaViewSet(viewsets.ModelViewSet):
             "skipped": skipped,
             "errors": errors,
         }, status=status.HTTP_200_OK)
+
+    # ========= CONCILIACIÓN DE EXTRACTOS =========
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="conciliacion/preview",
+        permission_classes=[permissions.IsAuthenticated, IsAdminRole],
+        parser_classes=[MultiPartParser, FormParser],
+    )
+    def conciliacion_preview(self, request):
+        """
+        Propone a qué recibo PENDIENTE corresponde cada línea de un extracto bancario
+        (CSV monto,fecha[,referencia,nota,pagador]). No escribe nada.
+        ?ventana=<días> (por defecto CONCILIACION_VENTANA_DIAS) limita la distancia entre
+        la fecha del movimiento y la del recibo.
+        """
+        if "file" not in request.FILES:
+            return Response({"detail": "Falta el archivo CSV en el campo 'file'."}, status=400)
+        try:
+            content = request.FILES["file"].read().decode("utf-8-sig")
+        except UnicodeDecodeError:
+            return Response({"detail": "El archivo debe estar en UTF-8."}, status=400)
+        try:
+            ventana = int(request.query_params.get("ventana", conciliacion.ventana_dias()))
+            lineas, errores = conciliacion.leer_extracto(content)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=400)
+
+        lineas = conciliacion.resolver_pagadores(lineas, errores)
+        propuestas = conciliacion.proponer(lineas, ventana)
+        return Response({
+            "ventana": ventana,
+            "summary": conciliacion.resumen(propuestas),
+            "proposals": propuestas,
+            "errors": errores,
+        })
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="conciliacion/apply",
+        permission_classes=[permissions.IsAuthenticated, IsAdminRole],
+        parser_classes=[JSONParser],
+    )
+    def conciliacion_apply(self, request):
+        """
+        Aplica las propuestas confirmadas: {"matches": [{recibo_id, fecha, referencia, nota, monto}]}
+        (se pueden reenviar tal cual las `proposals` de preview con recibo_id).
+        Crea las transferencias en bloque (pagador = receptor del recibo) y marca los recibos PAGADO.
+        """
+        matches = request.data.get("matches") if isinstance(request.data, dict) else None
+        if not isinstance(matches, list):
+            return Response({"detail": "Se espera matches: lista de propuestas."}, status=400)
+        matches = [m for m in matches if isinstance(m, dict) and m.get("recibo_id") is not None]
+
+        inserted, errors = conciliacion.aplicar(matches)
+        return Response({
+            "inserted": inserted,
+            "skipped": len(errors),
+            "errors": errors,
+        }, status=status.HTTP_200_OK)
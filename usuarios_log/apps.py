@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class UsuariosLogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'usuarios_log'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,150 @@
+"""
+Registro de auditoría con búfer en memoria por worker.
+
+`registrar()` solo añade un objeto Auditoria (sin guardar) a una lista: no hay escritura
+en la petición. Se encola al hacer commit la transacción en curso (on_commit; fuera de
+una transacción, al instante): lo que se deshace con un rollback no queda auditado. Un
+hilo por proceso la vuelca con bulk_create cada AUDITORIA_INTERVALO segundos, o antes
+si llega a AUDITORIA_LOTE entradas. Al salir del proceso (atexit y el hook worker_exit
+de gunicorn.conf.py) se vuelca lo pendiente.
+
+El actor (usuario e IP) sale de un ContextVar que fija la autenticación JWT
+(usuarios_log.autenticacion) y se limpia al empezar cada petición.
+"""
+import atexit
+import logging
+import os
+import threading
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import DatabaseError, close_old_connections, transaction
+
+from .models import Auditoria
+
+logger = logging.getLogger(__name__)
+
+LOGIN = "login"
+LOGIN_FALLIDO = "login.failed"
+
+_actor = ContextVar("auditoria_actor", default=(None, None))
+
+_buffer = []
+_lock = threading.Lock()
+_despertar = threading.Event()
+_hilo = None
+
+
+def fijar_actor(user_id, ip=None):
+    _actor.set((user_id, ip))
+
+
+def actor():
+    return _actor.get()
+
+
+def _limpiar_actor(**kwargs):
+    _actor.set((None, None))
+
+
+request_started.connect(_limpiar_actor, dispatch_uid="auditoria_limpiar_actor")
+
+
+def registrar(accion, entidad="", objeto_id=None, datos=None, actor_id=None, ip=None):
+    """Encola una entrada. Sin actor_id/ip explícitos usa los de la petición en curso."""
+    if not settings.AUDITORIA_ACTIVA:
+        return
+    actual_id, actual_ip = _actor.get()
+    entrada = Auditoria(
+        actor_id=actor_id if actor_id is not None else actual_id,
+        accion=accion, entidad=entidad, objeto_id=objeto_id, datos=datos,
+        ip=ip or actual_ip,
+    )
+    transaction.on_commit(lambda: _encolar([entrada]))
+
+
+def registrar_lote(entradas):
+    """Lista de tuplas (accion, entidad, objeto_id, datos) con el actor de la petición."""
+    if not settings.AUDITORIA_ACTIVA or not entradas:
+        return
+    actor_id, ip = _actor.get()
+    lote = [
+        Auditoria(actor_id=actor_id, accion=a, entidad=e, objeto_id=o, datos=d, ip=ip)
+        for a, e, o, d in entradas
+    ]
+    transaction.on_commit(lambda: _encolar(lote))
+
+
+def _encolar(entradas):
+    with _lock:
+        _buffer.extend(entradas)
+        n = len(_buffer)
+    _arrancar()
+    if n >= settings.AUDITORIA_LOTE:
+        _despertar.set()
+
+
+def vaciar():
+    """Escribe todo lo pendiente. Devuelve cuántas entradas se guardaron."""
+    global _buffer
+    with _lock:
+        pendientes, _buffer = _buffer, []
+    if not pendientes:
+        return 0
+    try:
+        Auditoria.objects.bulk_create(pendientes, batch_size=settings.AUDITORIA_LOTE)
+    except DatabaseError:
+        # Se devuelven al búfer para el siguiente intento; por encima del máximo se pierden las más viejas
+        with _lock:
+            _buffer[:0] = pendientes
+            sobran = len(_buffer) - settings.AUDITORIA_MAX_BUFFER
+            if sobran > 0:
+                del _buffer[:sobran]
+        logger.exception("No se pudo guardar la auditoría (%s entradas pendientes)", len(pendientes))
+        return 0
+    return len(pendientes)
+
+
+def _bucle():
+    while True:
+        _despertar.wait(settings.AUDITORIA_INTERVALO)
+        _despertar.clear()
+        # El hilo conserva su conexión entre vuelcos; se descarta si caducó o falló
+        close_old_connections()
+        try:
+            vaciar()
+        except Exception:
+            logger.exception("Fallo inesperado al volcar la auditoría")
+
+
+def _arrancar():
+    global _hilo
+    if _hilo is None:
+        with _lock:
+            if _hilo is None:
+                _hilo = threading.Thread(target=_bucle, name="auditoria", daemon=True)
+                _hilo.start()
+
+
+def _tras_fork():
+    # Con preload_app el hijo hereda la lista y el lock del master, pero no el hilo
+    global _buffer, _lock, _despertar, _hilo
+    _buffer, _lock, _despertar, _hilo = [], threading.Lock(), threading.Event(), None
+
+
+os.register_at_fork(after_in_child=_tras_fork)
+atexit.register(vaciar)
+
+
+def purgar(antes_de, lote=5000):
+    """Borra (en lotes) entradas anteriores a `antes_de`. Devuelve cuántas borró."""
+    total = 0
+    while True:
+        ids = list(
+            Auditoria.objects.filter(creado_en__lt=antes_de)
+            .order_by("creado_en").values_list("id", flat=True)[:lote]
+        )
+        if not ids:
+            return total
+        total += Auditoria.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,45 @@
+"""
+Autenticación JWT del proyecto (DEFAULT_AUTHENTICATION_CLASSES).
+
+Además de autenticar, deja el usuario y la IP en el contexto de la petición para la
+auditoría (usuarios_log.auditoria) y rechaza los tokens revocados (usuarios_log.revocacion),
+ambas cosas sin consultas extra en el caso normal.
+"""
+import ipaddress
+
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from . import auditoria, revocacion
+
+
+def ip_de(request):
+    """
+    IP del cliente: la que añadió a X-Forwarded-For el más externo de los
+    PROXIES_CONFIABLES (contando desde la derecha; lo de su izquierda lo pone el cliente)
+    o REMOTE_ADDR si no hay proxies o la cabecera no trae tantas. None si no es válida.
+    """
+    saltos = getattr(settings, "PROXIES_CONFIABLES", 0)
+    reenviadas = [ip.strip() for ip in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",") if ip.strip()]
+    valor = reenviadas[-saltos] if 0 < saltos <= len(reenviadas) else request.META.get("REMOTE_ADDR")
+    try:
+        return str(ipaddress.ip_address((valor or "").strip()))
+    except ValueError:
+        return None
+
+
+class JWTAuditada(JWTAuthentication):
+    def authenticate(self, request):
+        resultado = super().authenticate(request)
+        if resultado is not None:
+            auditoria.fijar_actor(resultado[0].pk, ip_de(request))
+        return resultado
+
+
+class JWTRevocable(JWTAuditada):
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if revocacion.revocado(token.payload):
+            raise InvalidToken("El token fue revocado.")
+        return token
@@ -0,0 +1,108 @@
+"""
+Importación masiva de usuarios (CSV o JSON).
+
+El coste está en el hash de las contraseñas (PBKDF2, lento a propósito): se reparte
+entre procesos con sist_rec_api.pool. Los duplicados (en el propio archivo y contra la
+BD) se buscan por conjuntos y la inserción es un bulk_create.
+"""
+import csv
+import io
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models.functions import Lower
+from rest_framework.exceptions import ValidationError
+
+from recibos import bloque
+from sist_rec_api import pool
+from . import auditoria
+from .serializers import UserImportSerializer
+
+User = get_user_model()
+
+LOTE = 1000
+
+
+def leer_csv(content):
+    reader = csv.DictReader(io.StringIO(content))
+    headers = {h.strip() for h in (reader.fieldnames or [])}
+    if not {"username", "password"}.issubset(headers):
+        raise ValueError("Encabezados requeridos: username,password (email,first_name,last_name,role,is_active opcionales)")
+    filas = []
+    for row in reader:
+        # Columnas vacías del CSV = no enviadas (toman el default del serializer)
+        filas.append({(k or "").strip(): v.strip() for k, v in row.items() if isinstance(v, str) and v.strip() != ""})
+    return filas
+
+
+def _existentes(campo, valores, lookup):
+    valores = sorted(valores)
+    encontrados = set()
+    for i in range(0, len(valores), LOTE):
+        qs = User.objects.all()
+        if campo == "email":
+            qs = qs.annotate(email_l=Lower("email"))
+        encontrados.update(qs.filter(**{f"{lookup}__in": valores[i:i + LOTE]}).values_list(lookup, flat=True))
+    return encontrados
+
+
+def importar(filas, mode="atomic"):
+    """Devuelve (creados, resultados por fila). En `atomic` no inserta nada si alguna falla."""
+    resultados = [None] * len(filas)
+    validas = []
+    ser = UserImportSerializer()
+    for i, fila in enumerate(filas):
+        try:
+            validas.append((i, ser.run_validation(fila)))
+        except ValidationError as e:
+            resultados[i] = {"index": i, "ok": False, "errors": e.detail}
+
+    # Duplicados dentro del archivo y contra la BD, por conjuntos
+    usernames = Counter(v["username"] for _, v in validas)
+    emails = Counter(v["email"].lower() for _, v in validas if v["email"])
+    usernames_bd = _existentes("username", usernames, "username")
+    emails_bd = _existentes("email", emails, "email_l")
+
+    nuevos = []
+    for i, v in validas:
+        errores = {}
+        if v["username"] in usernames_bd:
+            errores["username"] = ["Ya existe un usuario con ese username."]
+        elif usernames[v["username"]] > 1:
+            errores["username"] = ["Username repetido en el archivo."]
+        email = v["email"].lower()
+        if email and email in emails_bd:
+            errores["email"] = ["Ya existe un usuario con ese email."]
+        elif email and emails[email] > 1:
+            errores["email"] = ["Email repetido en el archivo."]
+        if errores:
+            resultados[i] = {"index": i, "ok": False, "errors": errores}
+        else:
+            nuevos.append((i, v))
+
+    fallidas = sum(1 for r in resultados if r is not None)
+    if mode == "atomic" and fallidas:
+        return 0, [r for r in resultados if r is not None]
+
+    hashes = pool.mapear(make_password, [v["password"] for _, v in nuevos])
+    usuarios = [
+        User(
+            username=v["username"], email=v["email"], password=h,
+            first_name=v["first_name"], last_name=v["last_name"],
+            role=v["role"], is_active=v["is_active"],
+        )
+        for (_, v), h in zip(nuevos, hashes)
+    ]
+    with transaction.atomic():
+        User.objects.bulk_create(usuarios, batch_size=LOTE)
+    bloque.asignar_ids(usuarios, User, "username")
+
+    auditoria.registrar_lote([
+        ("usuario.created", "usuario", u.pk, {"username": u.username, "role": u.role, "is_active": u.is_active, "import": True})
+        for u in usuarios
+    ])
+    for (i, v), u in zip(nuevos, usuarios):
+        resultados[i] = {"index": i, "ok": True, "id": u.pk, "username": v["username"]}
+    return len(usuarios), resultados
@@ -0,0 +1,20 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from usuarios_log.auditoria import purgar
+
+
+class Command(BaseCommand):
+    help = "Borra en lotes las entradas de auditoría más antiguas que la retención."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, default=settings.AUDITORIA_RETENCION_DIAS)
+        parser.add_argument("--lote", type=int, default=5000)
+
+    def handle(self, *args, **opts):
+        corte = timezone.now() - datetime.timedelta(days=opts["dias"])
+        borradas = purgar(corte, opts["lote"])
+        self.stdout.write(self.style.SUCCESS(f"{borradas} entrada(s) anteriores a {corte:%Y-%m-%d %H:%M} borradas."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from usuarios_log.revocacion import purgar
+
+
+class Command(BaseCommand):
+    help = "Borra en lotes las revocaciones de tokens que ya caducaron."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=5000)
+
+    def handle(self, *args, **opts):
+        borradas = purgar(opts["lote"])
+        self.stdout.write(self.style.SUCCESS(f"{borradas} revocación(es) caducadas borradas."))
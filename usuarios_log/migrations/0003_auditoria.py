@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:31
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios_log', '0002_user_directorio_indices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Auditoria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('actor_id', models.BigIntegerField(null=True)),
+                ('accion', models.CharField(max_length=40)),
+                ('entidad', models.CharField(blank=True, default='', max_length=20)),
+                ('objeto_id', models.BigIntegerField(null=True)),
+                ('datos', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('ip', models.GenericIPAddressField(null=True)),
+                ('creado_en', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['actor_id', 'creado_en'], name='auditoria_actor_idx'), models.Index(fields=['entidad', 'objeto_id', 'creado_en'], name='auditoria_objeto_idx')],
+            },
+        ),
+    ]
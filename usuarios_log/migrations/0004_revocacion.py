@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:33
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios_log', '0003_auditoria'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Revocacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('token', 'Token'), ('usuario', 'Usuario')], max_length=10)),
+                ('clave', models.CharField(max_length=64)),
+                ('creado_en', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expira_en', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tipo', 'clave'], name='revocacion_clave_idx')],
+            },
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.contrib.auth.models import AbstractUser
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 
 class User(AbstractUser):
     class Roles(models.IntegerChoices):
@@ -8,5 +10,73 @@ class User(AbstractUser):
 
     role = models.IntegerField(choices=Roles.choices, default=Roles.CLIENTE)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Directorio: búsqueda por prefijo (username ya es UNIQUE)
+            models.Index(fields=["email"], name="user_email_idx"),
+            models.Index(fields=["first_name"], name="user_first_name_idx"),
+            models.Index(fields=["last_name"], name="user_last_name_idx"),
+            # Filtros rol/activo ordenados por username
+            models.Index(fields=["role", "is_active", "username"], name="user_role_activo_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Para detectar renombres (Recibo.partes desnormaliza los nombres)
+        nombres = tuple(instance.__dict__.get(f) for f in ("username", "first_name", "last_name"))
+        instance._nombres_cargados = None if None in nombres else nombres
+        # Para revocar los tokens al desactivar (usuarios_log.signals)
+        instance._activo_cargado = instance.__dict__.get("is_active")
+        return instance
+
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
+
+
+class Auditoria(models.Model):
+    """
+    Quién hizo qué: altas, ediciones, pagos y borrados de recibos/transferencias/usuarios
+    y los logins. Se escribe en lotes desde usuarios_log.auditoria (no en la petición).
+    actor_id y objeto_id son ids sueltos: la entrada sobrevive al borrado del usuario u objeto.
+    """
+    actor_id  = models.BigIntegerField(null=True)
+    accion    = models.CharField(max_length=40)
+    entidad   = models.CharField(max_length=20, blank=True, default="")
+    objeto_id = models.BigIntegerField(null=True)
+    datos     = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    ip        = models.GenericIPAddressField(null=True)
+    # Hora de la acción (no del INSERT, que llega después con el lote)
+    creado_en = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["actor_id", "creado_en"], name="auditoria_actor_idx"),
+            models.Index(fields=["entidad", "objeto_id", "creado_en"], name="auditoria_objeto_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.creado_en:%Y-%m-%d %H:%M:%S} {self.actor_id} {self.accion} {self.entidad} {self.objeto_id}"
+
+
+class Revocacion(models.Model):
+    """
+    Tokens JWT revocados (tipo token, clave = jti) o todos los tokens de un usuario emitidos
+    antes de creado_en (tipo usuario, clave = id). El id creciente es el cursor con el que
+    cada worker sincroniza su filtro en memoria (usuarios_log.revocacion).
+    """
+    class Tipo(models.TextChoices):
+        TOKEN   = "token",   "Token"
+        USUARIO = "usuario", "Usuario"
+
+    tipo      = models.CharField(max_length=10, choices=Tipo.choices)
+    clave     = models.CharField(max_length=64)
+    creado_en = models.DateTimeField(default=timezone.now)
+    # A partir de aquí ya no hay token vivo afectado y la fila se puede purgar
+    expira_en = models.DateTimeField(db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["tipo", "clave"], name="revocacion_clave_idx")]
+
+    def __str__(self):
+        return f"{self.tipo}:{self.clave}"
@@ -0,0 +1,20 @@
+from rest_framework.pagination import CursorPagination
+
+
+class UserDirectoryPagination(CursorPagination):
+    """
+    Paginación por keyset (cursor) sobre username.
+    No usa OFFSET: cada página es un rango sobre el índice UNIQUE de username.
+    """
+    ordering = "username"
+    page_size = 25
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class AuditoriaPagination(CursorPagination):
+    """Más recientes primero; cada página es un rango sobre creado_en (índices de auditoría)."""
+    ordering = ("-creado_en", "-id")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
@@ -0,0 +1,178 @@
+"""
+Revocación de JWT sin consulta por petición.
+
+Cada worker tiene un filtro de Bloom con las claves revocadas ("token:<jti>" y
+"usuario:<id>") y lo pone al día cada REVOCACION_SYNC_SEGUNDOS leyendo solo las filas de
+Revocacion con id mayor que la última vista. Comprobar un token es mirar dos claves en
+memoria: si el filtro dice "no", seguro que no está revocado; si dice "quizá" (revocado
+o falso positivo, ~REVOCACION_ERROR) se confirma en la BD.
+
+Una revocación hecha en otro worker tarda como mucho REVOCACION_SYNC_SEGUNDOS en
+aplicarse aquí; las del propio worker se ven al instante.
+"""
+import datetime
+import hashlib
+import math
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Max
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import Revocacion
+
+
+class Bloom:
+    """Filtro de Bloom sobre un bytearray con doble hash (blake2b de 128 bits)."""
+
+    def __init__(self, capacidad, error):
+        self.capacidad = capacidad
+        self.m = max(8, int(-capacidad * math.log(error) / math.log(2) ** 2))
+        self.k = max(1, round(self.m / capacidad * math.log(2)))
+        self.bits = bytearray((self.m + 7) // 8)
+        self.n = 0
+
+    def _posiciones(self, clave):
+        h = hashlib.blake2b(clave.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(h[:8], "little"), int.from_bytes(h[8:], "little") | 1
+        return ((h1 + i * h2) % self.m for i in range(self.k))
+
+    def agregar(self, clave):
+        nueva = False
+        for p in self._posiciones(clave):
+            byte, bit = p >> 3, 1 << (p & 7)
+            if not self.bits[byte] & bit:
+                self.bits[byte] |= bit
+                nueva = True
+        self.n += nueva  # volver a añadir una clave no cuenta para la capacidad
+
+    def __contains__(self, clave):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._posiciones(clave))
+
+
+SOLAPE = 50
+
+_lock = threading.Lock()
+_filtro = None
+_cursor = 0
+_proxima_sync = 0.0
+_proxima_reconstruccion = 0.0
+
+
+def _tras_fork():
+    # Con preload_app el hijo hereda el filtro (sirve) pero no debe heredar el lock
+    global _lock
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_tras_fork)
+
+
+def _clave(tipo, clave):
+    return f"{tipo}:{clave}"
+
+
+def _reconstruir():
+    """Filtro nuevo desde cero (al arrancar, cada REVOCACION_RECONSTRUIR_SEGUNDOS o si se llena)."""
+    global _filtro, _cursor, _proxima_reconstruccion
+    qs = Revocacion.objects.using(DEFAULT_DB_ALIAS)
+    cursor = qs.aggregate(m=Max("id"))["m"] or 0
+    vivas = qs.filter(id__lte=cursor, expira_en__gt=timezone.now())
+    filtro = Bloom(max(settings.REVOCACION_CAPACIDAD, 2 * vivas.count()), settings.REVOCACION_ERROR)
+    for tipo, clave in vivas.values_list("tipo", "clave").iterator(chunk_size=10000):
+        filtro.agregar(_clave(tipo, clave))
+    # Lo revocado mientras se leía (ids mayores) entra en la siguiente sincronización
+    _filtro, _cursor = filtro, cursor
+    _proxima_reconstruccion = time.monotonic() + settings.REVOCACION_RECONSTRUIR_SEGUNDOS
+
+
+def sincronizar(forzar=False):
+    """Añade al filtro las revocaciones nuevas. Sin `forzar`, como mucho una vez por intervalo."""
+    global _cursor, _proxima_sync
+    ahora = time.monotonic()
+    if not forzar and ahora < _proxima_sync:
+        return
+    with _lock:
+        if not forzar and ahora < _proxima_sync:
+            return
+        if _filtro is None or ahora >= _proxima_reconstruccion or _filtro.n >= _filtro.capacidad:
+            _reconstruir()
+        # Se relee un margen de ids por debajo del cursor: un INSERT concurrente puede
+        # confirmarse después de otro con id mayor y el cursor ya lo habría pasado
+        nuevas = (
+            Revocacion.objects.using(DEFAULT_DB_ALIAS).filter(id__gt=max(0, _cursor - SOLAPE))
+            .order_by("id").values_list("id", "tipo", "clave")
+        )
+        for rid, tipo, clave in nuevas:
+            _filtro.agregar(_clave(tipo, clave))
+            _cursor = max(_cursor, rid)
+        _proxima_sync = time.monotonic() + settings.REVOCACION_SYNC_SEGUNDOS
+
+
+def _emitido(payload):
+    iat = payload.get("iat")
+    return datetime.datetime.fromtimestamp(iat, tz=datetime.timezone.utc) if iat else None
+
+
+def revocado(payload):
+    """True si el token (payload ya validado) está revocado por jti o por usuario."""
+    sincronizar()
+    jti = payload.get(api_settings.JTI_CLAIM)
+    user_id = payload.get(api_settings.USER_ID_CLAIM)
+    filtro = _filtro
+    qs = Revocacion.objects.using(DEFAULT_DB_ALIAS)
+
+    if jti and _clave(Revocacion.Tipo.TOKEN, jti) in filtro:
+        if qs.filter(tipo=Revocacion.Tipo.TOKEN, clave=jti).exists():
+            return True
+    if user_id is not None and _clave(Revocacion.Tipo.USUARIO, user_id) in filtro:
+        emitido = _emitido(payload)
+        ultima = (
+            qs.filter(tipo=Revocacion.Tipo.USUARIO, clave=str(user_id))
+            .order_by("-creado_en").values_list("creado_en", flat=True).first()
+        )
+        if ultima is not None and (emitido is None or emitido < ultima):
+            return True
+    return False
+
+
+def _agregar_local(tipo, clave):
+    sincronizar()
+    with _lock:
+        _filtro.agregar(_clave(tipo, clave))
+
+
+def revocar_token(token):
+    """Revoca un token (AccessToken o RefreshToken de simplejwt) hasta que caduque."""
+    jti = token[api_settings.JTI_CLAIM]
+    exp = datetime.datetime.fromtimestamp(token["exp"], tz=datetime.timezone.utc)
+    Revocacion.objects.create(tipo=Revocacion.Tipo.TOKEN, clave=jti, expira_en=exp)
+    _agregar_local(Revocacion.Tipo.TOKEN, jti)
+
+
+def revocar_usuario(user_id):
+    """Revoca todos los tokens del usuario emitidos hasta ahora (los nuevos logins sí valen)."""
+    ahora = timezone.now()
+    vida = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+    Revocacion.objects.create(
+        tipo=Revocacion.Tipo.USUARIO, clave=str(user_id), creado_en=ahora, expira_en=ahora + vida,
+    )
+    _agregar_local(Revocacion.Tipo.USUARIO, user_id)
+
+
+def purgar(lote=5000):
+    """Borra en lotes las revocaciones que ya no afectan a ningún token vivo."""
+    total = 0
+    ahora = timezone.now()
+    while True:
+        ids = list(
+            Revocacion.objects.filter(expira_en__lte=ahora)
+            .order_by("expira_en").values_list("id", flat=True)[:lote]
+        )
+        if not ids:
+            return total
+        total += Revocacion.objects.filter(id__in=ids).delete()[0]
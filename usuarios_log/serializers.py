@@ -1,6 +1,13 @@
 from django.contrib.auth import get_user_model
+from django.contrib.auth.validators import UnicodeUsernameValidator
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import auditoria, revocacion
+from .models import Auditoria
+from .autenticacion import ip_de
 
 User = get_user_model()
 
@@ -20,14 +27,33 @@ class RegisterSerializer(serializers.ModelSerializer):
         user.save()
         return user
 
+class UserImportSerializer(serializers.Serializer):
+    """
+    Una fila de la importación masiva. Mismos campos que RegisterSerializer pero sin
+    UniqueValidator (haría una consulta por fila): los duplicados se buscan en bloque.
+    """
+    username   = serializers.CharField(max_length=150, validators=[UnicodeUsernameValidator()])
+    email      = serializers.EmailField(required=False, allow_blank=True, default="")
+    password   = serializers.CharField(write_only=True, min_length=6)
+    first_name = serializers.CharField(max_length=150, required=False, allow_blank=True, default="")
+    last_name  = serializers.CharField(max_length=150, required=False, allow_blank=True, default="")
+    role       = serializers.ChoiceField(choices=User.Roles.choices, required=False, default=User.Roles.CLIENTE)
+    is_active  = serializers.BooleanField(required=False, default=True)
+
 class LoginSerializer(TokenObtainPairSerializer):
     def validate(self, attrs):
+        request = self.context.get("request")
+        ip = ip_de(request) if request is not None else None
         try:
             data = super().validate(attrs)
         except Exception:
+            auditoria.registrar(auditoria.LOGIN_FALLIDO, datos={"username": attrs.get("username")}, ip=ip)
             raise serializers.ValidationError("Usuario o contraseña incorrectos.")
         if not self.user.is_active:
+            auditoria.registrar(auditoria.LOGIN_FALLIDO, "usuario", self.user.pk,
+                                {"username": self.user.username, "inactive": True}, actor_id=self.user.pk, ip=ip)
             raise serializers.ValidationError("El usuario se encuentra inactivo, no puede iniciar sesión.")        
+        auditoria.registrar(auditoria.LOGIN, "usuario", self.user.pk, actor_id=self.user.pk, ip=ip)
         data.update({
             "user": {
                 "id": self.user.id,
@@ -39,3 +65,40 @@ class LoginSerializer(TokenObtainPairSerializer):
             }
         })
         return data
+
+class UserDirectorySerializer(serializers.ModelSerializer):
+    """Serializer compacto de solo lectura para el directorio / typeahead."""
+    display_name = serializers.SerializerMethodField()
+
+    # columnas que necesita display_name (para acotar el SELECT en ?expand=)
+    columnas_fuente = {"display_name": ("first_name", "last_name", "username")}
+
+    class Meta:
+        model = User
+        fields = ["id", "username", "email", "first_name", "last_name", "display_name", "role", "is_active"]
+        read_only_fields = fields
+
+    def get_display_name(self, obj):
+        return f"{obj.first_name} {obj.last_name}".strip() or obj.username
+
+
+class AuditoriaSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Auditoria
+        fields = ["id", "creado_en", "actor_id", "accion", "entidad", "objeto_id", "datos", "ip"]
+        read_only_fields = fields
+
+
+class RefreshSerializer(TokenRefreshSerializer):
+    """Como el de simplejwt, pero un refresh revocado (o de un usuario revocado) no da access nuevos."""
+
+    def validate(self, attrs):
+        if revocacion.revocado(RefreshToken(attrs["refresh"]).payload):
+            raise InvalidToken("El token fue revocado.")
+        return super().validate(attrs)
+
+
+class RevocarSerializer(serializers.Serializer):
+    """`token` (access o refresh) a revocar, o `user_id` para revocar todos los de un usuario (admin)."""
+    token   = serializers.CharField(required=False)
+    user_id = serializers.IntegerField(required=False)
@@ -0,0 +1,29 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import auditoria, revocacion
+
+User = get_user_model()
+
+
+def datos_usuario(u):
+    return {"username": u.username, "role": u.role, "is_active": u.is_active}
+
+
+@receiver(post_save, sender=User)
+def usuario_guardado(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    accion = "usuario.created" if created else "usuario.updated"
+    auditoria.registrar(accion, "usuario", instance.pk, datos_usuario(instance))
+    # Desactivado: sus tokens dejan de valer ya, no cuando caduquen
+    if not created and getattr(instance, "_activo_cargado", None) and not instance.is_active:
+        revocacion.revocar_usuario(instance.pk)
+        auditoria.registrar("usuario.revoked", "usuario", instance.pk)
+    instance._activo_cargado = instance.is_active
+
+
+@receiver(post_delete, sender=User)
+def usuario_borrado(sender, instance, **kwargs):
+    auditoria.registrar("usuario.deleted", "usuario", instance.pk, datos_usuario(instance))
@@ -1,3 +1,153 @@
-from django.test import TestCase
+from asgiref.sync import async_to_sync
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
 
-# Create your tests here.
+from recibos import eventos
+
+from . import auditoria
+from .autenticacion import ip_de
+from .models import Auditoria, User
+
+
+@override_settings(AUDITORIA_ACTIVA=False, THROTTLE_BUCKETS={})
+class RevocacionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("juan", password="pw123456")
+        self.otro = User.objects.create_user("maria", password="pw123456")
+        self.admin = User.objects.create_user("admin", password="pw123456", role=1)
+
+    def _tokens(self, user):
+        refresh = RefreshToken.for_user(user)
+        return str(refresh.access_token), str(refresh)
+
+    def _cliente(self, access):
+        c = APIClient()
+        c.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        return c
+
+    def _sse(self, access):
+        return async_to_sync(eventos._usuario)({"headers": [(b"authorization", f"Bearer {access}".encode())]})
+
+    def test_logout_revoca_el_access_de_la_peticion(self):
+        access, _ = self._tokens(self.user)
+        c = self._cliente(access)
+        self.assertEqual(c.get("/api/auth/users/").status_code, 200)
+        self.assertEqual(self._sse(access), self.user)
+        self.assertEqual(c.post("/api/auth/revoke/", {}, format="json").status_code, 200)
+        self.assertEqual(c.get("/api/auth/users/").status_code, 401)
+        self.assertIsNone(self._sse(access))
+
+    def test_no_admin_revoca_su_propio_refresh(self):
+        access, refresh = self._tokens(self.user)
+        c = self._cliente(access)
+        self.assertEqual(c.post("/api/auth/revoke/", {"token": refresh}, format="json").status_code, 200)
+        self.assertEqual(APIClient().post("/api/auth/refresh/", {"refresh": refresh}, format="json").status_code, 401)
+
+    def test_no_admin_no_revoca_tokens_ajenos(self):
+        access, _ = self._tokens(self.user)
+        ajeno, _ = self._tokens(self.otro)
+        resp = self._cliente(access).post("/api/auth/revoke/", {"token": ajeno}, format="json")
+        self.assertEqual(resp.status_code, 403)
+        self.assertEqual(self._cliente(ajeno).get("/api/auth/users/").status_code, 200)
+
+    def test_admin_revoca_todos_los_de_un_usuario(self):
+        access, refresh = self._tokens(self.user)
+        admin_access, _ = self._tokens(self.admin)
+        resp = self._cliente(admin_access).post("/api/auth/revoke/", {"user_id": self.user.pk}, format="json")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self._cliente(access).get("/api/auth/users/").status_code, 401)
+        self.assertIsNone(self._sse(access))
+        self.assertEqual(APIClient().post("/api/auth/refresh/", {"refresh": refresh}, format="json").status_code, 401)
+
+
+@override_settings(AUDITORIA_ACTIVA=True, AUDITORIA_LOTE=10000, AUDITORIA_INTERVALO=3600)
+class AuditoriaTests(TestCase):
+    def setUp(self):
+        auditoria.vaciar()
+
+    def _pendientes(self):
+        return [e.accion for e in auditoria._buffer]
+
+    def test_rollback_no_se_audita(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    User.objects.create_user("fantasma", password="pw123456")
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(self._pendientes(), [])
+
+    def test_se_encola_al_confirmar(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            user = User.objects.create_user("juan", password="pw123456")
+            auditoria.registrar_lote([("recibo.created", "recibo", 1, None), ("recibo.created", "recibo", 2, None)])
+            self.assertEqual(self._pendientes(), [])
+        self.assertTrue(callbacks)
+        self.assertEqual(self._pendientes(), ["usuario.created", "recibo.created", "recibo.created"])
+        self.assertEqual(auditoria.vaciar(), 3)
+        self.assertTrue(Auditoria.objects.filter(accion="usuario.created", objeto_id=user.pk).exists())
+
+    def test_ip_la_pone_el_proxy_no_el_cliente(self):
+        falsa = "203.0.113.9, 198.51.100.7"  # la primera la escribe el cliente
+        req = RequestFactory().get("/", HTTP_X_FORWARDED_FOR=falsa, REMOTE_ADDR="10.0.0.2")
+        with self.settings(PROXIES_CONFIABLES=1):
+            self.assertEqual(ip_de(req), "198.51.100.7")
+        with self.settings(PROXIES_CONFIABLES=2):
+            self.assertEqual(ip_de(req), "203.0.113.9")
+        with self.settings(PROXIES_CONFIABLES=3):
+            self.assertEqual(ip_de(req), "10.0.0.2")
+        with self.settings(PROXIES_CONFIABLES=0):
+            self.assertEqual(ip_de(req), "10.0.0.2")
+        with self.settings(PROXIES_CONFIABLES=1):
+            self.assertIsNone(ip_de(RequestFactory().get("/", HTTP_X_FORWARDED_FOR="1.2.3.4, basura")))
+
+
+@override_settings(AUDITORIA_ACTIVA=False, THROTTLE_BUCKETS={}, POOL_MINIMO=1000)
+class ImportacionTests(TestCase):
+    URL = "/api/auth/users/import/"
+
+    def setUp(self):
+        self.admin = User.objects.create_user("admin", password="pw123456", email="admin@x.com", role=1)
+        self.c = APIClient()
+        self.c.force_authenticate(self.admin)
+
+    def test_csv_crea_usuarios_en_bloque(self):
+        archivo = SimpleUploadedFile(
+            "u.csv", b"username,password,email,role\nana,secreto1,ana@x.com,\nbeto,secreto2,,1\n", "text/csv",
+        )
+        r = self.c.post(self.URL, {"file": archivo}, format="multipart")
+        self.assertEqual(r.status_code, 201, r.data)
+        self.assertEqual((r.data["created"], r.data["failed"]), (2, 0))
+        ana = User.objects.get(username="ana")
+        self.assertEqual([x["id"] for x in r.data["results"]], [ana.id, User.objects.get(username="beto").id])
+        self.assertTrue(ana.check_password("secreto1"))
+        self.assertEqual((ana.email, ana.role), ("ana@x.com", User.Roles.CLIENTE))
+        self.assertEqual(User.objects.get(username="beto").role, 1)
+
+    def test_atomic_no_crea_nada_si_una_fila_falla(self):
+        r = self.c.post(self.URL, [
+            {"username": "ana", "password": "secreto1"},
+            {"username": "admin", "password": "secreto2"},
+        ], format="json")
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual([x["index"] for x in r.data["results"]], [1])
+        self.assertFalse(User.objects.filter(username="ana").exists())
+
+    def test_partial_informa_duplicados_y_crea_el_resto(self):
+        r = self.c.post(self.URL, {"mode": "partial", "items": [
+            {"username": "ana", "password": "secreto1", "email": "ana@x.com"},
+            {"username": "ana", "password": "secreto2"},
+            {"username": "beto", "password": "secreto3", "email": "ADMIN@x.com"},
+            {"username": "caro", "password": "corta"},
+            {"username": "dani", "password": "secreto4", "email": "Ana@X.com"},
+            {"username": "eva", "password": "secreto5"},
+        ]}, format="json")
+        self.assertEqual(r.status_code, 201)
+        self.assertEqual((r.data["created"], r.data["failed"]), (1, 5))
+        errores = {x["index"]: set(x["errors"]) for x in r.data["results"] if not x["ok"]}
+        self.assertEqual(errores, {0: {"username", "email"}, 1: {"username"}, 2: {"email"}, 3: {"password"}, 4: {"email"}})
+        self.assertEqual(r.data["results"][5]["id"], User.objects.get(username="eva").id)
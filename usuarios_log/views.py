@@ -1,10 +1,32 @@
+import datetime
+
 from rest_framework import generics, permissions
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
+from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth import get_user_model
-from .serializers import RegisterSerializer, LoginSerializer
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import UntypedToken
+from .serializers import RegisterSerializer, LoginSerializer, UserDirectorySerializer, AuditoriaSerializer, RevocarSerializer
+from .pagination import UserDirectoryPagination, AuditoriaPagination
+from . import auditoria, importacion, revocacion
+from .models import Auditoria
+from sist_rec_api.db_router import LecturaReplicaMixin
+from sist_rec_api.throttling import LimiteConcurrenciaMixin
 
 User = get_user_model()
 
+class EsAdmin(permissions.BasePermission):
+    def has_permission(self, request, view):
+        user = request.user
+        return user.is_authenticated and (getattr(user, "role", 0) == 1 or user.is_superuser)
+
 class RegisterView(generics.CreateAPIView):
     permission_classes = [permissions.AllowAny]
     serializer_class = RegisterSerializer
@@ -22,4 +44,184 @@ class UserUpdateView(generics.UpdateAPIView):
     queryset = User.objects.all()
     serializer_class = RegisterSerializer
     permission_classes = [permissions.IsAuthenticated]
-    http_method_names = ["patch"]
\ No newline at end of file
+    http_method_names = ["patch"]
+
+class UserDirectoryView(LecturaReplicaMixin, generics.ListAPIView):
+    """
+    Directorio de usuarios para el selector de receptor (typeahead).
+
+    Query params:
+      q          → prefijo de username, email, nombre o apellido
+      role       → 0 (cliente) | 1 (admin)
+      is_active  → true | false
+      page_size  → tamaño de página (máx. 100)
+      cursor     → cursor opaco devuelto en next/previous
+    """
+    serializer_class = UserDirectorySerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = UserDirectoryPagination
+    acciones_replica = None  # todo GET va a réplica
+
+    def get_queryset(self):
+        qs = User.objects.only(
+            "id", "username", "email", "first_name", "last_name", "role", "is_active",
+        )
+        params = self.request.query_params
+
+        q = (params.get("q") or "").strip()
+        if q:
+            # LIKE 'term%' → puede usar los índices de cada columna
+            qs = qs.filter(
+                Q(username__istartswith=q) | Q(email__istartswith=q) |
+                Q(first_name__istartswith=q) | Q(last_name__istartswith=q)
+            )
+
+        role = params.get("role")
+        if role in ("0", "1"):
+            qs = qs.filter(role=int(role))
+
+        activo = (params.get("is_active") or "").lower()
+        if activo in ("true", "1"):
+            qs = qs.filter(is_active=True)
+        elif activo in ("false", "0"):
+            qs = qs.filter(is_active=False)
+        return qs
+
+
+class UserImportView(LimiteConcurrenciaMixin, generics.GenericAPIView):
+    """
+    Alta masiva de usuarios (solo admin).
+
+    - multipart con `file` CSV: username,password[,email,first_name,last_name,role,is_active]
+    - JSON: [ {...}, ... ] o {"mode": ..., "items": [...]}
+    mode (body o ?mode=): atomic (por defecto, nada se crea si alguna fila falla) | partial.
+    Las contraseñas se hashean en paralelo (un proceso por núcleo).
+    """
+    permission_classes = [permissions.IsAuthenticated, EsAdmin]
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
+    throttle_clase = "imports"
+
+    def post(self, request):
+        mode = request.query_params.get("mode")
+        if "file" in request.FILES:
+            try:
+                content = request.FILES["file"].read().decode("utf-8-sig")
+                filas = importacion.leer_csv(content)
+            except UnicodeDecodeError:
+                return Response({"detail": "El archivo debe estar en UTF-8."}, status=400)
+            except ValueError as e:
+                return Response({"detail": str(e)}, status=400)
+            mode = request.data.get("mode", mode)
+        else:
+            filas = request.data
+            if isinstance(filas, dict):
+                mode = filas.get("mode", mode)
+                filas = filas.get("items")
+        mode = mode or "atomic"
+        if mode not in ("atomic", "partial"):
+            return Response({"detail": "mode debe ser atomic o partial."}, status=400)
+        if not isinstance(filas, list) or not filas:
+            return Response({"detail": "Se espera un CSV en 'file' o una lista de usuarios."}, status=400)
+        if len(filas) > settings.USUARIOS_IMPORT_MAX:
+            return Response({"detail": f"Máximo {settings.USUARIOS_IMPORT_MAX} usuarios por importación."}, status=400)
+
+        try:
+            creados, resultados = importacion.importar(filas, mode)
+        except IntegrityError:
+            # Otro alta con el mismo username entró entre la comprobación y el INSERT
+            return Response({"detail": "Conflicto con usuarios creados durante la importación, reintenta."}, status=409)
+
+        fallidos = sum(1 for r in resultados if not r["ok"])
+        return Response({
+            "mode": mode, "created": creados, "failed": fallidos, "results": resultados,
+        }, status=201 if creados else 400)
+
+
+class RevocarView(generics.GenericAPIView):
+    """
+    POST /api/auth/revoke/
+      {}                → revoca el access token de esta petición (logout)
+      {"token": "..."}  → revoca ese access o refresh token (propio; admin: cualquiera)
+      {"user_id": N}    → (admin) revoca todos los tokens emitidos hasta ahora para ese usuario
+    """
+    serializer_class = RevocarSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        ser = self.get_serializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        user = request.user
+        es_admin = getattr(user, "role", 0) == 1 or user.is_superuser
+
+        user_id = ser.validated_data.get("user_id")
+        if user_id is not None:
+            if not es_admin:
+                return Response({"detail": "Solo un admin puede revocar los tokens de un usuario."}, status=403)
+            if not User.objects.filter(pk=user_id).exists():
+                return Response({"detail": "Usuario no encontrado."}, status=404)
+            revocacion.revocar_usuario(user_id)
+            auditoria.registrar("usuario.revoked", "usuario", user_id)
+            return Response({"detail": "Tokens del usuario revocados."})
+
+        raw = ser.validated_data.get("token")
+        if raw:
+            try:
+                token = UntypedToken(raw)
+            except TokenError as e:
+                return Response({"detail": str(e)}, status=400)
+            # simplejwt guarda el id como texto en el claim
+            if str(token.get(jwt_settings.USER_ID_CLAIM)) != str(user.pk) and not es_admin:
+                return Response({"detail": "No puedes revocar tokens de otro usuario."}, status=403)
+        else:
+            token = request.auth
+        revocacion.revocar_token(token)
+        auditoria.registrar("token.revoked", "usuario", token.get(jwt_settings.USER_ID_CLAIM),
+                            {"jti": token[jwt_settings.JTI_CLAIM], "type": token.get("token_type")})
+        return Response({"detail": "Token revocado."})
+
+
+class AuditoriaView(generics.ListAPIView):
+    """
+    Registro de auditoría (solo admin), más reciente primero y paginado por cursor.
+
+    Query params:
+      actor      → id del usuario que hizo la acción
+      entidad    → recibo | transferencia | usuario (con objeto_id: historial de un objeto)
+      objeto_id
+      accion     → p. ej. recibo.paid, login, login.failed
+      from / to  → YYYY-MM-DD o fecha-hora ISO (from inclusivo, to exclusivo)
+    Las últimas acciones pueden tardar AUDITORIA_INTERVALO segundos en aparecer (se escriben en lotes).
+    """
+    serializer_class = AuditoriaSerializer
+    permission_classes = [permissions.IsAuthenticated, EsAdmin]
+    pagination_class = AuditoriaPagination
+
+    def get_queryset(self):
+        qs = Auditoria.objects.all()
+        params = self.request.query_params
+        for campo, param in (("actor_id", "actor"), ("objeto_id", "objeto_id")):
+            valor = params.get(param)
+            if valor:
+                if not valor.isdigit():
+                    raise ParseError(f"{param} debe ser un id.")
+                qs = qs.filter(**{campo: int(valor)})
+        if params.get("entidad"):
+            qs = qs.filter(entidad=params["entidad"])
+        if params.get("accion"):
+            qs = qs.filter(accion=params["accion"])
+        desde, hasta = self._instante(params.get("from"), "from"), self._instante(params.get("to"), "to")
+        if desde:
+            qs = qs.filter(creado_en__gte=desde)
+        if hasta:
+            qs = qs.filter(creado_en__lt=hasta)
+        return qs
+
+    @staticmethod
+    def _instante(raw, nombre):
+        if not raw:
+            return None
+        try:
+            dt = datetime.datetime.fromisoformat(raw)
+        except ValueError:
+            raise ParseError(f"{nombre} debe tener formato YYYY-MM-DD o ISO 8601.")
+        return timezone.make_aware(dt) if timezone.is_naive(dt) else dt